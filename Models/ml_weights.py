@@ -1,26 +1,61 @@
 # ml_weights.py
-import pandas as pd
+import argparse
+import hashlib
+import json
+import logging
+import os
+import pickle
+import threading
 from collections import defaultdict
-from sklearn.linear_model import RidgeCV
-from sklearn.preprocessing import PolynomialFeatures
+from TRV_Metric.storage import binary_paths, load_vector_frame
 
-def get_ml_weights(team_vector_path="Data/processed/team_vectors.csv") -> dict:
+TEAM_VECTOR_PATH = "Data/Processed/team_vectors.csv"
+ARTIFACT_DIR = "Models/artifacts"
+
+# Actual 2024 win percentages
+WIN_PCT_2024 = {
+    "LAD": 0.605, "PHI": 0.586, "NYY": 0.580, "MIL": 0.574, "SDP": 0.574,
+    "CLE": 0.571, "BAL": 0.565, "ARI": 0.549, "HOU": 0.547, "ATL": 0.550,
+    "NYM": 0.550, "KCR": 0.531, "DET": 0.531, "CHC": 0.512, "CIN": 0.506,
+    "SEA": 0.525, "BOS": 0.500, "SFG": 0.494, "MIN": 0.506, "TOR": 0.457,
+    "TEX": 0.481, "STL": 0.512, "MIA": 0.457, "PIT": 0.469, "LAA": 0.389,
+    "COL": 0.377, "CHW": 0.253, "OAK": 0.426, "WSN": 0.438, "TBR": 0.494,
+}
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_loaded = {}        # fingerprint -> weights record
+_fingerprints = {}  # (path, mtime_ns, size, win_pct) -> fingerprint
+
+def input_fingerprint(team_vector_path: str = TEAM_VECTOR_PATH, win_pct: dict = WIN_PCT_2024) -> str:
     """
-    Fit a polynomial regression model with interactions, then return blended weights.
+    Content hash of the team vector file and the win-percentage table the model is fit on.
+    Uses the binary copy of the table when no CSV is present.
     """
-    df = pd.read_csv(team_vector_path)
+    if not os.path.exists(team_vector_path):
+        team_vector_path = binary_paths(team_vector_path)["npy"]
+    stat = os.stat(team_vector_path)
+    stat_key = (os.path.abspath(team_vector_path), stat.st_mtime_ns, stat.st_size, json.dumps(win_pct, sort_keys=True))
+    fingerprint = _fingerprints.get(stat_key)
+    if fingerprint is None:
+        digest = hashlib.sha256()
+        with open(team_vector_path, "rb") as f:
+            digest.update(f.read())
+        digest.update(stat_key[3].encode())
+        fingerprint = _fingerprints[stat_key] = digest.hexdigest()
+    return fingerprint
 
-    # Actual 2024 win percentages
-    win_pct_2024 = {
-        "LAD": 0.605, "PHI": 0.586, "NYY": 0.580, "MIL": 0.574, "SDP": 0.574,
-        "CLE": 0.571, "BAL": 0.565, "ARI": 0.549, "HOU": 0.547, "ATL": 0.550,
-        "NYM": 0.550, "KCR": 0.531, "DET": 0.531, "CHC": 0.512, "CIN": 0.506,
-        "SEA": 0.525, "BOS": 0.500, "SFG": 0.494, "MIN": 0.506, "TOR": 0.457,
-        "TEX": 0.481, "STL": 0.512, "MIA": 0.457, "PIT": 0.469, "LAA": 0.389,
-        "COL": 0.377, "CHW": 0.253, "OAK": 0.426, "WSN": 0.438, "TBR": 0.494,
-    }
+def fit_ml_weights(team_vector_path: str = TEAM_VECTOR_PATH, win_pct: dict = WIN_PCT_2024) -> dict:
+    """
+    Fit a polynomial regression model with interactions, then return the model artifact with blended weights.
+    """
+    from sklearn.linear_model import RidgeCV
+    from sklearn.preprocessing import PolynomialFeatures
 
-    df["win_pct"] = df["Team"].map(win_pct_2024)
+    df = load_vector_frame(team_vector_path, ["Team"])
+
+    df["win_pct"] = df["Team"].map(win_pct)
     df = df.dropna(subset=["win_pct"])
 
     X = df.drop(columns=["Team", "win_pct"])
@@ -45,8 +80,96 @@ def get_ml_weights(team_vector_path="Data/processed/team_vectors.csv") -> dict:
             blended_weights[parts[0]] += coef / 2
             blended_weights[parts[1]] += coef / 2
 
-    print("R² score:", model.score(X_poly, y))
-    return dict(blended_weights)
+    r2 = model.score(X_poly, y)
+    logger.info("Fitted ML weights (R² score: %.4f)", r2)
+    return {
+        "fingerprint": input_fingerprint(team_vector_path, win_pct),
+        "weights": {k: float(v) for k, v in blended_weights.items()},
+        "r2": float(r2),
+        "poly": poly,
+        "model": model,
+    }
+
+def _read_json(path: str):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _atomic_write(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def _save_artifacts(artifact: dict, artifact_dir: str) -> dict:
+    """
+    Persist the fitted model (pickle) and its blended weights (JSON, readable without sklearn).
+    """
+    record = {k: artifact[k] for k in ("fingerprint", "weights", "r2")}
+    _atomic_write(os.path.join(artifact_dir, "ml_model.pkl"), pickle.dumps(artifact))
+    _atomic_write(os.path.join(artifact_dir, "ml_weights.json"), json.dumps(record, indent=2).encode())
+    return record
+
+def load_ml_weights_record(
+    team_vector_path: str = TEAM_VECTOR_PATH,
+    artifact_dir: str = ARTIFACT_DIR,
+    retrain: bool = False
+) -> dict:
+    """
+    Fingerprint, blended weights and R² for the current inputs.
+    Loaded lazily from disk and refit only when the input fingerprint changes (or retrain is set).
+    """
+    fingerprint = input_fingerprint(team_vector_path)
+    with _lock:
+        record = None if retrain else _loaded.get(fingerprint)
+        if record is None and not retrain:
+            record = _read_json(os.path.join(artifact_dir, "ml_weights.json"))
+            if record is not None and record.get("fingerprint") != fingerprint:
+                record = None
+        if record is None:
+            record = _save_artifacts(fit_ml_weights(team_vector_path), artifact_dir)
+        _loaded[fingerprint] = record
+        return record
+
+def load_ml_model(team_vector_path: str = TEAM_VECTOR_PATH, artifact_dir: str = ARTIFACT_DIR) -> dict:
+    """
+    Full fitted artifact (poly features + RidgeCV model) for the current inputs; imports sklearn.
+    """
+    record = load_ml_weights_record(team_vector_path, artifact_dir)
+    try:
+        with open(os.path.join(artifact_dir, "ml_model.pkl"), "rb") as f:
+            artifact = pickle.load(f)
+        if artifact.get("fingerprint") == record["fingerprint"]:
+            return artifact
+    except (OSError, pickle.UnpicklingError, EOFError):
+        pass
+    load_ml_weights_record(team_vector_path, artifact_dir, retrain=True)
+    with open(os.path.join(artifact_dir, "ml_model.pkl"), "rb") as f:
+        return pickle.load(f)
+
+def get_ml_weights(team_vector_path: str = TEAM_VECTOR_PATH) -> dict:
+    """
+    Blended ML weights for the current team vectors (see load_ml_weights_record for caching).
+    """
+    return dict(load_ml_weights_record(team_vector_path)["weights"])
+
+def retrain_ml_weights(team_vector_path: str = TEAM_VECTOR_PATH, artifact_dir: str = ARTIFACT_DIR) -> dict:
+    """
+    Force a refit and overwrite the persisted artifacts.
+    """
+    return load_ml_weights_record(team_vector_path, artifact_dir, retrain=True)
+
 if __name__ == "__main__":
-    weights = get_ml_weights()
-    print(weights)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Fit or show the persisted ML weight model.")
+    parser.add_argument("--retrain", action="store_true", help="refit even if the inputs are unchanged")
+    parser.add_argument("--team-vectors", default=TEAM_VECTOR_PATH)
+    parser.add_argument("--artifact-dir", default=ARTIFACT_DIR)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    record = load_ml_weights_record(args.team_vectors, args.artifact_dir, retrain=args.retrain)
+    print("R² score:", record["r2"])
+    print(record["weights"])
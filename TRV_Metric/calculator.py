@@ -1,6 +1,6 @@
 # Calculator for the TRV Metric
 import numpy as np
-import pandas as pd
+from .metrics import stage
 
 def calculate_trv(player_vector: dict, team_vector: dict, weights: dict, league_avg_vector: dict) -> float:
     """
@@ -21,6 +21,57 @@ def zscore_trvs(trv_values: list) -> list:
     """
     Normalize a list of TRV values using z-score normalization.
     """
-    mean = np.mean(trv_values)
-    std = np.std(trv_values, ddof=0)
-    return [(val - mean) / std if std > 0 else 0.0 for val in trv_values]
\ No newline at end of file
+    return zscore_array(trv_values).tolist()
+
+# === Batch Engine ===
+def align_weights(weights: dict, attributes: list[str]) -> tuple[np.ndarray, float]:
+    """
+    Order a weight dict along the attribute columns of a player matrix.
+    Returns the weight vector plus the constant TRV term that calculate_trv
+    adds for weighted attributes missing from the data (it scores those with
+    its 0.5 player/team defaults and a 0.0 league average).
+    """
+    vector = np.array([float(weights.get(attr, 0.0)) for attr in attributes])
+    missing = [attr for attr in weights if attr not in attributes]
+    offset = sum(float(weights[attr]) for attr in missing) * 0.5 * 0.5
+    return vector, offset
+
+def batch_trv(
+    player_matrix: np.ndarray,
+    team_matrix: np.ndarray,
+    weight_vector: np.ndarray,
+    league_avg_vector: np.ndarray,
+    offset: float = 0.0
+) -> np.ndarray:
+    """
+    Compute raw TRVs for every row of player_matrix at once.
+    team_matrix is either a single team vector shared by all players or one row per player.
+    """
+    return ((1.0 - team_matrix) * (player_matrix - league_avg_vector)) @ weight_vector + offset
+
+def zscore_array(trv_values) -> np.ndarray:
+    """
+    Z-score normalize an array of TRVs (population std); all zeros when the spread is zero.
+    """
+    values = np.asarray(trv_values, dtype=float)
+    if values.size == 0:
+        return values
+    std = values.std(ddof=0)
+    if std > 0:
+        return (values - values.mean()) / std
+    return np.zeros_like(values)
+
+def batch_trv_zscores(
+    player_matrix: np.ndarray,
+    team_matrix: np.ndarray,
+    weight_vector: np.ndarray,
+    league_avg_vector: np.ndarray,
+    offset: float = 0.0
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Raw TRVs and their z-scores for a whole player matrix.
+    """
+    with stage("trv"):
+        raw = batch_trv(player_matrix, team_matrix, weight_vector, league_avg_vector, offset)
+    with stage("normalize"):
+        return raw, zscore_array(raw)
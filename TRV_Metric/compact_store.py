@@ -0,0 +1,368 @@
+# Compact multi-season player store: float32 attributes, interned team codes, a name string table, season partitions
+import argparse
+import json
+import os
+import sys
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Iterable, Mapping
+import numpy as np
+from .storage import VectorTable, load_vectors
+
+if TYPE_CHECKING:
+    from .snapshot import LeagueSnapshot
+
+PROCESSED_DIR = "Data/Processed"
+PLAYER_FILE = "player_vectors.csv"
+# Season the live table stands for when there are no per-season tables (the fetcher's default season)
+LIVE_SEASON = 2024
+
+class StringTable:
+    """
+    Strings packed into one UTF-8 buffer plus end offsets: about 1 byte per character and 8 per
+    string, instead of a Python str object (~50 bytes + characters) and a pointer each.
+    Slices share the buffer. find() uses a hash index built on first lookup.
+    """
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray):
+        # offsets has len + 1 entries; string i is data[offsets[i]:offsets[i + 1]]
+        self.data = data
+        self.offsets = offsets
+        self._hashes = None
+        self._order = None
+
+    @classmethod
+    def from_strings(cls, strings: Iterable[str]) -> "StringTable":
+        encoded = [str(s).encode() for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)), out=offsets[1:])
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return cls(data, offsets)
+
+    @classmethod
+    def concat(cls, tables: list["StringTable"]) -> "StringTable":
+        data = np.concatenate([t.data[t.offsets[0]:t.offsets[-1]] for t in tables]) if tables else np.empty(0, np.uint8)
+        lengths = np.concatenate([np.diff(t.offsets) for t in tables]) if tables else np.empty(0, np.int64)
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        return cls(data, offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        start, stop = self.offsets[i], self.offsets[i + 1]
+        return self.data[start:stop].tobytes().decode()
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def slice(self, start: int, stop: int) -> "StringTable":
+        return StringTable(self.data, self.offsets[start:stop + 1])
+
+    def take(self, rows) -> list[str]:
+        return [self[i] for i in np.asarray(rows).tolist()]
+
+    def find(self, value: str) -> np.ndarray:
+        """
+        Every position holding value (ascending).
+        """
+        if self._hashes is None:
+            # Hash the encoded bytes straight off the buffer instead of decoding every string first
+            buffer = self.data[self.offsets[0]:self.offsets[-1]].tobytes()
+            offsets = (self.offsets - self.offsets[0]).tolist()
+            hashes = np.fromiter(
+                (hash(buffer[start:stop]) for start, stop in zip(offsets, offsets[1:])), dtype=np.int64, count=len(self)
+            )
+            self._order = np.argsort(hashes, kind="stable")
+            self._hashes = hashes[self._order]
+        h = hash(value.encode())
+        start, stop = np.searchsorted(self._hashes, h, side="left"), np.searchsorted(self._hashes, h, side="right")
+        return np.array(sorted(i for i in self._order[start:stop].tolist() if self[i] == value), dtype=np.intp)
+
+    @property
+    def nbytes(self) -> int:
+        index = 0 if self._hashes is None else self._hashes.nbytes + self._order.nbytes
+        return int(self.offsets[-1] - self.offsets[0]) + self.offsets.nbytes + index
+
+def encode_categories(values: Iterable[str]) -> tuple[tuple[str, ...], np.ndarray]:
+    """
+    Interned labels (sorted) and the smallest integer codes that index them.
+    """
+    labels, codes = np.unique(np.asarray(list(values), dtype=object).astype(str), return_inverse=True)
+    dtype = np.int16 if len(labels) < np.iinfo(np.int16).max else np.int32
+    return tuple(str(label) for label in labels), codes.astype(dtype)
+
+@dataclass(frozen=True)
+class CompactStore:
+    """
+    Player vectors for many seasons. Rows are sorted by (season, team), so a season is one
+    contiguous row range (partition() returns views, not copies) and a roster is a range inside it.
+    The attribute matrix is float32; vectors() upcasts the rows a computation actually uses.
+    """
+    attributes: tuple[str, ...]
+    matrix: np.ndarray
+    names: StringTable
+    team_labels: tuple[str, ...]
+    team_codes: np.ndarray
+    seasons: tuple[int, ...]
+    season_bounds: np.ndarray
+    team_index: Mapping[str, int]
+
+    @property
+    def n_rows(self) -> int:
+        return len(self.team_codes)
+
+    def team_code(self, team: str) -> int:
+        return self.team_index.get(team, -1)
+
+    def season_range(self, season: int) -> tuple[int, int]:
+        """
+        Row range of one season; empty for seasons not in the store.
+        """
+        if season not in self.seasons:
+            return 0, 0
+        i = self.seasons.index(season)
+        return int(self.season_bounds[i]), int(self.season_bounds[i + 1])
+
+    def partition(self, season: int) -> "CompactStore":
+        """
+        One season as a store sharing this one's buffers.
+        """
+        if season not in self.seasons:
+            raise KeyError(f"Season {season} not in store")
+        start, stop = self.season_range(season)
+        return CompactStore(
+            attributes=self.attributes,
+            matrix=self.matrix[start:stop],
+            names=self.names.slice(start, stop),
+            team_labels=self.team_labels,
+            team_codes=self.team_codes[start:stop],
+            seasons=(season,),
+            season_bounds=np.array([0, stop - start], dtype=np.int64),
+            team_index=self.team_index,
+        )
+
+    def roster_rows(self, team: str, season: int = None) -> np.ndarray:
+        """
+        Rows of a team's players (in one season, or every season's range in turn).
+        """
+        code = self.team_code(team)
+        if code < 0:
+            return np.empty(0, dtype=np.intp)
+        seasons = self.seasons if season is None else [season]
+        ranges = []
+        for s in seasons:
+            start, stop = self.season_range(s)
+            lo, hi = np.searchsorted(self.team_codes[start:stop], [code, code + 1])
+            ranges.append(np.arange(start + lo, start + hi))
+        return np.concatenate(ranges) if ranges else np.empty(0, dtype=np.intp)
+
+    def player_rows(self, name: str, season: int = None) -> np.ndarray:
+        rows = self.names.find(name)
+        if season is not None:
+            start, stop = self.season_range(season)
+            rows = rows[(rows >= start) & (rows < stop)]
+        return rows
+
+    def season_of(self, rows) -> np.ndarray:
+        seasons = np.asarray(self.seasons)
+        return seasons[np.searchsorted(self.season_bounds, rows, side="right") - 1]
+
+    def vectors(self, rows) -> np.ndarray:
+        """
+        float64 copies of the given rows, for TRV arithmetic.
+        """
+        return self.matrix[np.asarray(rows, dtype=np.intp)].astype(float)
+
+    def what_if(self) -> "WhatIfView":
+        return WhatIfView(self)
+
+    def memory_report(self) -> dict:
+        """
+        Bytes held per component (memory-mapped arrays count at their full size).
+        """
+        report = {
+            "rows": self.n_rows,
+            "seasons": len(self.seasons),
+            "matrix": int(self.matrix.nbytes),
+            "names": self.names.nbytes,
+            "team_codes": int(self.team_codes.nbytes) + sum(sys.getsizeof(label) for label in self.team_labels),
+            "season_bounds": int(self.season_bounds.nbytes),
+        }
+        report["total"] = sum(report[k] for k in ("matrix", "names", "team_codes", "season_bounds"))
+        report["bytes_per_row"] = round(report["total"] / max(self.n_rows, 1), 1)
+        return report
+
+class WhatIfView:
+    """
+    Copy-on-write edits over a store for what-if simulations: players moved to another team and
+    vector overrides are kept per changed row, so the base arrays are shared, never copied.
+    """
+
+    def __init__(self, store: CompactStore):
+        self.store = store
+        self._teams: dict[int, int] = {}
+        self._vectors: dict[int, np.ndarray] = {}
+
+    @property
+    def changed_rows(self) -> list[int]:
+        return sorted(set(self._teams) | set(self._vectors))
+
+    def move(self, row: int, team: str) -> "WhatIfView":
+        code = self.store.team_code(team)
+        if code < 0:
+            raise KeyError(f"Unknown team '{team}'")
+        self._teams[int(row)] = code
+        return self
+
+    def set_vector(self, row: int, vector) -> "WhatIfView":
+        vector = np.asarray(vector, dtype=float)
+        if vector.shape != (len(self.store.attributes),):
+            raise ValueError(f"Expected {len(self.store.attributes)} attributes, got shape {vector.shape}")
+        self._vectors[int(row)] = vector
+        return self
+
+    def team_of(self, row: int) -> str:
+        return self.store.team_labels[self._teams.get(int(row), int(self.store.team_codes[row]))]
+
+    def roster_rows(self, team: str, season: int = None) -> np.ndarray:
+        """
+        The team's rows after the moves: the base roster minus players moved away plus players moved in.
+        """
+        code = self.store.team_code(team)
+        start, stop = (0, self.store.n_rows) if season is None else self.store.season_range(season)
+        base = self.store.roster_rows(team, season)
+        moved = np.array(
+            [row for row, to in self._teams.items() if to == code and start <= row < stop], dtype=np.intp
+        )
+        keep = base[[self._teams.get(row, code) == code for row in base.tolist()]] if self._teams else base
+        return np.union1d(keep, moved).astype(np.intp)
+
+    def vectors(self, rows) -> np.ndarray:
+        rows = np.asarray(rows, dtype=np.intp)
+        out = self.store.vectors(rows)
+        for i, row in enumerate(rows.tolist()):
+            if row in self._vectors:
+                out[i] = self._vectors[row]
+        return out
+
+    def team_vector(self, team: str, season: int = None) -> np.ndarray:
+        """
+        Mean vector of the roster after the edits.
+        """
+        rows = self.roster_rows(team, season)
+        return self.vectors(rows).mean(axis=0) if len(rows) else np.full(len(self.store.attributes), np.nan)
+
+def build_store(partitions: Iterable[tuple[int, VectorTable]]) -> CompactStore:
+    """
+    Store from (season, vector table) pairs with Name/Team keys. Attributes follow the first table;
+    every season must have them. Each table is cast to float32 as it arrives, so a generator of
+    tables keeps only one float64 table in memory at a time.
+    """
+    attributes = None
+    parts = {}
+    for season, table in partitions:
+        if attributes is None:
+            attributes = table.attributes
+        missing = [attr for attr in attributes if attr not in table.attributes]
+        if missing:
+            raise ValueError(f"Season {season} is missing attributes: {', '.join(missing)}")
+        columns = [table.attributes.index(attr) for attr in attributes]
+        team_values = [str(team) for team in table.keys["Team"]]
+        # Within a season, rows go in (team, source row) order
+        order = np.lexsort((np.asarray(table.source_rows), np.asarray(team_values, dtype=object).astype(str)))
+        parts[int(season)] = (
+            np.asarray(table.matrix, dtype=np.float32)[order][:, columns],
+            StringTable.from_strings(table.keys["Name"][i] for i in order.tolist()),
+            [team_values[i] for i in order.tolist()],
+        )
+
+    seasons = sorted(parts)
+    team_labels, team_codes = encode_categories(team for season in seasons for team in parts[season][2])
+    matrix = np.concatenate([parts[season][0] for season in seasons]) if seasons else np.empty((0, 0), dtype=np.float32)
+    matrix.setflags(write=False)
+    team_codes.setflags(write=False)
+    season_bounds = np.zeros(len(seasons) + 1, dtype=np.int64)
+    np.cumsum([len(parts[season][0]) for season in seasons], out=season_bounds[1:])
+    return CompactStore(
+        attributes=tuple(attributes or ()),
+        matrix=matrix,
+        names=StringTable.concat([parts[season][1] for season in seasons]),
+        team_labels=team_labels,
+        team_codes=team_codes,
+        seasons=tuple(seasons),
+        season_bounds=season_bounds,
+        team_index=MappingProxyType({label: code for code, label in enumerate(team_labels)}),
+    )
+
+def _has_table(csv_path: str) -> bool:
+    return os.path.exists(csv_path) or os.path.exists(f"{os.path.splitext(csv_path)[0]}.npy")
+
+def season_paths(root: str = PROCESSED_DIR, live_season: int = LIVE_SEASON) -> dict[int, str]:
+    """
+    Per-season player tables the fetcher writes: root/<season>/player_vectors.csv (or its binary copy).
+    Without any, the live root/player_vectors.csv stands in as live_season.
+    """
+    paths = {}
+    if not os.path.isdir(root):
+        return paths
+    for entry in os.listdir(root):
+        path = os.path.join(root, entry, PLAYER_FILE)
+        if entry.isdigit() and _has_table(path):
+            paths[int(entry)] = path
+    live_path = os.path.join(root, PLAYER_FILE)
+    if not paths and _has_table(live_path):
+        paths[live_season] = live_path
+    return paths
+
+def load_store(root: str = PROCESSED_DIR, live_season: int = LIVE_SEASON) -> CompactStore:
+    """
+    Every season under root (binary copies when fresh, else CSV), read one table at a time.
+    """
+    paths = season_paths(root, live_season)
+    return build_store((season, load_vectors(paths[season], ["Name", "Team"])) for season in sorted(paths))
+
+def snapshot_memory(snapshot: "LeagueSnapshot") -> dict:
+    """
+    Approximate bytes held by a LeagueSnapshot: its arrays plus the Python objects behind names and indexes.
+    Team strings are counted once per distinct object.
+    """
+    arrays = sum(
+        int(a.nbytes) for a in (
+            snapshot.player_matrix, snapshot.team_matrix, snapshot.league_avg_vector,
+            snapshot.team_mean_vector, snapshot.player_team_rows, snapshot.load_order,
+        )
+    )
+    names = sys.getsizeof(snapshot.names) + sum(sys.getsizeof(name) for name in snapshot.names)
+    teams = sys.getsizeof(snapshot.player_teams) + sum(
+        sys.getsizeof(team) for team in {id(t): t for t in snapshot.player_teams}.values()
+    )
+    indexes = sum(sys.getsizeof(dict(m)) for m in (snapshot.name_index, snapshot.team_ranges, snapshot.team_index))
+    report = {"rows": snapshot.n_players, "arrays": arrays, "names": names, "player_teams": teams, "indexes": indexes}
+    report["total"] = arrays + names + teams + indexes
+    report["bytes_per_row"] = round(report["total"] / max(snapshot.n_players, 1), 1)
+    return report
+
+def main(argv: list[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Load every season into a compact store and report its memory use.")
+    parser.add_argument("--root", default=PROCESSED_DIR)
+    parser.add_argument("--live-season", type=int, default=LIVE_SEASON,
+                        help="season label for the live table when there are no per-season tables")
+    parser.add_argument("--compare", action="store_true", help="also measure the same seasons as pandas frames")
+    args = parser.parse_args(argv)
+
+    paths = season_paths(args.root, args.live_season)
+    store = load_store(args.root, args.live_season)
+    report = {"seasons": list(store.seasons), "store": store.memory_report()}
+    if args.compare:
+        from .storage import load_vector_frame
+
+        report["pandas"] = int(sum(
+            load_vector_frame(path, ["Name", "Team"]).memory_usage(deep=True).sum() for path in paths.values()
+        ))
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
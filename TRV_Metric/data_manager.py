@@ -0,0 +1,131 @@
+# Owns the current LeagueSnapshot and swaps in rebuilt ones when the processed files change
+import logging
+import os
+import threading
+from typing import Callable
+from .snapshot import PLAYER_PATH, TEAM_PATH, LeagueSnapshot, load_snapshot
+from .storage import binary_paths
+
+logger = logging.getLogger(__name__)
+
+class DataManager:
+    """
+    Holds the live snapshot and replaces it atomically on reload.
+
+    Readers grab `manager.snapshot` once per request and keep using that object, so a swap never
+    changes data under an in-flight request. Each snapshot carries a new version, which derived
+    caches include in their keys; listeners registered with on_swap are also told about every swap.
+    """
+
+    def __init__(
+        self,
+        player_path: str = PLAYER_PATH,
+        team_path: str = TEAM_PATH,
+        loader: Callable[[str, str], LeagueSnapshot] = load_snapshot,
+        poll_interval: float = 5.0
+    ):
+        self.player_path = player_path
+        self.team_path = team_path
+        self.poll_interval = poll_interval
+        self._loader = loader
+        self._snapshot: LeagueSnapshot = None
+        self._signature = None
+        self._load_lock = threading.Lock()
+        self._listeners: list[Callable[[LeagueSnapshot, LeagueSnapshot], None]] = []
+        self._stop = threading.Event()
+        self._watcher: threading.Thread = None
+
+    @property
+    def snapshot(self) -> LeagueSnapshot:
+        """
+        Current snapshot; loaded on first access.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            self.reload(force=False)
+            snapshot = self._snapshot
+        return snapshot
+
+    @property
+    def current(self) -> LeagueSnapshot:
+        """
+        Current snapshot without triggering a load (None before the first one), e.g. for metrics.
+        """
+        return self._snapshot
+
+    @property
+    def version(self) -> int:
+        return self.snapshot.version
+
+    def on_swap(self, listener: Callable[[LeagueSnapshot, LeagueSnapshot], None]) -> None:
+        """
+        Register listener(old_snapshot, new_snapshot), called after each swap.
+        """
+        self._listeners.append(listener)
+
+    def _file_signature(self):
+        signature = []
+        paths = [self.player_path, self.team_path]
+        paths += [binary_paths(path)["index"] for path in paths]
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def reload(self, force: bool = True) -> bool:
+        """
+        Build a new snapshot from disk and swap it in. With force=False this is a no-op when the
+        files are unchanged. A failed load keeps the current snapshot. Returns True on swap.
+        """
+        with self._load_lock:
+            signature = self._file_signature()
+            if not force and self._snapshot is not None and signature == self._signature:
+                return False
+            try:
+                new = self._loader(self.player_path, self.team_path)
+            except Exception:
+                if self._snapshot is None:
+                    raise
+                # Don't retry the same broken files on every poll; wait for the next change
+                self._signature = signature
+                logger.exception("Reload of %s / %s failed; keeping snapshot v%d",
+                                 self.player_path, self.team_path, self._snapshot.version)
+                return False
+            old, self._snapshot, self._signature = self._snapshot, new, signature
+
+        logger.info("Swapped in league snapshot v%d (%d players)", new.version, new.n_players)
+        for listener in self._listeners:
+            try:
+                listener(old, new)
+            except Exception:
+                logger.exception("Snapshot swap listener failed")
+        return True
+
+    def reload_in_background(self, force: bool = True) -> threading.Thread:
+        thread = threading.Thread(target=self.reload, kwargs={"force": force}, name="trv-data-reload", daemon=True)
+        thread.start()
+        return thread
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            if self._file_signature() != self._signature:
+                self.reload(force=False)
+
+    def start_watching(self) -> None:
+        """
+        Poll the processed files and reload when they change.
+        """
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, name="trv-data-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self) -> None:
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=self.poll_interval + 1)
+            self._watcher = None
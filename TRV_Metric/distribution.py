@@ -0,0 +1,136 @@
+# Empirical TRV distribution: histogram, per-team histograms and a binned Gaussian KDE
+import math
+from dataclasses import dataclass
+import numpy as np
+
+DEFAULT_BINS = 40
+MAX_BINS = 1000
+KDE_POINTS = 300
+# The dashboard's curve has always spanned at least -4..4 (z-scores)
+MIN_CURVE_RANGE = (-4.0, 4.0)
+
+@dataclass(frozen=True)
+class TRVDistribution:
+    """
+    Distribution of one TRV array (e.g. league z-scores for a weight set).
+    team_counts[t] is the histogram of the players on team_names[t], over the same edges as counts.
+    """
+    edges: np.ndarray
+    counts: np.ndarray
+    team_names: tuple[str, ...]
+    team_index: dict[str, int]
+    team_counts: np.ndarray
+    kde_x: np.ndarray
+    kde_y: np.ndarray
+    bandwidth: float
+    mean: float
+    std: float
+    n: int
+
+    @property
+    def centers(self) -> np.ndarray:
+        return (self.edges[:-1] + self.edges[1:]) / 2
+
+    @property
+    def density(self) -> np.ndarray:
+        """
+        Histogram normalized to integrate to 1, comparable with kde_y.
+        """
+        widths = np.diff(self.edges)
+        return self.counts / (max(self.n, 1) * widths)
+
+    def team_histogram(self, team_name: str):
+        row = self.team_index.get(team_name)
+        return None if row is None else self.team_counts[row]
+
+def _edges(values: np.ndarray, bins: int) -> np.ndarray:
+    lo, hi = (float(values.min()), float(values.max())) if values.size else (0.0, 0.0)
+    if hi <= lo:
+        lo, hi = lo - 0.5, hi + 0.5
+    return np.linspace(lo, hi, bins + 1)
+
+def _bin_index(values: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """
+    Bin of every value for equal-width edges in one arithmetic pass (the max lands in the last bin).
+    """
+    bins = len(edges) - 1
+    scale = bins / (edges[-1] - edges[0])
+    return np.clip(((values - edges[0]) * scale).astype(np.intp), 0, bins - 1)
+
+def silverman_bandwidth(values: np.ndarray) -> float:
+    """
+    Silverman's rule of thumb, robust to heavy tails via the IQR.
+    """
+    n = values.size
+    if n < 2:
+        return 1.0
+    std = float(values.std(ddof=0))
+    q25, q75 = np.percentile(values, [25, 75])
+    spread = min(std, float(q75 - q25) / 1.34) or std
+    return 0.9 * spread * n ** -0.2 if spread > 0 else 1.0
+
+def binned_kde(values: np.ndarray, grid: np.ndarray, bandwidth: float) -> np.ndarray:
+    """
+    Gaussian KDE on an even grid: linear-bin the values onto the grid, then convolve with the kernel.
+    O(n + grid * kernel) instead of the O(n * grid) direct sum.
+    """
+    points = grid.size
+    delta = grid[1] - grid[0]
+    position = np.clip((values - grid[0]) / delta, 0, points - 1)
+    left = np.minimum(position.astype(np.intp), points - 2)
+    frac = position - left
+    mass = np.bincount(left, 1.0 - frac, minlength=points) + np.bincount(left + 1, frac, minlength=points)
+
+    radius = min(points, int(math.ceil(4 * bandwidth / delta)))
+    offsets = np.arange(-radius, radius + 1) * delta
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2)
+    smoothed = np.convolve(mass, kernel)[radius:radius + points]
+    return smoothed / (max(values.size, 1) * bandwidth * math.sqrt(2 * math.pi))
+
+def compute_distribution(
+    values: np.ndarray,
+    team_codes: np.ndarray,
+    team_names: tuple[str, ...],
+    bins: int = DEFAULT_BINS,
+    kde_points: int = KDE_POINTS
+) -> TRVDistribution:
+    """
+    Histogram, per-team histograms and KDE for values. team_codes[i] indexes team_names for
+    values[i] (-1 for players without a known team, who count only toward the league histogram).
+    """
+    if not 1 <= bins <= MAX_BINS:
+        raise ValueError(f"bins must be between 1 and {MAX_BINS}")
+    values = np.asarray(values, dtype=float)
+    edges = _edges(values, bins)
+    index = _bin_index(values, edges)
+    counts = np.bincount(index, minlength=bins)
+
+    # All team histograms from one bincount over (team, bin) cells
+    team_codes = np.asarray(team_codes)
+    known = team_codes >= 0
+    n_teams = len(team_names)
+    team_counts = np.bincount(
+        team_codes[known] * bins + index[known], minlength=n_teams * bins
+    ).reshape(n_teams, bins)
+
+    bandwidth = silverman_bandwidth(values)
+    lo = min(MIN_CURVE_RANGE[0], edges[0] - 3 * bandwidth)
+    hi = max(MIN_CURVE_RANGE[1], edges[-1] + 3 * bandwidth)
+    kde_x = np.linspace(lo, hi, kde_points)
+    kde_y = binned_kde(values, kde_x, max(bandwidth, kde_x[1] - kde_x[0]))
+
+    for array in (edges, counts, team_counts, kde_x, kde_y):
+        array.setflags(write=False)
+    return TRVDistribution(
+        edges=edges,
+        counts=counts,
+        team_names=tuple(team_names),
+        team_index={name: row for row, name in enumerate(team_names)},
+        team_counts=team_counts,
+        kde_x=kde_x,
+        kde_y=kde_y,
+        bandwidth=bandwidth,
+        mean=float(values.mean()) if values.size else 0.0,
+        std=float(values.std(ddof=0)) if values.size else 0.0,
+        n=int(values.size),
+    )
@@ -0,0 +1,152 @@
+# Runs CPU-bound TRV work off the event loop, with a concurrency limit and per-job timeouts
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+import weakref
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable
+from .metrics import REGISTRY
+
+class ComputeTimeout(Exception):
+    """
+    A job did not finish (including time spent waiting for a slot) within its timeout.
+    """
+
+def _env_number(name: str, default, cast=int):
+    value = os.environ.get(name)
+    return default if value in (None, "") else cast(value)
+
+class ComputeExecutor:
+    """
+    Thread pool for vectorized NumPy work (which releases the GIL) and an optional process pool
+    for large pure-Python jobs such as simulator searches. At most max_concurrency jobs run at
+    once across both pools; the rest wait, and the wait counts toward the job's timeout.
+
+    A timed-out job keeps its slot until it actually finishes, so abandoned work can't push the
+    service past its concurrency limit. Thread jobs run in a copy of the caller's context, so
+    request stage timings recorded inside them still reach the request.
+    """
+
+    def __init__(
+        self,
+        threads: int = None,
+        processes: int = 0,
+        max_concurrency: int = None,
+        timeout: float = 30.0
+    ):
+        cpus = os.cpu_count() or 1
+        self.threads = threads or min(8, cpus)
+        self.processes = processes
+        self.max_concurrency = max_concurrency or self.threads + processes
+        self.timeout = timeout
+        self._thread_pool: ThreadPoolExecutor = None
+        self._process_pool: ProcessPoolExecutor = None
+        self._pool_lock = threading.Lock()
+        # asyncio semaphores are bound to one event loop; keep one per loop
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+        self.in_flight = 0
+        self.timeouts = 0
+
+    @classmethod
+    def from_env(cls) -> "ComputeExecutor":
+        """
+        Configure from TRV_COMPUTE_THREADS / _PROCESSES / _CONCURRENCY / _TIMEOUT (seconds).
+        """
+        return cls(
+            threads=_env_number("TRV_COMPUTE_THREADS", None),
+            processes=_env_number("TRV_COMPUTE_PROCESSES", 0),
+            max_concurrency=_env_number("TRV_COMPUTE_CONCURRENCY", None),
+            timeout=_env_number("TRV_COMPUTE_TIMEOUT", 30.0, float),
+        )
+
+    def _pool(self, kind: str):
+        with self._pool_lock:
+            if kind == "thread":
+                if self._thread_pool is None:
+                    self._thread_pool = ThreadPoolExecutor(self.threads, thread_name_prefix="trv-compute")
+                return self._thread_pool
+            if kind == "process":
+                if self.processes <= 0:
+                    raise ValueError("Process jobs need processes > 0 (TRV_COMPUTE_PROCESSES).")
+                if self._process_pool is None:
+                    self._process_pool = ProcessPoolExecutor(self.processes)
+                return self._process_pool
+        raise ValueError(f"Unknown executor kind: {kind}")
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    async def run(self, fn: Callable[..., Any], *args, kind: str = "thread", timeout: float = None, **kwargs) -> Any:
+        """
+        Run fn(*args, **kwargs) on the given pool and await its result.
+        Process jobs must be picklable (module-level function and arguments).
+        """
+        timeout = self.timeout if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphore()
+        deadline = loop.time() + timeout
+
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise ComputeTimeout(f"No compute slot free within {timeout:g}s") from None
+
+        try:
+            if kind == "thread":
+                context = contextvars.copy_context()
+                future: Future = self._pool(kind).submit(context.run, functools.partial(fn, *args, **kwargs))
+            else:
+                future = self._pool(kind).submit(fn, *args, **kwargs)
+        except BaseException:
+            semaphore.release()
+            raise
+        self.in_flight += 1
+
+        def release(_):
+            try:
+                loop.call_soon_threadsafe(self._release, semaphore)
+            except RuntimeError:
+                # The loop is gone (shutdown); its semaphore goes with it
+                self.in_flight -= 1
+        future.add_done_callback(release)
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), max(0.0, deadline - loop.time()))
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            future.cancel()
+            raise ComputeTimeout(f"Job did not finish within {timeout:g}s") from None
+
+    def _release(self, semaphore: asyncio.Semaphore) -> None:
+        self.in_flight -= 1
+        semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "threads": self.threads,
+            "processes": self.processes,
+            "max_concurrency": self.max_concurrency,
+            "timeout": self.timeout,
+            "in_flight": self.in_flight,
+            "timeouts": self.timeouts,
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._pool_lock:
+            pools, self._thread_pool, self._process_pool = [self._thread_pool, self._process_pool], None, None
+        for pool in pools:
+            if pool is not None:
+                pool.shutdown(wait=wait, cancel_futures=True)
+
+def register_metrics(executor: ComputeExecutor) -> None:
+    REGISTRY.callback("trv_compute_in_flight", "Compute jobs currently running.", lambda: executor.in_flight)
+    REGISTRY.callback(
+        "trv_compute_timeouts_total", "Compute jobs that timed out.", lambda: executor.timeouts, kind="counter"
+    )
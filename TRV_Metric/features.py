@@ -0,0 +1,188 @@
+# Feature pipeline: raw batting stats -> normalized TRV attribute vectors, with the statistics fitted once and persisted
+import json
+import os
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, Mapping, NamedTuple
+import numpy as np
+
+# pandas is only needed for DataFrame output; rows and column mappings go through NumPy alone
+if TYPE_CHECKING:
+    import pandas as pd
+
+class Feature(NamedTuple):
+    """
+    One TRV attribute before normalization: derive(*columns) over the named raw stat columns.
+    """
+    inputs: tuple[str, ...]
+    derive: Callable[..., np.ndarray]
+
+# The attribute definitions behind Data/Processed (one source of truth for the fetcher and the API)
+FEATURES = {
+    "offense": Feature(("wRC+",), lambda wrc: wrc),
+    "defense": Feature(("Def",), lambda defense: defense),
+    "contact": Feature(("Z-Contact%",), lambda contact: contact),
+    "power": Feature(("ISO", "Barrel%"), lambda iso, barrel: (iso + barrel) / 2),
+    "plate_discipline": Feature(("O-Swing%",), lambda chase: 100 - chase),
+    "baserunning": Feature(("BsR",), lambda bsr: bsr),
+}
+DEFAULT_ATTRIBUTES = ("offense", "defense", "contact", "power", "plate_discipline", "baserunning")
+
+def features_path(csv_path: str) -> str:
+    """
+    Where the statistics a vector table was normalized with are kept, next to the table.
+    """
+    return f"{os.path.splitext(csv_path)[0]}.features.json"
+
+class FeaturePipeline:
+    """
+    Derives the configured attributes from raw stat columns and z-scores them (population std)
+    against statistics fitted once, so new rows are transformed without touching the fitted population.
+    fit/partial_fit accumulate count, mean and sum of squared deviations (merged per batch), so the
+    statistics can be fitted from streamed batches too. An attribute with no spread transforms to 0.
+    """
+
+    def __init__(self, attributes: Iterable[str] = DEFAULT_ATTRIBUTES, key_columns: Iterable[str] = ("Name", "Team")):
+        self.attributes = tuple(attributes)
+        unknown = [attr for attr in self.attributes if attr not in FEATURES]
+        if unknown or not self.attributes:
+            raise ValueError(f"Attributes must be a non-empty subset of {', '.join(FEATURES)}.")
+        self.key_columns = tuple(key_columns)
+        self.count = 0
+        self.mean = np.zeros(len(self.attributes))
+        self.m2 = np.zeros(len(self.attributes))
+
+    @property
+    def inputs(self) -> tuple[str, ...]:
+        """
+        Raw stat columns the attributes are derived from.
+        """
+        return tuple(dict.fromkeys(col for attr in self.attributes for col in FEATURES[attr].inputs))
+
+    @property
+    def fitted(self) -> bool:
+        return self.count > 0
+
+    @property
+    def std(self) -> np.ndarray:
+        return np.sqrt(self.m2 / max(self.count, 1))
+
+    def derive(self, columns: Mapping) -> np.ndarray:
+        """
+        (rows x attributes) unnormalized attribute matrix from raw columns (a DataFrame or column mapping).
+        """
+        values = {col: np.asarray(columns[col], dtype=float) for col in self.inputs}
+        return np.column_stack([
+            FEATURES[attr].derive(*(values[col] for col in FEATURES[attr].inputs)) for attr in self.attributes
+        ]).reshape(-1, len(self.attributes))
+
+    def _complete(self, df: "pd.DataFrame") -> "pd.DataFrame":
+        # Rows missing a key or any input stat are dropped, as the fetcher always has
+        missing = [col for col in self.key_columns + self.inputs if col not in df.columns]
+        if missing:
+            raise ValueError(f"Missing columns: {', '.join(missing)}")
+        return df.dropna(subset=list(self.key_columns + self.inputs))
+
+    def partial_fit(self, df: "pd.DataFrame") -> "FeaturePipeline":
+        """
+        Fold one batch of raw rows into the statistics.
+        """
+        matrix = self.derive(self._complete(df))
+        n = len(matrix)
+        if n == 0:
+            return self
+        batch_mean = matrix.mean(axis=0)
+        batch_m2 = ((matrix - batch_mean) ** 2).sum(axis=0)
+        total = self.count + n
+        delta = batch_mean - self.mean
+        self.mean = self.mean + delta * n / total
+        self.m2 = self.m2 + batch_m2 + delta ** 2 * self.count * n / total
+        self.count = total
+        return self
+
+    def fit(self, df: "pd.DataFrame") -> "FeaturePipeline":
+        self.count = 0
+        self.mean = np.zeros(len(self.attributes))
+        self.m2 = np.zeros(len(self.attributes))
+        return self.partial_fit(df)
+
+    def normalize(self, matrix: np.ndarray) -> np.ndarray:
+        if not self.fitted:
+            raise ValueError("FeaturePipeline is not fitted.")
+        std = self.std
+        return np.where(std > 0, (matrix - self.mean) / np.where(std > 0, std, 1.0), 0.0)
+
+    def transform(self, df: "pd.DataFrame") -> "pd.DataFrame":
+        """
+        Key columns plus normalized attributes for every complete row, in input order.
+        """
+        import pandas as pd
+
+        complete = self._complete(df)
+        out = pd.DataFrame(self.normalize(self.derive(complete)), columns=list(self.attributes), index=complete.index)
+        for position, col in enumerate(self.key_columns):
+            out.insert(position, col, complete[col])
+        return out.reset_index(drop=True)
+
+    def fit_transform(self, df: "pd.DataFrame") -> "pd.DataFrame":
+        return self.fit(df).transform(df)
+
+    def transform_batches(self, batches: Iterable["pd.DataFrame"]) -> Iterator["pd.DataFrame"]:
+        """
+        transform over a stream of raw batches, e.g. pd.read_csv(..., chunksize=n).
+        """
+        for batch in batches:
+            yield self.transform(batch)
+
+    def transform_row(self, stats: Mapping[str, float]) -> np.ndarray:
+        """
+        Normalized attribute vector for one player's raw stats. Raises ValueError naming missing stats.
+        """
+        missing = [col for col in self.inputs if stats.get(col) is None]
+        if missing:
+            raise ValueError(f"Missing stats: {', '.join(missing)}")
+        return self.normalize(self.derive({col: [stats[col]] for col in self.inputs}))[0]
+
+    # === Persistence ===
+    def to_dict(self) -> dict:
+        return {
+            "attributes": list(self.attributes),
+            "key_columns": list(self.key_columns),
+            "count": self.count,
+            "mean": self.mean.tolist(),
+            "m2": self.m2.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, record: dict) -> "FeaturePipeline":
+        pipeline = cls(record["attributes"], record["key_columns"])
+        pipeline.count = int(record["count"])
+        pipeline.mean = np.array(record["mean"], dtype=float)
+        pipeline.m2 = np.array(record["m2"], dtype=float)
+        return pipeline
+
+    def save(self, path: str) -> None:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "FeaturePipeline":
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+_loaded: dict[str, tuple[tuple, FeaturePipeline]] = {}
+
+def load_fitted(path: str):
+    """
+    The pipeline saved at path, re-read only when the file changes; None when there is none.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    signature = (stat.st_size, stat.st_mtime_ns)
+    cached = _loaded.get(path)
+    if cached is None or cached[0] != signature:
+        cached = (signature, FeaturePipeline.load(path))
+        _loaded[path] = cached
+    return cached[1]
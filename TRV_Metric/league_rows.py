@@ -0,0 +1,230 @@
+# League-wide TRV output: team filters, cursor pages and JSON rendered in chunks straight from the result arrays
+import base64
+import hashlib
+import json
+from json.encoder import encode_basestring_ascii
+from typing import Iterator, NamedTuple, Optional
+import numpy as np
+from .cache import weights_key
+from .results import LeagueTRVResult
+from .snapshot import LeagueSnapshot
+from .uncertainty import LeagueIntervals, TRVIntervals
+
+PLAYER_FIELDS = ("name", "team", "trv", "raw")
+TEAM_FIELDS = ("team", "trv", "raw")
+# What /league_trv/ has always returned
+DEFAULT_PLAYER_FIELDS = ("name", "trv")
+DEFAULT_TEAM_FIELDS = ("team", "trv")
+# Available (and added to the defaults) when the request asks for uncertainty; field -> TRVIntervals array
+INTERVAL_FIELDS = {"trv_low": "low", "trv_high": "high", "trv_se": "se", "rank_best": "rank_best", "rank_worst": "rank_worst"}
+MAX_PAGE = 100_000
+# Rows rendered per block; bounds the strings held at once when streaming
+ROW_CHUNK = 20_000
+
+class LeaguePage(NamedTuple):
+    """
+    One page of /league_trv/ output. players indexes the result's own_team_* arrays and teams
+    indexes team_z; total counts every player matching the filter, offset is this page's start.
+    """
+    players: np.ndarray
+    teams: np.ndarray
+    total: int
+    offset: int
+    next_cursor: Optional[str]
+
+def check_fields(fields, allowed: tuple[str, ...], default: tuple[str, ...]) -> tuple[str, ...]:
+    if fields is None:
+        return default
+    unknown = [field for field in fields if field not in allowed]
+    if unknown or not fields:
+        raise ValueError(f"Fields must be a non-empty subset of {', '.join(allowed)}.")
+    return tuple(dict.fromkeys(fields))
+
+def _query_key(result: LeagueTRVResult, team_codes) -> str:
+    """
+    Identifies what a cursor pages over: weights, snapshot version and team filter.
+    """
+    filter_key = "*" if team_codes is None else ",".join(map(str, team_codes))
+    digest = hashlib.sha256(f"{weights_key(result.weights, result.snapshot_version)}|{filter_key}".encode())
+    return digest.hexdigest()[:16]
+
+def encode_cursor(query_key: str, offset: int) -> str:
+    payload = json.dumps({"q": query_key, "o": offset}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+def decode_cursor(cursor: str, query_key: str) -> int:
+    """
+    Offset a cursor points at. Cursors from another query, or from before a data reload, are rejected
+    rather than silently paging through different rows.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        key, offset = payload["q"], int(payload["o"])
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("Malformed cursor.") from None
+    if key != query_key or offset < 0:
+        raise ValueError("Cursor belongs to a different query or to data that has since been reloaded.")
+    return offset
+
+def league_page(
+    result: LeagueTRVResult,
+    snapshot: LeagueSnapshot,
+    teams: list[str] = None,
+    limit: int = None,
+    cursor: str = None
+) -> LeaguePage:
+    """
+    Players (own-team context, load order) and teams for one request. teams restricts both lists;
+    limit/cursor page through the players, and next_cursor is None on the last page.
+    """
+    team_codes = None
+    if teams is not None:
+        unknown = [team for team in teams if team not in snapshot.team_index]
+        if unknown:
+            raise ValueError(f"Unknown teams: {', '.join(unknown)}")
+        team_codes = sorted({snapshot.team_index[team] for team in teams})
+
+    if team_codes is None:
+        players = np.arange(len(result.own_team_rows))
+        team_rows = np.arange(len(snapshot.team_names))
+    else:
+        team_rows = np.array(team_codes, dtype=np.intp)
+        players = np.flatnonzero(np.isin(snapshot.player_team_rows[result.own_team_rows], team_rows))
+
+    query_key = _query_key(result, team_codes)
+    offset = 0 if cursor is None else decode_cursor(cursor, query_key)
+    stop = len(players) if limit is None else min(len(players), offset + limit)
+    next_cursor = encode_cursor(query_key, stop) if stop < len(players) else None
+    # Team rows go out once, with the first page
+    return LeaguePage(players[offset:stop], team_rows if offset == 0 else team_rows[:0], len(players), offset, next_cursor)
+
+def _template(fields: tuple[str, ...], prefix: str) -> str:
+    """
+    %-template for one JSON object. Labels arrive JSON-encoded; numbers are formatted to 4 places
+    (the rounding the dict responses use) by % itself, which is cheaper than round() + repr().
+    """
+    specs = {"name": "%s", "team": "%s", "trv": "%.4f", "raw": "%.4f",
+             "trv_low": "%.4f", "trv_high": "%.4f", "trv_se": "%.4f", "rank_best": "%d", "rank_worst": "%d"}
+    return "{" + prefix + ",".join(f'"{field}":{specs[field]}' for field in fields) + "}"
+
+def _team_labels(snapshot: LeagueSnapshot) -> list[str]:
+    return [encode_basestring_ascii(name) for name in snapshot.team_names]
+
+# JSON-encoded player names in own-team entry order, for the most recently rendered snapshot.
+# Entries are independent of the weights, and gathering names by row is scattered memory access,
+# so this is paid once per data load instead of once per request.
+_player_labels: tuple[int, list[str]] = (0, [])
+
+def _player_label_list(result: LeagueTRVResult, snapshot: LeagueSnapshot, n_entries: int):
+    """
+    The cached labels, built when missing and the request covers a large share of the league
+    (small pages encode their own names); None otherwise.
+    """
+    global _player_labels
+    version, labels = _player_labels
+    if version != snapshot.version:
+        if n_entries < len(result.own_team_rows) // 4:
+            return None
+        labels = [encode_basestring_ascii(snapshot.names[row]) for row in result.own_team_rows.tolist()]
+        _player_labels = (snapshot.version, labels)
+    return labels
+
+def render_players(
+    result: LeagueTRVResult,
+    snapshot: LeagueSnapshot,
+    entries: np.ndarray,
+    fields: tuple[str, ...],
+    prefix: str = "",
+    intervals: TRVIntervals = None
+) -> Iterator[list[str]]:
+    """
+    JSON objects for own-team entries, as lists of ROW_CHUNK strings (one per object).
+    prefix is spliced in before the fields, e.g. '"type":"player",'; interval fields read intervals.
+    """
+    template = _template(fields, prefix)
+    team_labels = _team_labels(snapshot) if "team" in fields else None
+    player_labels = _player_label_list(result, snapshot, len(entries)) if "name" in fields else None
+    for start in range(0, len(entries), ROW_CHUNK):
+        chunk = entries[start:start + ROW_CHUNK]
+        rows = result.own_team_rows[chunk]
+        columns = []
+        for field in fields:
+            if field == "name":
+                if player_labels is None:
+                    columns.append([encode_basestring_ascii(snapshot.names[row]) for row in rows.tolist()])
+                else:
+                    columns.append([player_labels[entry] for entry in chunk.tolist()])
+            elif field == "team":
+                columns.append([team_labels[code] for code in snapshot.player_team_rows[rows].tolist()])
+            elif field == "trv":
+                columns.append(result.own_team_z[chunk].tolist())
+            elif field == "raw":
+                columns.append(result.own_team_raw[chunk].tolist())
+            else:
+                columns.append(getattr(intervals, INTERVAL_FIELDS[field])[chunk].tolist())
+        yield [template % values for values in zip(*columns)]
+
+def render_teams(
+    result: LeagueTRVResult,
+    snapshot: LeagueSnapshot,
+    team_rows: np.ndarray,
+    fields: tuple[str, ...],
+    prefix: str = "",
+    intervals: TRVIntervals = None
+) -> list[str]:
+    template = _template(fields, prefix)
+    team_labels = _team_labels(snapshot)
+    columns = []
+    for field in fields:
+        if field == "team":
+            columns.append([team_labels[row] for row in team_rows.tolist()])
+        elif field == "trv":
+            columns.append(result.team_z[team_rows].tolist())
+        elif field == "raw":
+            columns.append(result.team_raw[team_rows].tolist())
+        else:
+            columns.append(getattr(intervals, INTERVAL_FIELDS[field])[team_rows].tolist())
+    return [template % values for values in zip(*columns)]
+
+def league_json(
+    result: LeagueTRVResult,
+    snapshot: LeagueSnapshot,
+    page: LeaguePage,
+    player_fields: tuple[str, ...],
+    team_fields: tuple[str, ...],
+    extra: dict,
+    intervals: LeagueIntervals = None
+) -> str:
+    """
+    {"team_trvs": [...], "player_trvs": [...], **extra} as one JSON document, without building
+    a dict per row.
+    """
+    players_iv, teams_iv = intervals if intervals is not None else (None, None)
+    players = ",".join(
+        line for block in render_players(result, snapshot, page.players, player_fields, "", players_iv) for line in block
+    )
+    teams = ",".join(render_teams(result, snapshot, page.teams, team_fields, "", teams_iv))
+    tail = json.dumps(extra, separators=(",", ":"))[1:]
+    return '{"team_trvs":[' + teams + '],"player_trvs":[' + players + "]" + ("," + tail if extra else "}")
+
+def league_ndjson(
+    result: LeagueTRVResult,
+    snapshot: LeagueSnapshot,
+    page: LeaguePage,
+    player_fields: tuple[str, ...],
+    team_fields: tuple[str, ...],
+    meta: dict,
+    intervals: LeagueIntervals = None
+) -> Iterator[str]:
+    """
+    NDJSON blocks: a "meta" line, "team" lines (first page only), "player" lines ROW_CHUNK at a
+    time, then an "end" line carrying next_cursor.
+    """
+    players_iv, teams_iv = intervals if intervals is not None else (None, None)
+    compact = (",", ":")
+    yield json.dumps({"type": "meta", **meta, "total": page.total, "offset": page.offset}, separators=compact) + "\n"
+    if len(page.teams):
+        yield "".join(line + "\n" for line in render_teams(result, snapshot, page.teams, team_fields, '"type":"team",', teams_iv))
+    for block in render_players(result, snapshot, page.players, player_fields, '"type":"player",', players_iv):
+        yield "".join(line + "\n" for line in block)
+    yield json.dumps({"type": "end", "next_cursor": page.next_cursor}, separators=compact) + "\n"
@@ -0,0 +1,338 @@
+# Offline league tables: every weight scheme x every team context in one batched pass, with an input manifest
+import argparse
+import datetime
+import hashlib
+import json
+import logging
+import os
+import re
+from typing import TYPE_CHECKING, NamedTuple
+import numpy as np
+from .calculator import align_weights
+from .snapshot import PLAYER_PATH, TEAM_PATH, LeagueSnapshot, load_snapshot
+from .weights import get_weight_scheme
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+DEFAULT_SCHEMES = ["Balanced", "Offense", "Prevention", "ML"]
+DEFAULT_OUTPUT_DIR = "Data/Tables"
+# The checked-in tables: Balanced weights, players against the league-average team
+LEGACY_DIR = "Data"
+LEGACY_SCHEME = "Balanced"
+MANIFEST_NAME = "manifest.json"
+# Bump when table contents change for the same inputs, so every output is rewritten once
+TABLES_VERSION = 1
+# Scheme x team x player cells allowed for the team-fit tables
+MAX_FIT_CELLS = 50_000_000
+
+logger = logging.getLogger(__name__)
+
+class SchemeTables(NamedTuple):
+    """
+    Every TRV context for one weight scheme, as (raw, z) arrays:
+    league: snapshot rows vs the league-average team (what /compute_trv/ serves),
+    own_team: own_team_rows vs their own team, teams: each team vs the league average,
+    fit: (teams x players) every player scored against every team's profile, z within each team.
+    """
+    weights: dict
+    league: tuple[np.ndarray, np.ndarray]
+    own_team: tuple[np.ndarray, np.ndarray]
+    teams: tuple[np.ndarray, np.ndarray]
+    fit: tuple[np.ndarray, np.ndarray]
+
+def _zscore_rows(raw: np.ndarray) -> np.ndarray:
+    """
+    zscore_array applied to every row (population std; zeros where a row has no spread).
+    """
+    if raw.shape[-1] == 0:
+        return raw.copy()
+    std = raw.std(axis=-1, keepdims=True)
+    return np.where(std > 0, (raw - raw.mean(axis=-1, keepdims=True)) / np.where(std > 0, std, 1.0), 0.0)
+
+def compute_scheme_tables(snapshot: LeagueSnapshot, schemes: dict[str, dict], team_fit: bool = True) -> dict[str, SchemeTables]:
+    """
+    All schemes at once: one coefficient row per (scheme, team context), then a single matrix
+    product against the players' deviations from the league average. raw = C @ (X - L).T + offset,
+    where C = w * (1 - team) for the league-average team and (with team_fit) for every team.
+    """
+    names = list(schemes)
+    aligned = [align_weights(schemes[name], snapshot.attributes) for name in names]
+    weights = np.array([vector for vector, _ in aligned]).reshape(len(names), len(snapshot.attributes))
+    offsets = np.array([offset for _, offset in aligned])
+    league_avg = snapshot.league_avg_vector
+    deviations = snapshot.player_matrix - league_avg
+    n_schemes, n_teams = len(names), len(snapshot.team_names)
+
+    contexts = [snapshot.team_mean_vector[np.newaxis, :]]
+    if team_fit:
+        cells = n_schemes * n_teams * snapshot.n_players
+        if cells > MAX_FIT_CELLS:
+            raise ValueError(f"Team-fit tables need {cells} cells (max {MAX_FIT_CELLS}); run with --no-team-fit.")
+        contexts.append(snapshot.team_matrix)
+    team_profiles = np.concatenate(contexts)
+    coefficients = weights[:, np.newaxis, :] * (1.0 - team_profiles)[np.newaxis, :, :]
+    raw = coefficients.reshape(-1, len(snapshot.attributes)) @ deviations.T
+    raw = raw.reshape(n_schemes, len(team_profiles), -1) + offsets[:, np.newaxis, np.newaxis]
+    z = _zscore_rows(raw)
+
+    # Players vs their own team: a different team row per player, so one product per scheme column
+    rows = snapshot.load_order[snapshot.player_team_rows[snapshot.load_order] >= 0]
+    own_raw = (((1.0 - snapshot.team_matrix[snapshot.player_team_rows[rows]]) * deviations[rows]) @ weights.T).T
+    own_raw += offsets[:, np.newaxis]
+    own_z = _zscore_rows(own_raw)
+
+    team_raw = ((weights * (1.0 - league_avg)) @ (snapshot.team_matrix - league_avg).T) + offsets[:, np.newaxis]
+    team_z = _zscore_rows(team_raw)
+
+    empty = np.empty((0, snapshot.n_players))
+    return {
+        name: SchemeTables(
+            weights=dict(schemes[name]),
+            league=(raw[k, 0], z[k, 0]),
+            own_team=(own_raw[k], own_z[k]),
+            teams=(team_raw[k], team_z[k]),
+            fit=(raw[k, 1:], z[k, 1:]) if team_fit else (empty, empty),
+        )
+        for k, name in enumerate(names)
+    }
+
+# === Table layouts ===
+def _slug(name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_")
+
+def legacy_frames(snapshot: LeagueSnapshot, tables: SchemeTables) -> dict[str, "pd.DataFrame"]:
+    """
+    The three checked-in tables, in their original layouts (load order, except the sorted one).
+    """
+    import pandas as pd
+
+    order = snapshot.load_order
+    raw, z = tables.league[0][order], tables.league[1][order]
+    names = [snapshot.names[i] for i in order]
+    by_z = np.argsort(-z, kind="stable")
+    return {
+        "TRV_League_Table.csv": pd.DataFrame({"Name": names, "Raw_TRV": raw, "Z_Score_TRV": z}),
+        "player_trv_scores.csv": pd.DataFrame({
+            "Name": names, "Team": [snapshot.player_teams[i] for i in order], "TRV_z": z,
+        }),
+        "trv_league_level_balanced_weights.csv": pd.DataFrame({
+            "Player": [names[i] for i in by_z], "Raw_TRV": raw[by_z], "Z_Score_TRV": z[by_z],
+        }),
+    }
+
+def scheme_frames(snapshot: LeagueSnapshot, scheme: str, tables: SchemeTables) -> dict[str, "pd.DataFrame"]:
+    """
+    Per-scheme tables: players (league and own-team contexts), teams, and the long team-fit table.
+    """
+    import pandas as pd
+
+    slug = _slug(scheme)
+    order = snapshot.load_order
+    own_raw = np.full(snapshot.n_players, np.nan)
+    own_z = np.full(snapshot.n_players, np.nan)
+    own_rows = order[snapshot.player_team_rows[order] >= 0]
+    own_raw[own_rows], own_z[own_rows] = tables.own_team
+
+    frames = {
+        f"players_{slug}": pd.DataFrame({
+            "Name": [snapshot.names[i] for i in order],
+            "Team": [snapshot.player_teams[i] for i in order],
+            "Raw_TRV": tables.league[0][order],
+            "Z_Score_TRV": tables.league[1][order],
+            "Own_Team_Raw_TRV": own_raw[order],
+            "Own_Team_Z": own_z[order],
+        }),
+        f"teams_{slug}": pd.DataFrame({
+            "Team": list(snapshot.team_names), "Raw_TRV": tables.teams[0], "Z_Score_TRV": tables.teams[1],
+        }),
+    }
+    fit_raw, fit_z = tables.fit
+    if len(fit_raw):
+        n_teams = len(fit_raw)
+        frames[f"team_fit_{slug}"] = pd.DataFrame({
+            "Context_Team": np.repeat(np.asarray(snapshot.team_names, dtype=object), len(order)),
+            "Name": np.tile(np.asarray([snapshot.names[i] for i in order], dtype=object), n_teams),
+            "Team": np.tile(np.asarray([snapshot.player_teams[i] for i in order], dtype=object), n_teams),
+            "Raw_TRV": fit_raw[:, order].ravel(),
+            "Z_Score_TRV": fit_z[:, order].ravel(),
+        })
+    return frames
+
+# === Manifest ===
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _input_files(paths: list[str]) -> dict[str, str]:
+    """
+    Content hashes of the input files (the .npy copy stands in for a missing CSV).
+    """
+    from .storage import binary_paths
+
+    hashes = {}
+    for path in paths:
+        if not os.path.exists(path) and os.path.exists(binary_paths(path)["npy"]):
+            path = binary_paths(path)["npy"]
+        hashes[path] = file_sha256(path)
+    return hashes
+
+def _read_manifest(path: str) -> dict:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _outputs_key(inputs: dict, weights: dict, kind: str) -> str:
+    """
+    Identifies what an output was generated from: input file hashes, the scheme's weights and the layout.
+    """
+    canonical = json.dumps(
+        {"inputs": inputs, "weights": sorted((str(k), float(v)) for k, v in weights.items()),
+         "kind": kind, "version": TABLES_VERSION},
+        sort_keys=True, separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+def _atomic_write_frame(df: "pd.DataFrame", path: str, fmt: str) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    if fmt == "parquet":
+        df.to_parquet(tmp_path, index=False)
+    else:
+        df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+def _up_to_date(previous: dict, path: str, key: str) -> bool:
+    entry = previous.get(path)
+    return (
+        entry is not None and entry.get("inputs_key") == key
+        and os.path.exists(path) and file_sha256(path) == entry.get("sha256")
+    )
+
+def load_custom_schemes(paths: list[str]) -> dict[str, dict]:
+    """
+    Custom weight files: JSON objects of attribute -> weight, named after the file.
+    """
+    schemes = {}
+    for path in paths or []:
+        with open(path) as f:
+            weights = json.load(f)
+        if not isinstance(weights, dict) or not weights:
+            raise ValueError(f"{path}: expected a JSON object of attribute weights")
+        schemes[custom_scheme_name(path)] = {str(k): float(v) for k, v in weights.items()}
+    return schemes
+
+def custom_scheme_name(path: str) -> str:
+    return os.path.splitext(os.path.basename(path))[0]
+
+def build_tables(
+    snapshot: LeagueSnapshot,
+    schemes: dict[str, dict],
+    input_paths: list[str],
+    output_dir: str = DEFAULT_OUTPUT_DIR,
+    formats: list[str] = ("csv",),
+    legacy_dir: str = LEGACY_DIR,
+    team_fit: bool = True,
+    force: bool = False,
+    scheme_files: dict[str, str] = None
+) -> dict:
+    """
+    Compute every table and write the ones whose inputs changed (or whose file was edited or removed).
+    input_paths are the vector files every table derives from; scheme_files maps a scheme to the
+    weight file it was loaded from, which only that scheme's tables depend on.
+    Returns the manifest, which is also written to output_dir/manifest.json.
+    """
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    previous = {} if force else _read_manifest(manifest_path).get("outputs", {})
+    vector_inputs = _input_files(input_paths)
+    scheme_inputs = {scheme: _input_files([path]) for scheme, path in (scheme_files or {}).items()}
+    inputs = dict(vector_inputs)
+    for files in scheme_inputs.values():
+        inputs.update(files)
+
+    def key_for(scheme: str, kind: str) -> str:
+        return _outputs_key({**vector_inputs, **scheme_inputs.get(scheme, {})}, schemes[scheme], kind)
+
+    # Every output path with the key of the inputs it derives from
+    planned = {}
+    for scheme in schemes:
+        slug = _slug(scheme)
+        kinds = ["players", "teams"] + (["team_fit"] if team_fit else [])
+        for kind in kinds:
+            for fmt in formats:
+                path = os.path.join(output_dir, f"{kind}_{slug}.{fmt}")
+                planned[path] = (scheme, f"{kind}_{slug}", fmt, key_for(scheme, kind))
+    if legacy_dir is not None and LEGACY_SCHEME in schemes:
+        for name in ("TRV_League_Table.csv", "player_trv_scores.csv", "trv_league_level_balanced_weights.csv"):
+            path = os.path.join(legacy_dir, name)
+            planned[path] = (LEGACY_SCHEME, name, "csv", key_for(LEGACY_SCHEME, f"legacy:{name}"))
+
+    stale = {path for path, (_, _, _, key) in planned.items() if not _up_to_date(previous, path, key)}
+    outputs = {path: previous[path] for path in planned if path not in stale}
+    if stale:
+        stale_schemes = {planned[path][0]: schemes[planned[path][0]] for path in stale}
+        computed = compute_scheme_tables(snapshot, stale_schemes, team_fit)
+        frames = {}
+        for scheme, tables in computed.items():
+            frames.update(scheme_frames(snapshot, scheme, tables))
+            if scheme == LEGACY_SCHEME and legacy_dir is not None:
+                frames.update(legacy_frames(snapshot, tables))
+        for path in sorted(stale):
+            scheme, table, fmt, key = planned[path]
+            _atomic_write_frame(frames[table], path, fmt)
+            outputs[path] = {"scheme": scheme, "rows": len(frames[table]), "inputs_key": key, "sha256": file_sha256(path)}
+            logger.info("Wrote %s (%d rows)", path, len(frames[table]))
+    logger.info("%d tables written, %d unchanged", len(stale), len(planned) - len(stale))
+
+    manifest = {
+        "generated_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "tables_version": TABLES_VERSION,
+        "snapshot": {"players": snapshot.n_players, "teams": len(snapshot.team_names), "attributes": list(snapshot.attributes)},
+        "inputs": inputs,
+        "schemes": {name: {k: float(v) for k, v in weights.items()} for name, weights in schemes.items()},
+        "outputs": dict(sorted(outputs.items())),
+        "written": sorted(stale),
+    }
+    os.makedirs(output_dir, exist_ok=True)
+    with open(f"{manifest_path}.tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(f"{manifest_path}.tmp", manifest_path)
+    return manifest
+
+def main(argv: list[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Regenerate the TRV league tables for every weight scheme.")
+    parser.add_argument("--schemes", nargs="*", default=DEFAULT_SCHEMES, help="named schemes (see get_weight_scheme)")
+    parser.add_argument("--custom", nargs="*", default=[], help="JSON weight files, one scheme each")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument("--format", nargs="+", choices=["csv", "parquet"], default=["csv"], dest="formats")
+    parser.add_argument("--legacy-dir", default=LEGACY_DIR, help="where the checked-in Balanced tables live")
+    parser.add_argument("--no-legacy", action="store_true", help="leave the checked-in tables alone")
+    parser.add_argument("--no-team-fit", action="store_true", help="skip the every-player-on-every-team tables")
+    parser.add_argument("--force", action="store_true", help="rewrite every table even if its inputs are unchanged")
+    parser.add_argument("--player-vectors", default=PLAYER_PATH)
+    parser.add_argument("--team-vectors", default=TEAM_PATH)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if "parquet" in args.formats:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            parser.error("--format parquet needs pyarrow installed")
+    schemes = {name: get_weight_scheme(name) for name in args.schemes}
+    schemes.update(load_custom_schemes(args.custom))
+    snapshot = load_snapshot(args.player_vectors, args.team_vectors)
+    build_tables(
+        snapshot, schemes, [args.player_vectors, args.team_vectors],
+        args.output_dir, args.formats, None if args.no_legacy else args.legacy_dir,
+        team_fit=not args.no_team_fit, force=args.force,
+        scheme_files={custom_scheme_name(path): path for path in args.custom},
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+# Request/stage timing and a Prometheus text exposition of the service metrics
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable
+
+# Latency buckets (seconds): sub-millisecond cache hits up to multi-second league-wide responses
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+# === Metric types ===
+class Counter:
+    """
+    Monotonic counter with optional labels.
+    """
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}" for key, value in items]
+
+class Histogram:
+    """
+    Cumulative-bucket histogram (Prometheus semantics) with optional labels.
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum]
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values) -> None:
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][position] += 1
+            series[1] += value
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._series.items())
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+class CallbackMetric:
+    """
+    Gauge or counter whose value(s) are read at scrape time, e.g. from the result cache.
+    callback returns a number, or a dict of {label value tuple: number} when labels are set.
+    """
+
+    def __init__(self, name: str, help: str, callback: Callable[[], object], kind: str = "gauge", labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.labels = labels
+        self._callback = callback
+
+    def samples(self) -> list[str]:
+        value = self._callback()
+        if value is None:
+            return []
+        if not self.labels:
+            return [f"{self.name} {_format_value(value)}"]
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(v)}" for key, v in sorted(value.items())]
+
+class MetricsRegistry:
+    """
+    Named metrics rendered together in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self._metrics: dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help: str, labels: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def callback(self, name: str, help: str, callback: Callable[[], object], kind: str = "gauge", labels: tuple[str, ...] = ()) -> CallbackMetric:
+        return self._register(CallbackMetric(name, help, callback, kind, labels))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = MetricsRegistry()
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    "trv_request_seconds", "End-to-end request latency by endpoint.", ("endpoint", "method", "status")
+)
+STAGE_SECONDS = REGISTRY.histogram(
+    "trv_stage_seconds", "Time spent in each request stage.", ("endpoint", "stage")
+)
+REQUEST_ERRORS = REGISTRY.counter(
+    "trv_request_errors_total", "Requests that failed with an unhandled error.", ("endpoint",)
+)
+
+# === Per-request stage timing ===
+class RequestTimer:
+    """
+    Stage durations (seconds) for one request, in the order stages first ran; repeated stages add up.
+    """
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.stages: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def server_timing(self) -> str:
+        """
+        Stage breakdown as a Server-Timing header value (durations in ms).
+        """
+        with self._lock:
+            stages = list(self.stages.items())
+        return ", ".join(f"{name};dur={seconds * 1000.0:.3f}" for name, seconds in stages)
+
+_current_timer: contextvars.ContextVar[RequestTimer] = contextvars.ContextVar("trv_request_timer", default=None)
+
+def start_request(endpoint: str) -> tuple[RequestTimer, contextvars.Token]:
+    timer = RequestTimer(endpoint)
+    return timer, _current_timer.set(timer)
+
+def finish_request(timer: RequestTimer, token: contextvars.Token, method: str, status: int, seconds: float) -> None:
+    _current_timer.reset(token)
+    REQUEST_SECONDS.observe(seconds, timer.endpoint, method, str(status))
+    for stage_name, stage_seconds in list(timer.stages.items()):
+        STAGE_SECONDS.observe(stage_seconds, timer.endpoint, stage_name)
+
+@contextmanager
+def stage(name: str):
+    """
+    Time a block as a named stage of the current request; a no-op outside a request.
+    """
+    timer = _current_timer.get()
+    if timer is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.add(name, time.perf_counter() - started)
+
+def record_error() -> None:
+    """
+    Count a handled error against the current request's endpoint.
+    """
+    timer = _current_timer.get()
+    REQUEST_ERRORS.inc(timer.endpoint if timer is not None else "unknown")
+
+# === ASGI middleware ===
+class MetricsMiddleware:
+    """
+    Records request latency per route and, when the request carries a truthy profile header
+    (X-TRV-Profile: 1), returns the stage breakdown as a Server-Timing response header.
+    """
+
+    def __init__(self, app, profile_header: str = "x-trv-profile"):
+        self.app = app
+        self.profile_header = profile_header.lower().encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        timer, token = start_request(scope["path"])
+        profile = any(
+            name == self.profile_header and value not in (b"", b"0", b"false")
+            for name, value in scope.get("headers", [])
+        )
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if profile:
+                    timer.add("total", time.perf_counter() - started)
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", timer.server_timing().encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            # Label by route template, not raw path, so unknown URLs can't blow up the series count
+            route = scope.get("route")
+            timer.endpoint = getattr(route, "path", "unmatched")
+            timer.stages.pop("total", None)
+            finish_request(timer, token, scope["method"], status, time.perf_counter() - started)
@@ -1,19 +1,13 @@
-#Normalize the data
+#Normalize the data (attribute definitions and statistics come from the shared FeaturePipeline)
 import pandas as pd
+from .features import FeaturePipeline
 
-def zscore_normalize(series: pd.Series) -> pd.Series:
-    return (series - series.mean()) / series.std()
+NORMALIZED_ATTRIBUTES = ("offense", "power", "plate_discipline")
 
-def normalize_player_vectors(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    df["offense"] = zscore_normalize(df["wRC+"])
-    df["power"] = zscore_normalize(df["ISO"])
-    df["plate_discipline"] = zscore_normalize(df["BB%"] / df["K%"])
-    return df[["Name", "Team", "offense", "power", "plate_discipline"]]
+def normalize_player_vectors(df: pd.DataFrame, pipeline: FeaturePipeline = None) -> pd.DataFrame:
+    pipeline = pipeline or FeaturePipeline(NORMALIZED_ATTRIBUTES).fit(df)
+    return pipeline.transform(df)
 
-def normalize_team_vectors(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    df["offense"] = zscore_normalize(df["wRC+"])
-    df["power"] = zscore_normalize(df["ISO"])
-    df["plate_discipline"] = zscore_normalize(df["BB%"] / df["K%"])
-    return df[["Team", "offense", "power", "plate_discipline"]]
\ No newline at end of file
+def normalize_team_vectors(df: pd.DataFrame, pipeline: FeaturePipeline = None) -> pd.DataFrame:
+    pipeline = pipeline or FeaturePipeline(NORMALIZED_ATTRIBUTES, key_columns=("Team",)).fit(df)
+    return pipeline.transform(df)
@@ -0,0 +1,155 @@
+# Search for the best set of roster substitutions for a team
+import time
+from dataclasses import dataclass, field
+import numpy as np
+from .simulator import SubstitutionEvaluator, _candidate_mask, roster_trv_total, swap_delta_matrix
+
+@dataclass(frozen=True)
+class SwapPlan:
+    swaps: tuple[tuple[str, str], ...]  # (player_out, player_in) pairs
+    delta_trv: float
+
+@dataclass
+class OptimizationResult:
+    team_name: str
+    plans: list[SwapPlan]
+    stats: dict = field(default_factory=dict)
+
+@dataclass
+class _Node:
+    roster_sum: np.ndarray
+    total: float
+    out_rows: tuple[int, ...] = ()
+    in_rows: tuple[int, ...] = ()
+
+def _attribute_upper_bound(roster_sum, size, low, high, weight_vector, league_avg_vector) -> float:
+    """
+    Upper bound on the roster total when each attribute sum can move anywhere in [low, high].
+    The total is separable per attribute and each term is a quadratic in S_a, so its max over an
+    interval is at an endpoint or the vertex.
+    """
+    def term(s):
+        return weight_vector * (1.0 - s / size) * (s - size * league_avg_vector)
+
+    lo, hi = roster_sum + low, roster_sum + high
+    best = np.maximum(term(lo), term(hi))
+    # Vertex of (1 - s/n)(s - nL) sits at s = n(1 + L)/2
+    vertex = np.clip(size * (1.0 + league_avg_vector) / 2.0, lo, hi)
+    best = np.maximum(best, term(vertex))
+    return float(best.sum())
+
+def optimize_substitutions(
+    evaluator: SubstitutionEvaluator,
+    team_name: str,
+    max_swaps: int = 3,
+    untouchable: list[str] = None,
+    candidate_pool: list[str] = None,
+    exclude_teams: list[str] = None,
+    max_incoming_per_team: int = None,
+    beam_width: int = 64,
+    n_plans: int = 5,
+    time_budget: float = 2.0
+) -> OptimizationResult:
+    """
+    Beam search over up to max_swaps substitutions with bound-based pruning.
+
+    Each level extends every beam node by one swap, scoring all (out, in) pairs for the node at once.
+    A node is dropped when an optimistic bound on what its remaining swaps could reach cannot beat the
+    n_plans-th best plan found so far. Returns the best distinct plans found within time_budget seconds.
+    """
+    started = time.perf_counter()
+    snapshot = evaluator.snapshot
+    matrix = snapshot.player_matrix
+    names = np.asarray(snapshot.names, dtype=object)
+    teams = np.asarray(snapshot.player_teams, dtype=object)
+    weight_vector, league_avg = evaluator.weight_vector, evaluator.league_avg_vector
+
+    roster = snapshot.roster_slice(team_name)
+    locked = set(untouchable or ())
+    out_rows = np.array([row for row in range(roster.start, roster.stop) if names[row] not in locked], dtype=np.intp)
+    in_rows = np.flatnonzero(_candidate_mask(names, teams, team_name, exclude_teams, candidate_pool))
+    stats = {"nodes_expanded": 0, "nodes_generated": 0, "nodes_pruned": 0, "levels": 0, "timed_out": False}
+    aggregate = evaluator.aggregate(team_name)
+    size = aggregate.size
+    if len(out_rows) == 0 or len(in_rows) == 0 or max_swaps <= 0:
+        stats["elapsed"] = time.perf_counter() - started
+        return OptimizationResult(team_name, [], stats)
+
+    base_total = roster_trv_total(aggregate.roster_sum, size, weight_vector, league_avg)
+    # Per-swap range of the change in each attribute sum, for the pruning bound
+    step_low = matrix[in_rows].min(axis=0) - matrix[out_rows].max(axis=0)
+    step_high = matrix[in_rows].max(axis=0) - matrix[out_rows].min(axis=0)
+    in_team_codes = {team: code for code, team in enumerate(dict.fromkeys(teams[in_rows]))}
+
+    plans: dict[tuple[frozenset, frozenset], SwapPlan] = {}
+    beam = [_Node(aggregate.roster_sum, base_total)]
+
+    def threshold() -> float:
+        if len(plans) < n_plans:
+            return 0.0
+        return sorted(plan.delta_trv for plan in plans.values())[-n_plans]
+
+    for level in range(1, max_swaps + 1):
+        stats["levels"] = level
+        children = []
+        for node in beam:
+            if time.perf_counter() - started > time_budget:
+                stats["timed_out"] = True
+                break
+            stats["nodes_expanded"] += 1
+            outs = out_rows[~np.isin(out_rows, node.out_rows)]
+            ins = in_rows[~np.isin(in_rows, node.in_rows)]
+            if max_incoming_per_team is not None and node.in_rows:
+                counts = np.bincount([in_team_codes[teams[row]] for row in node.in_rows], minlength=len(in_team_codes))
+                ins = ins[counts[[in_team_codes[team] for team in teams[ins]]] < max_incoming_per_team]
+            if len(outs) == 0 or len(ins) == 0:
+                continue
+
+            totals = node.total + swap_delta_matrix(
+                node.roster_sum, size, matrix[outs], matrix[ins], weight_vector, league_avg
+            ).ravel()
+            keep = np.argpartition(-totals, min(beam_width, totals.size) - 1)[:beam_width]
+            for flat in keep:
+                out_row, in_row = outs[flat // len(ins)], ins[flat % len(ins)]
+                children.append(_Node(
+                    node.roster_sum - matrix[out_row] + matrix[in_row],
+                    float(totals[flat]),
+                    node.out_rows + (int(out_row),),
+                    node.in_rows + (int(in_row),),
+                ))
+            stats["nodes_generated"] += len(keep)
+
+        # Only the sets of outgoing and incoming players matter (the roster sum is the same
+        # however they are paired), so plans are keyed on those sets
+        next_beam, seen = [], set()
+        for child in sorted(children, key=lambda c: -c.total):
+            key = (frozenset(child.out_rows), frozenset(child.in_rows))
+            if key in seen:
+                continue
+            seen.add(key)
+            delta = child.total - base_total
+            if delta > 0 and key not in plans:
+                plans[key] = SwapPlan(
+                    tuple((names[o], names[i]) for o, i in zip(child.out_rows, child.in_rows)), delta
+                )
+            if len(next_beam) < beam_width:
+                next_beam.append(child)
+
+        remaining = max_swaps - level
+        if remaining and next_beam:
+            # Anywhere from 0 to `remaining` more swaps can follow a node
+            low, high = np.minimum(0.0, remaining * step_low), np.maximum(0.0, remaining * step_high)
+            bar = threshold() + base_total
+            pruned = [
+                child for child in next_beam
+                if _attribute_upper_bound(child.roster_sum, size, low, high, weight_vector, league_avg) > bar
+            ]
+            stats["nodes_pruned"] += len(next_beam) - len(pruned)
+            next_beam = pruned
+        beam = next_beam
+        if not beam or stats["timed_out"]:
+            break
+
+    stats["elapsed"] = time.perf_counter() - started
+    best = sorted(plans.values(), key=lambda plan: -plan.delta_trv)[:n_plans]
+    return OptimizationResult(team_name, best, stats)
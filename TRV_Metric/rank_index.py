@@ -0,0 +1,132 @@
+# Sorted rank index over one TRV array: top-N (overall / per group), percentiles and value ranges
+from typing import Callable, NamedTuple
+import numpy as np
+from .results import LeagueTRVResult
+from .snapshot import LeagueSnapshot
+
+class RankIndex:
+    """
+    Entries sorted by TRV (descending) once, so queries are binary searches or slices.
+    Rank 1 is the highest TRV; tied entries share a rank (1 + entries strictly above).
+    Percentile is the share of entries strictly below, in percent.
+    Optional groups (teams) are given as integer codes into group_labels. entry_of_name maps a
+    name to its entry (-1 when unknown); by default a dict over names is built.
+    """
+
+    def __init__(
+        self,
+        values,
+        names,
+        group_codes=None,
+        group_labels=None,
+        entry_of_name: Callable[[str], int] = None
+    ):
+        values = np.asarray(values, dtype=float)
+        self.values = values
+        self.names = list(names)
+        self.group_codes = None if group_codes is None else np.asarray(group_codes, dtype=np.intp)
+        self.group_labels = None if group_labels is None else list(group_labels)
+        self.order = np.argsort(-values, kind="stable")
+        # Ascending keys (negated TRVs) for searchsorted
+        self._keys = -values[self.order]
+
+        if entry_of_name is None:
+            # Built back to front so duplicate names resolve to their first entry
+            name_index = dict(zip(reversed(self.names), range(len(self.names) - 1, -1, -1)))
+            entry_of_name = lambda name: name_index.get(name, -1)
+        self.entry_of_name = entry_of_name
+
+        self._group_order = None
+        self._group_slices = {}
+        if self.group_codes is not None:
+            codes = self.group_codes
+            # Stable sort of the TRV-ordered entries by group keeps each group in TRV order
+            self._group_order = self.order[np.argsort(codes[self.order], kind="stable")]
+            bounds = np.searchsorted(codes[self._group_order], np.arange(len(self.group_labels) + 1))
+            for code, label in enumerate(self.group_labels):
+                self._group_slices.setdefault(label, (int(bounds[code]), int(bounds[code + 1])))
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def rank_of_value(self, value: float) -> int:
+        return int(np.searchsorted(self._keys, -value, side="left")) + 1
+
+    def percentile_of_value(self, value: float) -> float:
+        below = len(self) - int(np.searchsorted(self._keys, -value, side="right"))
+        return 100.0 * below / max(len(self), 1)
+
+    def entry(self, entry: int) -> dict:
+        value = float(self.values[entry])
+        row = {"name": self.names[entry], "trv": round(value, 4), "rank": self.rank_of_value(value)}
+        if self.group_codes is not None:
+            row["team"] = self.group_labels[self.group_codes[entry]]
+        return row
+
+    def lookup(self, name: str):
+        """
+        Rank and percentile of an entry by name, or None when unknown.
+        """
+        entry = self.entry_of_name(name)
+        if entry < 0:
+            return None
+        row = self.entry(entry)
+        row["percentile"] = round(self.percentile_of_value(self.values[entry]), 2)
+        row["of"] = len(self)
+        return row
+
+    def top(self, n: int, group: str = None) -> list[dict]:
+        """
+        Highest n entries, overall or within one group (empty for an unknown group, or when
+        the index has no groups).
+        """
+        if group is not None and self._group_order is None:
+            return []
+        if group is None:
+            entries = self.order[:n]
+        else:
+            start, stop = self._group_slices.get(group, (0, 0))
+            entries = self._group_order[start:min(stop, start + n)]
+        return [self.entry(entry) for entry in entries.tolist()]
+
+    def between(self, low: float = None, high: float = None, limit: int = 100, offset: int = 0) -> dict:
+        """
+        Entries with low <= TRV <= high (None = unbounded), highest first; `total` counts all matches.
+        """
+        start = 0 if high is None else int(np.searchsorted(self._keys, -high, side="left"))
+        stop = len(self) if low is None else int(np.searchsorted(self._keys, -low, side="right"))
+        total = max(0, stop - start)
+        entries = self.order[start + offset:min(stop, start + offset + limit)] if total else self.order[:0]
+        return {
+            "low": low,
+            "high": high,
+            "total": total,
+            "offset": offset,
+            "entries": [self.entry(entry) for entry in entries.tolist()],
+        }
+
+class LeagueRanks(NamedTuple):
+    """
+    Rank indexes matching /league_trv/: players against their own team, teams against the league.
+    """
+    players: RankIndex
+    teams: RankIndex
+
+def build_league_ranks(result: LeagueTRVResult, snapshot: LeagueSnapshot) -> LeagueRanks:
+    rows = result.own_team_rows
+    # Reuse the snapshot's name lookup: name -> snapshot row -> entry
+    entry_of_row = np.full(snapshot.n_players, -1, dtype=np.intp)
+    entry_of_row[rows] = np.arange(len(rows))
+
+    def entry_of_name(name: str) -> int:
+        row = snapshot.player_row(name)
+        return int(entry_of_row[row]) if row >= 0 else -1
+
+    players = RankIndex(
+        result.own_team_z,
+        [snapshot.names[row] for row in rows.tolist()],
+        snapshot.player_team_rows[rows],
+        snapshot.team_names,
+        entry_of_name,
+    )
+    return LeagueRanks(players, RankIndex(result.team_z, snapshot.team_names))
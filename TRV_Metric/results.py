@@ -0,0 +1,58 @@
+# League-wide TRV results for one weight set, shared by the endpoints
+from dataclasses import dataclass
+import numpy as np
+from .calculator import align_weights, batch_trv_zscores
+from .snapshot import LeagueSnapshot
+
+@dataclass(frozen=True)
+class LeagueTRVResult:
+    """
+    Every TRV the endpoints serve for one (weights, snapshot) pair.
+    player_* arrays follow snapshot row order and score players against the league-average team;
+    own_team_* arrays cover own_team_rows (load order, players with a known team) against their own team.
+    """
+    snapshot_version: int
+    weights: dict
+    player_raw: np.ndarray
+    player_z: np.ndarray
+    team_raw: np.ndarray
+    team_z: np.ndarray
+    own_team_rows: np.ndarray
+    own_team_raw: np.ndarray
+    own_team_z: np.ndarray
+
+def compute_league_result(snapshot: LeagueSnapshot, weights: dict) -> LeagueTRVResult:
+    """
+    Run the batch engine for every player and team context the API exposes.
+    """
+    weight_vector, offset = align_weights(weights, snapshot.attributes)
+    league_avg = snapshot.league_avg_vector
+
+    player_raw, player_z = batch_trv_zscores(
+        snapshot.player_matrix, snapshot.team_mean_vector, weight_vector, league_avg, offset
+    )
+    team_raw, team_z = batch_trv_zscores(
+        snapshot.team_matrix, league_avg, weight_vector, league_avg, offset
+    )
+    rows = snapshot.load_order[snapshot.player_team_rows[snapshot.load_order] >= 0]
+    own_team_raw, own_team_z = batch_trv_zscores(
+        snapshot.player_matrix[rows],
+        snapshot.team_matrix[snapshot.player_team_rows[rows]],
+        weight_vector,
+        league_avg,
+        offset
+    )
+
+    for array in (player_raw, player_z, team_raw, team_z, rows, own_team_raw, own_team_z):
+        array.setflags(write=False)
+    return LeagueTRVResult(
+        snapshot_version=snapshot.version,
+        weights=dict(weights),
+        player_raw=player_raw,
+        player_z=player_z,
+        team_raw=team_raw,
+        team_z=team_z,
+        own_team_rows=rows,
+        own_team_raw=own_team_raw,
+        own_team_z=own_team_z,
+    )
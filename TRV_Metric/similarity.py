@@ -0,0 +1,70 @@
+# Nearest-neighbor index over player attribute vectors: k-NN and radius queries in sublinear time
+import math
+import numpy as np
+
+# Few enough candidates that scoring them all beats querying a tree
+BRUTE_FORCE_CANDIDATES = 4096
+
+def weight_scale(weights: dict, attributes: tuple[str, ...]) -> np.ndarray:
+    """
+    Per-attribute scale for weighted distances: distance^2 = sum_a |w_a| * (x_a - y_a)^2.
+    Attributes without a weight drop out of the distance.
+    """
+    return np.array([math.sqrt(abs(float(weights.get(attr, 0.0)))) for attr in attributes])
+
+class SimilarityIndex:
+    """
+    KD-tree over the rows of an attribute matrix, optionally scaled per attribute (see weight_scale).
+    Rows are the matrix's rows, so with a snapshot's player_matrix they are snapshot player rows.
+    Queries take vectors in unscaled attribute units. scipy is imported on first build only.
+    """
+
+    def __init__(self, matrix: np.ndarray, scale: np.ndarray = None, leafsize: int = 32):
+        from scipy.spatial import cKDTree
+
+        matrix = np.asarray(matrix, dtype=float)
+        self.scale = None if scale is None else np.asarray(scale, dtype=float)
+        points = matrix if self.scale is None else matrix * self.scale
+        self.n = len(points)
+        # Sliding-midpoint splits without node shrinking build ~2.5x faster and query as fast on this data
+        self.tree = cKDTree(points, leafsize=leafsize, balanced_tree=False, compact_nodes=False)
+
+    def __len__(self) -> int:
+        return self.n
+
+    def _point(self, vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=float)
+        return vector if self.scale is None else vector * self.scale
+
+    def nearest(self, vector, k: int, mask: np.ndarray = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Rows and distances of the k rows closest to vector, nearest first.
+        mask (bool per row) restricts the result; the tree is asked for more neighbors until
+        k rows pass it or every row has been seen.
+        """
+        k = min(k, self.n)
+        if k <= 0:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        point = self._point(vector)
+        want = k if mask is None else min(self.n, 2 * k + 16)
+        while True:
+            distances, rows = self.tree.query(point, k=want)
+            distances, rows = np.atleast_1d(distances), np.atleast_1d(rows)
+            if mask is not None:
+                keep = mask[rows]
+                distances, rows = distances[keep], rows[keep]
+            if len(rows) >= k or want >= self.n:
+                return rows[:k], distances[:k]
+            want = min(self.n, want * 4)
+
+    def within(self, vector, radius: float, mask: np.ndarray = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Rows and distances of every row within radius of vector, nearest first.
+        """
+        point = self._point(vector)
+        rows = np.asarray(self.tree.query_ball_point(point, radius), dtype=np.intp)
+        if mask is not None:
+            rows = rows[mask[rows]]
+        distances = np.sqrt(((self.tree.data[rows] - point) ** 2).sum(axis=1))
+        order = np.argsort(distances, kind="stable")
+        return rows[order], distances[order]
@@ -1,6 +1,20 @@
 # This simulates when we replace a player
+from dataclasses import dataclass
+from typing import NamedTuple
+import numpy as np
 import pandas as pd
 from .calculator import calculate_trv
+from .compact_store import WhatIfView
+from .similarity import BRUTE_FORCE_CANDIDATES, SimilarityIndex
+from .snapshot import LeagueSnapshot
+
+def _league_avg(player_df: pd.DataFrame, attribute_cols: list, league_avg_vector: dict = None) -> dict:
+    """
+    League average used for the TRV delta term; defaults to the player table mean (as the API does).
+    """
+    if league_avg_vector is not None:
+        return league_avg_vector
+    return player_df[attribute_cols].mean().to_dict()
 
 def simulate_substitution(
     team_name: str,
@@ -8,7 +22,8 @@ def simulate_substitution(
     player_df: pd.DataFrame,
     player_out: str,
     player_in: str,
-    weights: dict
+    weights: dict,
+    league_avg_vector: dict = None
 ) -> pd.DataFrame:
     """
     Simulate replacing one player on a team with another, and recalculate TRVs.
@@ -19,12 +34,13 @@ def simulate_substitution(
     current_team = player_df[player_df["Team"] == team_name].copy()
     attribute_cols = [col for col in weights.keys() if col in current_team.columns]
     filtered_weights = {k: weights[k] for k in attribute_cols}
+    league_avg = _league_avg(player_df, attribute_cols, league_avg_vector)
 
     # Compute baseline team vector and TRVs
     team_vector_before = current_team[attribute_cols].mean()
     def row_to_vector(row): return {attr: row[attr] for attr in attribute_cols}
     current_team["TRV_before"] = current_team.apply(
-        lambda row: calculate_trv(row_to_vector(row), team_vector_before.to_dict(), filtered_weights),
+        lambda row: calculate_trv(row_to_vector(row), team_vector_before.to_dict(), filtered_weights, league_avg),
         axis=1
     )
     total_trv_before = current_team["TRV_before"].sum()
@@ -53,7 +69,7 @@ def simulate_substitution(
 
     # Step 4: Compute new team TRV
     current_team["TRV_after"] = current_team.apply(
-        lambda row: calculate_trv(row_to_vector(row), team_vector_after.to_dict(), filtered_weights),
+        lambda row: calculate_trv(row_to_vector(row), team_vector_after.to_dict(), filtered_weights, league_avg),
         axis=1
     )
     total_trv_after = current_team["TRV_after"].sum()
@@ -65,7 +81,7 @@ def simulate_substitution(
 
     # Step 5: Recalculate global TRVs using new team profile
     player_df["TRV"] = player_df.apply(
-        lambda row: calculate_trv(row_to_vector(row), team_vector_after.to_dict(), filtered_weights),
+        lambda row: calculate_trv(row_to_vector(row), team_vector_after.to_dict(), filtered_weights, league_avg),
         axis=1
     )
 
@@ -76,7 +92,8 @@ def simulate_multi_substitution(
     team_df: pd.DataFrame,
     player_df: pd.DataFrame,
     substitutions: list[tuple[str, str]],  # List of (out, in) pairs
-    weights: dict
+    weights: dict,
+    league_avg_vector: dict = None
 ) -> pd.DataFrame:
     """
     Simulate multiple player substitutions on a team and print full TRV delta impact.
@@ -86,12 +103,13 @@ def simulate_multi_substitution(
     current_team = player_df[player_df["Team"] == team_name].copy()
     attribute_cols = [col for col in weights if col in current_team.columns]
     filtered_weights = {k: weights[k] for k in attribute_cols}
+    league_avg = _league_avg(player_df, attribute_cols, league_avg_vector)
 
     # Step 2: Compute baseline TRV
     team_vector_before = current_team[attribute_cols].mean()
     def row_to_vector(row): return {attr: row[attr] for attr in attribute_cols}
     current_team["TRV_before"] = current_team.apply(
-        lambda row: calculate_trv(row_to_vector(row), team_vector_before.to_dict(), filtered_weights),
+        lambda row: calculate_trv(row_to_vector(row), team_vector_before.to_dict(), filtered_weights, league_avg),
         axis=1
     )
     total_trv_before = current_team["TRV_before"].sum()
@@ -118,7 +136,7 @@ def simulate_multi_substitution(
         print(f"  {attr:<18} | Before: {before:+.3f} | After: {after:+.3f} | Δ: {after - before:+.3f}")
 
     current_team["TRV_after"] = current_team.apply(
-        lambda row: calculate_trv(row_to_vector(row), team_vector_after.to_dict(), filtered_weights),
+        lambda row: calculate_trv(row_to_vector(row), team_vector_after.to_dict(), filtered_weights, league_avg),
         axis=1
     )
     total_trv_after = current_team["TRV_after"].sum()
@@ -130,7 +148,7 @@ def simulate_multi_substitution(
 
     # Final global TRV recalculation
     player_df["TRV"] = player_df.apply(
-        lambda row: calculate_trv(row_to_vector(row), team_vector_after.to_dict(), filtered_weights),
+        lambda row: calculate_trv(row_to_vector(row), team_vector_after.to_dict(), filtered_weights, league_avg),
         axis=1
     )
 
@@ -140,81 +158,318 @@ def get_substitution_delta_trv(
     player_df: pd.DataFrame,
     player_out: str,
     player_in: str,
-    weights: dict
+    weights: dict,
+    league_avg_vector: dict = None
 ) -> float:
     """
     API-style helper function to get only the delta TRV value for a player substitution.
     Useful for recommendation systems or endpoint responses.
+    Computed in closed form from roster sums; player_df is not modified.
     """
-    current_team = player_df[player_df["Team"] == team_name].copy()
-    attribute_cols = [col for col in weights.keys() if col in current_team.columns]
-    filtered_weights = {k: weights[k] for k in attribute_cols}
+    attribute_cols = [col for col in weights.keys() if col in player_df.columns]
+    weight_vector = np.array([weights[col] for col in attribute_cols], dtype=float)
+    league_avg = _league_avg(player_df, attribute_cols, league_avg_vector)
+    league_vector = np.array([league_avg.get(col, 0.0) for col in attribute_cols], dtype=float)
 
-    # Baseline TRV
-    team_vector_before = current_team[attribute_cols].mean()
-    def row_to_vector(row): return {attr: row[attr] for attr in attribute_cols}
-    current_team["TRV_before"] = current_team.apply(
-        lambda row: calculate_trv(row_to_vector(row), team_vector_before.to_dict(), filtered_weights),
-        axis=1
-    )
-    total_trv_before = current_team["TRV_before"].sum()
-
-    # Apply substitution
-    current_team = current_team[current_team["Name"] != player_out]
-    incoming = player_df[player_df["Name"] == player_in].copy()
-    if incoming.empty:
+    matrix = player_df[attribute_cols].to_numpy(dtype=float)
+    names = player_df["Name"].to_numpy()
+    on_team = player_df["Team"].to_numpy() == team_name
+    outgoing = on_team & (names == player_out)
+    incoming = names == player_in
+    if not incoming.any():
         raise ValueError(f"Replacement player '{player_in}' not found.")
-    player_df.loc[player_df["Name"] == player_in, "Team"] = team_name
-    current_team = pd.concat([current_team, incoming], ignore_index=True)
 
-    # New TRV
-    team_vector_after = current_team[attribute_cols].mean()
-    current_team["TRV_after"] = current_team.apply(
-        lambda row: calculate_trv(row_to_vector(row), team_vector_after.to_dict(), filtered_weights),
-        axis=1
-    )
-    total_trv_after = current_team["TRV_after"].sum()
+    roster_sum = matrix[on_team].sum(axis=0)
+    size = int(on_team.sum())
+    new_sum = roster_sum - matrix[outgoing].sum(axis=0) + matrix[incoming].sum(axis=0)
+    new_size = size - int(outgoing.sum()) + int(incoming.sum())
 
-    return total_trv_after - total_trv_before
+    return (
+        roster_trv_total(new_sum, new_size, weight_vector, league_vector)
+        - roster_trv_total(roster_sum, size, weight_vector, league_vector)
+    )
 def recommend_trades(
     team_name: str,
     player_df: pd.DataFrame,
     weights: dict,
-    top_n: int = 5
-) -> list[tuple[str, str, float]]:
+    top_n: int = 5,
+    exclude_teams: list[str] = None,
+    candidate_pool: list[str] = None,
+    league_avg_vector: dict = None
+) -> list["TradeRecommendation"]:
     """
     Recommend top_n player substitutions that would improve the team's TRV the most.
-    Returns a list of tuples: (player_out, player_in, delta_trv).
-    """
-    current_team = player_df[player_df["Team"] == team_name]
-    all_other_players = player_df[player_df["Team"] != team_name]
-    recommendations = []
-
-    for _, player_out_row in current_team.iterrows():
-        for _, player_in_row in all_other_players.iterrows():
-            try:
-                delta = get_substitution_delta_trv(
-                    team_name,
-                    player_df.copy(),
-                    player_out=player_out_row["Name"],
-                    player_in=player_in_row["Name"],
-                    weights=weights
-                )
-                if delta > 0:
-                    recommendations.append((
-                        player_out_row["Name"],
-                        player_in_row["Name"],
-                        delta
-                    ))
-            except Exception:
-                continue
-
-    recommendations.sort(key=lambda x: x[2], reverse=True)
-    top_recommendations = recommendations[:top_n]
-    if not top_recommendations:
-        print(f"\n⚠️  No trade recommendations available for {team_name}.")
-    else:
-        print(f"\nTop trade recommendations for {team_name}:")
-        for out_player, in_player, delta in top_recommendations:
-            print(f"  Replace {out_player} with {in_player} (Δ TRV: {delta:+.3f})")
-    return top_recommendations
\ No newline at end of file
+    Scores every (roster player, outside player) pair at once; only positive deltas are returned.
+    exclude_teams drops incoming candidates from those teams and candidate_pool
+    (e.g. a position-filtered list of names) restricts them to the given players.
+    """
+    attribute_cols = [col for col in weights.keys() if col in player_df.columns]
+    weight_vector = np.array([weights[col] for col in attribute_cols], dtype=float)
+    league_avg = _league_avg(player_df, attribute_cols, league_avg_vector)
+    league_vector = np.array([league_avg.get(col, 0.0) for col in attribute_cols], dtype=float)
+
+    matrix = player_df[attribute_cols].to_numpy(dtype=float)
+    names = player_df["Name"].to_numpy()
+    teams = player_df["Team"].to_numpy()
+    on_team = teams == team_name
+    candidates = _candidate_mask(names, teams, team_name, exclude_teams, candidate_pool)
+
+    found = top_k_trades(
+        matrix, np.flatnonzero(on_team), np.flatnonzero(candidates),
+        weight_vector, league_vector, top_n
+    )
+    return [
+        TradeRecommendation(names[out_row], names[in_row], delta, teams[in_row])
+        for out_row, in_row, delta in found
+    ]
+
+# === Incremental substitution ===
+def roster_trv_total(roster_sum: np.ndarray, size: int, weight_vector: np.ndarray, league_avg_vector: np.ndarray) -> float:
+    """
+    Sum of calculate_trv over a roster, scored against the roster's own mean, from its attribute sums.
+    sum_p sum_a w_a * (1 - S_a / n) * (p_a - L_a) == sum_a w_a * (1 - S_a / n) * (S_a - n * L_a)
+    """
+    if size <= 0:
+        return 0.0
+    return float(np.dot(weight_vector, (1.0 - roster_sum / size) * (roster_sum - size * league_avg_vector)))
+
+@dataclass(frozen=True)
+class TeamAggregate:
+    """
+    Running roster state for one team: attribute sums and roster size.
+    """
+    team_name: str
+    roster_sum: np.ndarray
+    size: int
+
+    def substitute(self, out_vector: np.ndarray, in_vector: np.ndarray) -> "TeamAggregate":
+        """
+        New aggregate with one player swapped for another; the original is unchanged.
+        """
+        return TeamAggregate(self.team_name, self.roster_sum - out_vector + in_vector, self.size)
+
+class SubstitutionEvaluator:
+    """
+    O(attributes) substitution deltas against a shared LeagueSnapshot.
+    Per-team aggregates are built once and reused; the snapshot is never modified.
+    """
+
+    def __init__(self, snapshot: LeagueSnapshot, weights: dict, league_avg_vector: np.ndarray = None):
+        self.snapshot = snapshot
+        self.weight_vector = np.array(
+            [float(weights[attr]) if attr in weights else 0.0 for attr in snapshot.attributes]
+        )
+        self.league_avg_vector = (
+            snapshot.league_avg_vector if league_avg_vector is None else np.asarray(league_avg_vector, dtype=float)
+        )
+        self._aggregates: dict[str, TeamAggregate] = {}
+        self._index: SimilarityIndex = None
+
+    def aggregate(self, team_name: str) -> TeamAggregate:
+        aggregate = self._aggregates.get(team_name)
+        if aggregate is None:
+            roster = self.snapshot.player_matrix[self.snapshot.roster_slice(team_name)]
+            aggregate = TeamAggregate(team_name, roster.sum(axis=0), len(roster))
+            self._aggregates[team_name] = aggregate
+        return aggregate
+
+    def similarity_index(self) -> SimilarityIndex:
+        """
+        Players scaled by sqrt(|w|), built on first use and reused by every recommend() call.
+        """
+        if self._index is None:
+            self._index = SimilarityIndex(self.snapshot.player_matrix, np.sqrt(np.abs(self.weight_vector)))
+        return self._index
+
+    def total(self, aggregate: TeamAggregate) -> float:
+        return roster_trv_total(aggregate.roster_sum, aggregate.size, self.weight_vector, self.league_avg_vector)
+
+    def _vector(self, name: str, label: str) -> np.ndarray:
+        row = self.snapshot.player_row(name)
+        if row < 0:
+            raise ValueError(f"{label} player '{name}' not found.")
+        return self.snapshot.player_matrix[row]
+
+    def delta(self, team_name: str, player_out: str, player_in: str) -> float:
+        """
+        TRV change for the team when player_out (on the roster) is replaced by player_in.
+        """
+        aggregate = self.aggregate(team_name)
+        roster = self.snapshot.roster_slice(team_name)
+        out_row = self.snapshot.player_row(player_out)
+        if not roster.start <= out_row < roster.stop:
+            raise ValueError(f"Outgoing player '{player_out}' is not on {team_name}.")
+        after = aggregate.substitute(self.snapshot.player_matrix[out_row], self._vector(player_in, "Replacement"))
+        return self.total(after) - self.total(aggregate)
+
+    def delta_many(self, team_name: str, substitutions: list[tuple[str, str]]) -> float:
+        """
+        TRV change for applying several (out, in) swaps together.
+        """
+        aggregate = self.aggregate(team_name)
+        after = aggregate
+        for out_name, in_name in substitutions:
+            after = after.substitute(self._vector(out_name, "Outgoing"), self._vector(in_name, "Incoming"))
+        return self.total(after) - self.total(aggregate)
+
+    def recommend(
+        self,
+        team_name: str,
+        top_n: int = 5,
+        exclude_teams: list[str] = None,
+        candidate_pool: list[str] = None,
+        min_delta: float = 0.0
+    ) -> list["TradeRecommendation"]:
+        """
+        Best single swaps for a team over the whole league (see recommend_trades).
+        Large candidate pools are first pruned to each outgoing player's nearest ideal
+        replacements (see prune_candidates), which is exact when no weight is negative.
+        """
+        snapshot = self.snapshot
+        names = np.asarray(snapshot.names, dtype=object)
+        teams = np.asarray(snapshot.player_teams, dtype=object)
+        roster = snapshot.roster_slice(team_name)
+        roster_rows = np.arange(roster.start, roster.stop)
+        candidates = _candidate_mask(names, teams, team_name, exclude_teams, candidate_pool)
+        candidate_rows = np.flatnonzero(candidates)
+        if len(candidate_rows) > BRUTE_FORCE_CANDIDATES and (self.weight_vector >= 0).all():
+            candidate_rows = prune_candidates(
+                self.similarity_index(), snapshot.player_matrix, roster_rows, candidates,
+                self.league_avg_vector, top_n
+            )
+        found = top_k_trades(
+            snapshot.player_matrix, roster_rows, candidate_rows,
+            self.weight_vector, self.league_avg_vector, top_n, min_delta
+        )
+        return [
+            TradeRecommendation(names[out_row], names[in_row], delta, teams[in_row])
+            for out_row, in_row, delta in found
+        ]
+
+# === Trade search ===
+def simulate_moves(view: WhatIfView, weights: dict, season: int) -> list[dict]:
+    """
+    Roster TRV totals before and after a what-if view's edits, for every team the edits touch in
+    one season, against that season's league average. The store behind the view is never copied.
+    """
+    store = view.store
+    start, stop = store.season_range(season)
+    weight_vector = np.array([float(weights.get(attr, 0.0)) for attr in store.attributes])
+    league_avg = store.matrix[start:stop].mean(axis=0, dtype=float)
+    rows = [row for row in view.changed_rows if start <= row < stop]
+    teams = sorted({store.team_labels[store.team_codes[row]] for row in rows} | {view.team_of(row) for row in rows})
+
+    impacts = []
+    for team in teams:
+        before_rows, after_rows = store.roster_rows(team, season), view.roster_rows(team, season)
+        before_sum, after_sum = store.vectors(before_rows).sum(axis=0), view.vectors(after_rows).sum(axis=0)
+        before = roster_trv_total(before_sum, len(before_rows), weight_vector, league_avg)
+        after = roster_trv_total(after_sum, len(after_rows), weight_vector, league_avg)
+        impacts.append({
+            "team": team,
+            "size_before": len(before_rows),
+            "size_after": len(after_rows),
+            "total_trv_before": before,
+            "total_trv_after": after,
+            "delta": after - before,
+            "team_vector_before": before_sum / max(len(before_rows), 1),
+            "team_vector_after": after_sum / max(len(after_rows), 1),
+        })
+    return impacts
+
+class TradeRecommendation(NamedTuple):
+    player_out: str
+    player_in: str
+    delta_trv: float
+    from_team: str
+
+def _candidate_mask(names, teams, team_name, exclude_teams=None, candidate_pool=None) -> np.ndarray:
+    mask = teams != team_name
+    if exclude_teams:
+        mask &= ~np.isin(teams, list(exclude_teams))
+    if candidate_pool is not None:
+        mask &= np.isin(names, list(candidate_pool))
+    return mask
+
+def ideal_incoming(roster_sum: np.ndarray, size: int, out_vector: np.ndarray, league_avg_vector: np.ndarray) -> np.ndarray:
+    """
+    Incoming vector that maximizes the roster total when out_vector leaves.
+    Per attribute the total is -(w_a / n) * (S_a - n * (1 + L_a) / 2)^2 + const in the new sum S,
+    so for weights >= 0 a swap's delta falls with the sqrt(w)-scaled distance from this point.
+    """
+    return size * (1.0 + league_avg_vector) / 2.0 - roster_sum + out_vector
+
+def prune_candidates(
+    index: SimilarityIndex,
+    matrix: np.ndarray,
+    roster_rows: np.ndarray,
+    candidate_mask: np.ndarray,
+    league_avg_vector: np.ndarray,
+    k: int
+) -> np.ndarray:
+    """
+    Candidate rows that can make the top-k swaps: the k eligible players nearest each outgoing
+    player's ideal replacement. index must be scaled by sqrt(w) with every weight >= 0.
+    """
+    out_matrix = matrix[roster_rows]
+    roster_sum = out_matrix.sum(axis=0)
+    found = [
+        index.nearest(ideal_incoming(roster_sum, len(roster_rows), out_vector, league_avg_vector), k, candidate_mask)[0]
+        for out_vector in out_matrix
+    ]
+    return np.unique(np.concatenate(found)) if found else np.empty(0, dtype=np.intp)
+
+def swap_delta_matrix(
+    roster_sum: np.ndarray,
+    size: int,
+    out_matrix: np.ndarray,
+    in_matrix: np.ndarray,
+    weight_vector: np.ndarray,
+    league_avg_vector: np.ndarray
+) -> np.ndarray:
+    """
+    TRV delta for every (outgoing, incoming) pair as an (n_out, n_in) matrix.
+    """
+    before = roster_trv_total(roster_sum, size, weight_vector, league_avg_vector)
+    new_sum = roster_sum + in_matrix[np.newaxis, :, :] - out_matrix[:, np.newaxis, :]
+    after = ((1.0 - new_sum / size) * (new_sum - size * league_avg_vector)) @ weight_vector
+    return after - before
+
+def top_k_trades(
+    matrix: np.ndarray,
+    roster_rows: np.ndarray,
+    candidate_rows: np.ndarray,
+    weight_vector: np.ndarray,
+    league_avg_vector: np.ndarray,
+    k: int,
+    min_delta: float = 0.0,
+    chunk_size: int = 65536
+) -> list[tuple[int, int, float]]:
+    """
+    Top-k (out_row, in_row, delta) swaps with delta > min_delta, best first.
+    Candidates are scored in chunks and reduced with a partial sort, so memory stays at n_out x chunk_size.
+    """
+    if k <= 0 or len(roster_rows) == 0 or len(candidate_rows) == 0:
+        return []
+    out_matrix = matrix[roster_rows]
+    roster_sum = out_matrix.sum(axis=0)
+    size = len(roster_rows)
+
+    best_deltas = np.empty(0)
+    best_pairs = np.empty((0, 2), dtype=np.intp)
+    for start in range(0, len(candidate_rows), chunk_size):
+        chunk = candidate_rows[start:start + chunk_size]
+        deltas = swap_delta_matrix(roster_sum, size, out_matrix, matrix[chunk], weight_vector, league_avg_vector).ravel()
+        keep = np.flatnonzero(deltas > min_delta)
+        if len(keep) > k:
+            keep = keep[np.argpartition(-deltas[keep], k - 1)[:k]]
+        out_idx, in_idx = np.divmod(keep, len(chunk))
+        best_deltas = np.concatenate([best_deltas, deltas[keep]])
+        best_pairs = np.concatenate([best_pairs, np.column_stack([roster_rows[out_idx], chunk[in_idx]])])
+        if len(best_deltas) > k:
+            top = np.argpartition(-best_deltas, k - 1)[:k]
+            best_deltas, best_pairs = best_deltas[top], best_pairs[top]
+
+    # Best first; ties keep roster-then-candidate order
+    order = np.lexsort((best_pairs[:, 1], best_pairs[:, 0], -best_deltas))
+    return [(int(best_pairs[i, 0]), int(best_pairs[i, 1]), float(best_deltas[i])) for i in order]
@@ -0,0 +1,162 @@
+# Immutable in-memory view of the league data, built once per data load
+import itertools
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Mapping
+import numpy as np
+from .storage import VectorTable, load_vectors, table_from_frame
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+PLAYER_PATH = "Data/Processed/player_vectors.csv"
+TEAM_PATH = "Data/Processed/team_vectors.csv"
+
+_versions = itertools.count(1)
+
+def _frozen(array: np.ndarray) -> np.ndarray:
+    array = np.ascontiguousarray(array, dtype=float)
+    if array.flags.writeable:
+        array.setflags(write=False)
+    return array
+
+@dataclass(frozen=True)
+class LeagueSnapshot:
+    """
+    Player and team vectors as read-only float arrays plus the lookup indexes every endpoint needs.
+    Player rows are stored grouped by team so each roster is one contiguous row range.
+    """
+    version: int
+    attributes: tuple[str, ...]
+    names: tuple[str, ...]
+    player_teams: tuple[str, ...]
+    player_matrix: np.ndarray
+    team_names: tuple[str, ...]
+    team_matrix: np.ndarray
+    league_avg_vector: np.ndarray
+    team_mean_vector: np.ndarray
+    name_index: Mapping[str, int]
+    team_ranges: Mapping[str, tuple[int, int]]
+    team_index: Mapping[str, int]
+    player_team_rows: np.ndarray
+    load_order: np.ndarray
+
+    @property
+    def n_players(self) -> int:
+        return len(self.names)
+
+    def roster_slice(self, team_name: str) -> slice:
+        """
+        Row range of a team's players; empty for unknown teams.
+        """
+        start, stop = self.team_ranges.get(team_name, (0, 0))
+        return slice(start, stop)
+
+    def roster_names(self, team_name: str) -> list[str]:
+        return list(self.names[self.roster_slice(team_name)])
+
+    def player_row(self, name: str) -> int:
+        """
+        Row of a player in player_matrix, or -1 when the name is unknown.
+        """
+        return self.name_index.get(name, -1)
+
+    def team_vector(self, team_name: str) -> np.ndarray:
+        """
+        Team profile from the team table; raises KeyError for unknown teams.
+        """
+        return self.team_matrix[self.team_index[team_name]]
+
+    def player_frame(self) -> "pd.DataFrame":
+        """
+        Fresh DataFrame copy of the player table in original load order, for DataFrame-based tooling.
+        """
+        import pandas as pd
+
+        df = pd.DataFrame(self.player_matrix[self.load_order], columns=list(self.attributes))
+        df.insert(0, "Team", [self.player_teams[i] for i in self.load_order])
+        df.insert(0, "Name", [self.names[i] for i in self.load_order])
+        return df
+
+def build_snapshot(player_df: "pd.DataFrame", team_df: "pd.DataFrame") -> LeagueSnapshot:
+    """
+    Build a snapshot from player/team vector frames in the Data/Processed layout.
+    """
+    return build_snapshot_from_tables(
+        table_from_frame(player_df, ["Name", "Team"]),
+        table_from_frame(team_df, ["Team"]),
+    )
+
+def build_snapshot_from_tables(players: VectorTable, teams: VectorTable) -> LeagueSnapshot:
+    """
+    Build a snapshot from loaded vector tables. A player matrix already grouped by team
+    (as the binary store writes it) is used as-is, so a memory-mapped file is not copied.
+    """
+    attributes = players.attributes
+    # One str object per distinct team rather than one per player row
+    interned = {}
+    player_teams = [interned.setdefault(team, team) for team in map(str, players.keys["Team"])]
+
+    # Group players by team (stable, so roster order matches the source file)
+    order = np.argsort(np.asarray(player_teams, dtype=object).astype(str), kind="stable")
+    if np.array_equal(order, np.arange(len(order))):
+        player_matrix = players.matrix
+        names = tuple(players.keys["Name"])
+        source_rows = np.asarray(players.source_rows)
+    else:
+        player_matrix = np.asarray(players.matrix)[order]
+        names = tuple(players.keys["Name"][i] for i in order)
+        player_teams = [player_teams[i] for i in order]
+        source_rows = np.asarray(players.source_rows)[order]
+    player_teams = tuple(player_teams)
+    player_matrix = _frozen(player_matrix)
+
+    team_ranges = {}
+    for row, team in enumerate(player_teams):
+        start, _ = team_ranges.get(team, (row, row))
+        team_ranges[team] = (start, row + 1)
+
+    team_names = tuple(str(team) for team in teams.keys["Team"])
+    team_columns = [teams.attributes.index(attr) for attr in attributes]
+    team_matrix = _frozen(np.asarray(teams.matrix)[np.argsort(teams.source_rows)][:, team_columns])
+    team_names = tuple(team_names[i] for i in np.argsort(teams.source_rows))
+    team_index = {}
+    for row, team in enumerate(team_names):
+        team_index.setdefault(team, row)
+
+    name_index = {}
+    for row, name in enumerate(names):
+        name_index.setdefault(name, row)
+
+    player_team_rows = np.array([team_index.get(team, -1) for team in player_teams], dtype=np.intp)
+    player_team_rows.setflags(write=False)
+    # load_order[i] is the snapshot row of the i-th player in the source file
+    load_order = np.empty(len(source_rows), dtype=np.intp)
+    load_order[source_rows] = np.arange(len(source_rows))
+    load_order.setflags(write=False)
+
+    return LeagueSnapshot(
+        version=next(_versions),
+        attributes=attributes,
+        names=names,
+        player_teams=player_teams,
+        player_matrix=player_matrix,
+        team_names=team_names,
+        team_matrix=team_matrix,
+        league_avg_vector=_frozen(player_matrix.mean(axis=0)),
+        team_mean_vector=_frozen(team_matrix.mean(axis=0)),
+        name_index=MappingProxyType(name_index),
+        team_ranges=MappingProxyType(team_ranges),
+        team_index=MappingProxyType(team_index),
+        player_team_rows=player_team_rows,
+        load_order=load_order,
+    )
+
+def load_snapshot(player_path: str = PLAYER_PATH, team_path: str = TEAM_PATH) -> LeagueSnapshot:
+    """
+    Load the processed vector tables (binary copies when fresh, else CSV) and build a snapshot.
+    """
+    return build_snapshot_from_tables(
+        load_vectors(player_path, ["Name", "Team"]),
+        load_vectors(team_path, ["Team"]),
+    )
@@ -0,0 +1,138 @@
+# Binary copies of the processed vector tables: memory-mapped .npy matrix (+ optional Parquet)
+import argparse
+import json
+import os
+from typing import TYPE_CHECKING, NamedTuple
+import numpy as np
+
+# pandas is only needed for CSV/Parquet input and DataFrame output; the .npy path avoids importing it
+if TYPE_CHECKING:
+    import pandas as pd
+
+class VectorTable(NamedTuple):
+    """
+    A processed vector table split into its key columns (Name/Team) and a float attribute matrix.
+    source_rows[i] is the position of row i in the original CSV.
+    """
+    keys: dict[str, list]
+    attributes: tuple[str, ...]
+    matrix: np.ndarray
+    source_rows: np.ndarray
+    source: str
+
+    def to_frame(self) -> "pd.DataFrame":
+        """
+        DataFrame in original CSV row order.
+        """
+        import pandas as pd
+
+        order = np.argsort(self.source_rows, kind="stable")
+        df = pd.DataFrame(np.asarray(self.matrix)[order], columns=list(self.attributes))
+        for position, (column, values) in enumerate(self.keys.items()):
+            df.insert(position, column, [values[i] for i in order])
+        return df
+
+def binary_paths(csv_path: str) -> dict[str, str]:
+    stem = os.path.splitext(csv_path)[0]
+    return {"npy": f"{stem}.npy", "index": f"{stem}.index.json", "parquet": f"{stem}.parquet"}
+
+def _csv_stat(csv_path: str):
+    try:
+        stat = os.stat(csv_path)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+def _atomic_write(path: str, write, mode: str = "wb") -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, mode) as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+def table_from_frame(df: "pd.DataFrame", key_columns: list[str], source: str = "frame") -> VectorTable:
+    attributes = tuple(col for col in df.columns if col not in key_columns)
+    return VectorTable(
+        {col: df[col].tolist() for col in key_columns},
+        attributes,
+        df[list(attributes)].to_numpy(dtype=float),
+        np.arange(len(df)),
+        source,
+    )
+
+def write_binary(df: "pd.DataFrame", csv_path: str, key_columns: list[str], group_by: str = None) -> None:
+    """
+    Write the binary copies of a table next to its CSV (call after the CSV is written).
+    Rows are stored grouped by group_by so a reader can use the matrix without reordering.
+    Parquet is written too when pyarrow is installed.
+    """
+    source_rows = np.arange(len(df))
+    if group_by is not None:
+        source_rows = np.argsort(df[group_by].to_numpy(dtype=object).astype(str), kind="stable")
+    ordered = df.iloc[source_rows]
+    attributes = [col for col in df.columns if col not in key_columns]
+    paths = binary_paths(csv_path)
+
+    # Matrix first, index last: the index is what marks the binary copy as complete
+    matrix = np.ascontiguousarray(ordered[attributes].to_numpy(dtype=float))
+    _atomic_write(paths["npy"], lambda f: np.save(f, matrix))
+    try:
+        import pyarrow  # noqa: F401
+        _atomic_write(paths["parquet"], lambda f: df.to_parquet(f, index=False))
+    except ImportError:
+        pass
+    index = {
+        "csv_stat": _csv_stat(csv_path),
+        "attributes": attributes,
+        "keys": {col: ordered[col].astype(str).tolist() for col in key_columns},
+        "source_rows": source_rows.tolist(),
+    }
+    _atomic_write(paths["index"], lambda f: json.dump(index, f), mode="w")
+
+def _read_index(csv_path: str):
+    """
+    The binary index, if present and not older than the CSV it was written from.
+    """
+    try:
+        with open(binary_paths(csv_path)["index"]) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    csv_stat = _csv_stat(csv_path)
+    if csv_stat is not None and csv_stat != index.get("csv_stat"):
+        return None
+    return index
+
+def load_vectors(csv_path: str, key_columns: list[str]) -> VectorTable:
+    """
+    Load a vector table, preferring the memory-mapped .npy copy, then Parquet, then the CSV.
+    """
+    paths = binary_paths(csv_path)
+    index = _read_index(csv_path)
+    if index is not None and os.path.exists(paths["npy"]):
+        matrix = np.load(paths["npy"], mmap_mode="r")
+        return VectorTable(
+            index["keys"], tuple(index["attributes"]), matrix, np.asarray(index["source_rows"]), paths["npy"]
+        )
+    import pandas as pd
+
+    if index is not None and os.path.exists(paths["parquet"]):
+        return table_from_frame(pd.read_parquet(paths["parquet"]), key_columns, paths["parquet"])
+    return table_from_frame(pd.read_csv(csv_path), key_columns, csv_path)
+
+def load_vector_frame(csv_path: str, key_columns: list[str]) -> "pd.DataFrame":
+    return load_vectors(csv_path, key_columns).to_frame()
+
+def main(argv: list[str] = None) -> None:
+    import pandas as pd
+    from .snapshot import PLAYER_PATH, TEAM_PATH
+
+    parser = argparse.ArgumentParser(description="Write binary copies of the processed vector CSVs.")
+    parser.add_argument("--player-vectors", default=PLAYER_PATH)
+    parser.add_argument("--team-vectors", default=TEAM_PATH)
+    args = parser.parse_args(argv)
+
+    write_binary(pd.read_csv(args.player_vectors), args.player_vectors, ["Name", "Team"], group_by="Team")
+    write_binary(pd.read_csv(args.team_vectors), args.team_vectors, ["Team"])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+# Weight sweeps: score every player under thousands of weight vectors with one matrix product per chunk
+import itertools
+from typing import Iterator
+import numpy as np
+from .snapshot import LeagueSnapshot
+
+MAX_SWEEP_VECTORS = 50_000
+# Players x vectors per chunk; bounds the score block to ~128 MB of float64
+CHUNK_ELEMENTS = 1 << 24
+# Sample size used to find a top-N cutoff before the exact selection
+TOP_SAMPLE = 8192
+
+def _axis_length(spec) -> int:
+    """
+    Number of values a grid axis expands to, checked before any value is built.
+    """
+    if isinstance(spec, dict):
+        missing = [key for key in ("start", "stop", "num") if key not in spec]
+        if missing:
+            raise ValueError(f"Grid range needs start, stop and num (missing {', '.join(missing)}).")
+        num = int(spec["num"])
+        if num < 1 or num > MAX_SWEEP_VECTORS:
+            raise ValueError(f"Grid range num must be between 1 and {MAX_SWEEP_VECTORS}.")
+        return num
+    return len(spec)
+
+def _grid_values(spec) -> list[float]:
+    """
+    A grid axis: an explicit list of values, or {"start", "stop", "num"} (inclusive, like np.linspace).
+    """
+    if isinstance(spec, dict):
+        return np.linspace(float(spec["start"]), float(spec["stop"]), int(spec["num"])).tolist()
+    return [float(value) for value in spec]
+
+def grid_weights(grid: dict, base: dict = None) -> tuple[tuple[str, ...], np.ndarray]:
+    """
+    Cartesian product of per-attribute weight values. Attributes in base but not in grid keep
+    their base weight in every vector. Returns (attributes, matrix with one row per vector).
+    """
+    base = dict(base or {})
+    lengths = [_axis_length(spec) for spec in grid.values()]
+    if not lengths or min(lengths) == 0:
+        raise ValueError("Grid needs at least one value for every attribute.")
+    n_vectors = 1
+    for length in lengths:
+        n_vectors *= length
+        if n_vectors > MAX_SWEEP_VECTORS:
+            raise ValueError(f"Grid expands to more than {MAX_SWEEP_VECTORS} weight vectors.")
+    axes = {attr: _grid_values(spec) for attr, spec in grid.items()}
+
+    attributes = tuple(axes) + tuple(attr for attr in base if attr not in axes)
+    fixed = [float(base[attr]) for attr in attributes[len(axes):]]
+    matrix = np.array([list(combo) + fixed for combo in itertools.product(*axes.values())], dtype=float)
+    return attributes, matrix.reshape(n_vectors, len(attributes))
+
+def matrix_weights(attributes: list[str], matrix) -> tuple[tuple[str, ...], np.ndarray]:
+    """
+    Validate an explicit (vectors x attributes) weight matrix.
+    """
+    matrix = np.asarray(matrix, dtype=float)
+    if matrix.ndim != 2 or matrix.shape[1] != len(attributes) or matrix.shape[0] == 0:
+        raise ValueError("Weight matrix must be a non-empty list of rows with one value per attribute.")
+    if matrix.shape[0] > MAX_SWEEP_VECTORS:
+        raise ValueError(f"{matrix.shape[0]} weight vectors requested (max {MAX_SWEEP_VECTORS}).")
+    if len(set(attributes)) != len(attributes):
+        raise ValueError("Attributes must be unique.")
+    return tuple(attributes), matrix
+
+def align_weight_matrix(attributes: tuple[str, ...], matrix: np.ndarray, columns: tuple[str, ...]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Reorder a weight matrix onto the snapshot's attribute columns. Like align_weights, weighted
+    attributes the data lacks add a constant w * 0.5 * 0.5 per vector (calculate_trv's defaults).
+    """
+    aligned = np.zeros((matrix.shape[0], len(columns)))
+    offsets = np.zeros(matrix.shape[0])
+    for j, attr in enumerate(attributes):
+        if attr in columns:
+            aligned[:, columns.index(attr)] = matrix[:, j]
+        else:
+            offsets += matrix[:, j] * 0.25
+    return aligned, offsets
+
+def top_rows(raw: np.ndarray, top_n: int) -> np.ndarray:
+    """
+    Column indices of the top_n largest values in each row of raw (unordered).
+    The top_n-th largest value of a strided sample is a lower bound for the row's true cutoff,
+    so one comparison pass narrows the exact selection to a few thousand candidates.
+    """
+    k, n = raw.shape
+    if top_n >= n:
+        return np.tile(np.arange(n), (k, 1))
+    stride = max(1, n // TOP_SAMPLE)
+    sample = raw[:, ::stride]
+    if stride == 1 or sample.shape[1] <= top_n:
+        return np.argpartition(raw, n - top_n, axis=1)[:, n - top_n:]
+
+    cutoff = np.partition(sample, sample.shape[1] - top_n, axis=1)[:, sample.shape[1] - top_n]
+    top = np.empty((k, top_n), dtype=np.intp)
+    for j in range(k):
+        candidates = np.flatnonzero(raw[j] >= cutoff[j])
+        top[j] = candidates[np.argpartition(raw[j, candidates], candidates.size - top_n)[candidates.size - top_n:]]
+    return top
+
+class WeightSweep:
+    """
+    Scores every player under every weight vector, against the league-average team (the
+    /compute_trv/ context). Work happens chunk by chunk in chunks(), so large sweeps can be
+    streamed; summary() reports rank stability once all chunks have been consumed.
+
+    Z-score means/stds come in closed form from the mean and covariance of the per-attribute
+    contributions, so each chunk needs only the product W @ D.T (vectors x players, one
+    contiguous row per vector for the top-N selection and rank counts).
+    """
+
+    def __init__(
+        self,
+        snapshot: LeagueSnapshot,
+        attributes: tuple[str, ...],
+        matrix: np.ndarray,
+        top_n: int = 10,
+        player_name: str = None,
+        chunk_elements: int = CHUNK_ELEMENTS
+    ):
+        self.snapshot = snapshot
+        self.attributes = attributes
+        self.matrix = matrix
+        self.top_n = max(1, min(top_n, snapshot.n_players))
+        self.player_row = -1 if player_name is None else snapshot.player_row(player_name)
+        if player_name is not None and self.player_row < 0:
+            raise ValueError(f"Player '{player_name}' not found.")
+        self.player_name = player_name
+        self.chunk_size = max(1, chunk_elements // max(snapshot.n_players, 1))
+
+        self._reference_top: set = None
+        self._top_frequency = np.zeros(snapshot.n_players, dtype=np.int64)
+        self._overlaps: list[float] = []
+        self._player_percentiles: list[float] = []
+        self._player_ranks: list[int] = []
+        self._done = 0
+
+    @property
+    def n_vectors(self) -> int:
+        return self.matrix.shape[0]
+
+    def chunks(self) -> Iterator[list[dict]]:
+        """
+        Per-vector records, a chunk of vectors at a time.
+        """
+        snapshot = self.snapshot
+        weights, offsets = align_weight_matrix(self.attributes, self.matrix, snapshot.attributes)
+        contributions = (1.0 - snapshot.team_mean_vector) * (snapshot.player_matrix - snapshot.league_avg_vector)
+        mean_contribution = contributions.mean(axis=0)
+        covariance = np.cov(contributions, rowvar=False, ddof=0).reshape(len(snapshot.attributes), -1)
+        contributions_t = np.ascontiguousarray(contributions.T)
+
+        for start in range(0, self.n_vectors, self.chunk_size):
+            w = weights[start:start + self.chunk_size]
+            chunk_offsets = offsets[start:start + self.chunk_size]
+            raw = w @ contributions_t + chunk_offsets[:, None]
+            means = mean_contribution @ w.T + chunk_offsets
+            stds = np.sqrt(np.maximum(np.einsum("ka,ab,kb->k", w, covariance, w), 0.0))
+            yield self._summarize(start, raw, means, stds)
+
+    def _summarize(self, start: int, raw: np.ndarray, means: np.ndarray, stds: np.ndarray) -> list[dict]:
+        k, n_players = raw.shape
+        top = top_rows(raw, self.top_n)
+        top_raw = np.take_along_axis(raw, top, axis=1)
+        order = np.argsort(-top_raw, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        top_raw = np.take_along_axis(top_raw, order, axis=1)
+        np.add.at(self._top_frequency, top.ravel(), 1)
+
+        if self.player_row >= 0:
+            player_raw = raw[:, self.player_row]
+            below = (raw < player_raw[:, None]).sum(axis=1)
+            above = (raw > player_raw[:, None]).sum(axis=1)
+
+        safe_stds = np.where(stds > 0, stds, 1.0)
+        records = []
+        for j in range(k):
+            rows = top[j].tolist()
+            z = np.where(stds[j] > 0, (top_raw[j] - means[j]) / safe_stds[j], 0.0)
+            if self._reference_top is None:
+                self._reference_top = set(rows)
+            overlap = len(self._reference_top.intersection(rows)) / len(rows)
+            self._overlaps.append(overlap)
+
+            record = {
+                "type": "vector",
+                "index": start + j,
+                "weights": dict(zip(self.attributes, self.matrix[start + j].tolist())),
+                "raw_mean": float(means[j]),
+                "raw_std": float(stds[j]),
+                "top": [
+                    {"name": self.snapshot.names[row], "team": self.snapshot.player_teams[row],
+                     "trv": round(float(zj), 4), "raw": round(float(rj), 4)}
+                    for row, zj, rj in zip(rows, z.tolist(), top_raw[j].tolist())
+                ],
+                "top_overlap": round(overlap, 4),
+            }
+            if self.player_row >= 0:
+                percentile = 100.0 * float(below[j]) / n_players
+                rank = int(above[j]) + 1
+                self._player_percentiles.append(percentile)
+                self._player_ranks.append(rank)
+                record["player"] = {
+                    "name": self.player_name,
+                    "raw": round(float(player_raw[j]), 4),
+                    "trv": round(float((player_raw[j] - means[j]) / safe_stds[j]) if stds[j] > 0 else 0.0, 4),
+                    "rank": rank,
+                    "percentile": round(percentile, 2),
+                }
+            records.append(record)
+        self._done += k
+        return records
+
+    def summary(self) -> dict:
+        """
+        Rank stability across the vectors scored so far: overlap of each top-N with the first
+        vector's, how often players make the top-N, and the selected player's rank/percentile range.
+        """
+        done = max(self._done, 1)
+        frequent = np.flatnonzero(self._top_frequency)
+        frequent = frequent[np.argsort(-self._top_frequency[frequent], kind="stable")][:2 * self.top_n]
+        overlaps = np.array(self._overlaps) if self._overlaps else np.zeros(1)
+        summary = {
+            "type": "summary",
+            "n_vectors": self._done,
+            "top_n": self.top_n,
+            "top_overlap": {
+                "mean": round(float(overlaps.mean()), 4),
+                "min": round(float(overlaps.min()), 4),
+            },
+            "top_n_frequency": [
+                {"name": self.snapshot.names[row], "team": self.snapshot.player_teams[row],
+                 "share": round(float(self._top_frequency[row]) / done, 4)}
+                for row in frequent.tolist()
+            ],
+        }
+        if self._player_ranks:
+            percentiles = np.array(self._player_percentiles)
+            ranks = np.array(self._player_ranks)
+            summary["player"] = {
+                "name": self.player_name,
+                "rank_best": int(ranks.min()),
+                "rank_worst": int(ranks.max()),
+                "rank_median": float(np.median(ranks)),
+                "percentile_min": round(float(percentiles.min()), 2),
+                "percentile_median": round(float(np.median(percentiles)), 2),
+                "percentile_max": round(float(percentiles.max()), 2),
+            }
+        return summary
+
+    def run(self) -> dict:
+        """
+        Whole sweep in memory (for small sweeps; stream chunks() for large ones).
+        """
+        vectors = [record for chunk in self.chunks() for record in chunk]
+        return {"attributes": list(self.attributes), "vectors": vectors, "summary": self.summary()}
@@ -0,0 +1,154 @@
+# Nightly trade recommendations for every club, fanned out over a process pool
+import argparse
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+import numpy as np
+from .cache import weights_key
+from .simulator import _candidate_mask, top_k_trades
+from .snapshot import PLAYER_PATH, TEAM_PATH, LeagueSnapshot, load_snapshot
+from .weights import get_weight_scheme
+
+DEFAULT_OUTPUT = "Data/trade_recommendations.ndjson"
+
+logger = logging.getLogger(__name__)
+
+# Per-worker state, set once by _init_worker
+_worker = {}
+
+def _init_worker(shm_name, shape, dtype, names, teams, weight_vector, league_avg_vector):
+    """
+    Attach to the parent's shared attribute matrix instead of receiving a pickled copy per task.
+    """
+    # Workers share the parent's resource tracker, which unlinks the block once the parent is done
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _worker.update(
+        shm=shm,
+        matrix=np.ndarray(shape, dtype=dtype, buffer=shm.buf),
+        names=np.asarray(names, dtype=object),
+        teams=np.asarray(teams, dtype=object),
+        weight_vector=weight_vector,
+        league_avg_vector=league_avg_vector,
+    )
+
+def _team_recommendations(team_name: str, roster_range: tuple[int, int], top_n: int) -> dict:
+    names, teams = _worker["names"], _worker["teams"]
+    candidates = _candidate_mask(names, teams, team_name)
+    found = top_k_trades(
+        _worker["matrix"], np.arange(*roster_range), np.flatnonzero(candidates),
+        _worker["weight_vector"], _worker["league_avg_vector"], top_n
+    )
+    return {
+        "team": team_name,
+        "recommendations": [
+            {"player_out": names[o], "player_in": names[i], "from_team": teams[i], "delta_trv": delta}
+            for o, i, delta in found
+        ],
+    }
+
+def run_id(snapshot: LeagueSnapshot, weights: dict, top_n: int) -> str:
+    """
+    Identifies a batch by its inputs, so a resumed run only reuses lines produced from the same data and weights.
+    """
+    digest = hashlib.sha256(weights_key(weights, 0).encode())
+    digest.update(snapshot.player_matrix.tobytes())
+    digest.update(json.dumps([snapshot.names, snapshot.player_teams, top_n]).encode())
+    return digest.hexdigest()[:16]
+
+def _completed_teams(output_path: str, batch_id: str) -> set[str]:
+    """
+    Teams already written for this batch; a partial trailing line from an interrupted run is dropped.
+    """
+    if not os.path.exists(output_path):
+        return set()
+    with open(output_path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+            data = data[:data.rfind(b"\n") + 1]
+    done = set()
+    for line in data.splitlines():
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if record.get("run_id") == batch_id:
+            done.add(record["team"])
+    return done
+
+def run_batch(
+    snapshot: LeagueSnapshot,
+    weights: dict,
+    output_path: str = DEFAULT_OUTPUT,
+    top_n: int = 5,
+    workers: int = None,
+    teams: list[str] = None,
+    resume: bool = True
+) -> int:
+    """
+    Write one NDJSON line of recommendations per team as each search finishes.
+    Returns the number of teams computed in this run.
+    """
+    batch_id = run_id(snapshot, weights, top_n)
+    teams = [team for team in (teams or snapshot.team_ranges) if team in snapshot.team_ranges]
+    done = _completed_teams(output_path, batch_id) if resume else set()
+    if not done and os.path.exists(output_path):
+        # Nothing to resume (--restart, or every line is from another batch): start a new file
+        os.remove(output_path)
+    pending = [team for team in teams if team not in done]
+    if not pending:
+        logger.info("All %d teams already computed in %s", len(teams), output_path)
+        return 0
+
+    weight_vector = np.array([float(weights.get(attr, 0.0)) for attr in snapshot.attributes])
+    matrix = snapshot.player_matrix
+    shm = shared_memory.SharedMemory(create=True, size=max(matrix.nbytes, 1))
+    try:
+        np.ndarray(matrix.shape, dtype=matrix.dtype, buffer=shm.buf)[:] = matrix
+        init_args = (
+            shm.name, matrix.shape, matrix.dtype, snapshot.names, snapshot.player_teams,
+            weight_vector, snapshot.league_avg_vector
+        )
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=init_args) as pool, \
+                open(output_path, "a") as out:
+            futures = {
+                pool.submit(_team_recommendations, team, snapshot.team_ranges[team], top_n): team
+                for team in pending
+            }
+            for future in as_completed(futures):
+                record = {"run_id": batch_id, **future.result()}
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+                logger.info("Wrote recommendations for %s", record["team"])
+    finally:
+        shm.close()
+        shm.unlink()
+    return len(pending)
+
+def main(argv: list[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Compute trade recommendations for every team.")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--weight-scheme", default="Balanced")
+    parser.add_argument("--average-of", nargs="*", default=None)
+    parser.add_argument("--top-n", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=None, help="process count (default: CPU count)")
+    parser.add_argument("--teams", nargs="*", default=None)
+    parser.add_argument("--restart", action="store_true", help="discard existing output instead of resuming")
+    parser.add_argument("--player-vectors", default=PLAYER_PATH)
+    parser.add_argument("--team-vectors", default=TEAM_PATH)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    snapshot = load_snapshot(args.player_vectors, args.team_vectors)
+    weights = get_weight_scheme(args.weight_scheme, average_of=args.average_of)
+    computed = run_batch(
+        snapshot, weights, args.output, args.top_n, args.workers, args.teams, resume=not args.restart
+    )
+    logger.info("Computed %d teams", computed)
+
+if __name__ == "__main__":
+    main()
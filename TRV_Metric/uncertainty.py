@@ -0,0 +1,151 @@
+# TRV uncertainty: seeded Monte Carlo / bootstrap draws of z-scores, scored as batched array operations
+from dataclasses import dataclass
+from typing import NamedTuple
+import numpy as np
+from .calculator import align_weights
+from .results import LeagueTRVResult
+from .snapshot import LeagueSnapshot
+
+MAX_SAMPLES = 5000
+# Draws x entities kept for the quantiles (float32 z-scores, then int32 ranks)
+MAX_SAMPLE_ELEMENTS = 1 << 24
+# Draws x entities scored per batch
+CHUNK_ELEMENTS = 1 << 22
+
+@dataclass(frozen=True)
+class UncertaintySpec:
+    """
+    How each of `samples` draws perturbs one TRV computation:
+    vector_noise is the sd of Gaussian noise added to every entity's attributes (attribute units),
+    weight_noise the relative sd of noise on every weight (w * (1 + sd * e)), and bootstrap
+    resamples, with replacement, the population the z-scores are normalized against.
+    Draws come from generators seeded by `seed`, so a spec always gives the same intervals.
+    """
+    samples: int = 200
+    vector_noise: float = 0.1
+    weight_noise: float = 0.1
+    bootstrap: bool = False
+    confidence: float = 0.9
+    seed: int = 0
+
+@dataclass(frozen=True)
+class TRVIntervals:
+    """
+    Per-entity spread across the draws: z-score interval and standard error, and the best/worst
+    rank interval (rank 1 = highest TRV), all at spec.confidence.
+    """
+    low: np.ndarray
+    high: np.ndarray
+    se: np.ndarray
+    rank_best: np.ndarray
+    rank_worst: np.ndarray
+    spec: UncertaintySpec
+
+    def entry(self, i: int) -> dict:
+        return {
+            "trv_low": round(float(self.low[i]), 4),
+            "trv_high": round(float(self.high[i]), 4),
+            "trv_se": round(float(self.se[i]), 4),
+            "rank_best": int(self.rank_best[i]),
+            "rank_worst": int(self.rank_worst[i]),
+        }
+
+class LeagueIntervals(NamedTuple):
+    """
+    Intervals in the /league_trv/ contexts: players (own_team_* entries) and teams.
+    """
+    players: TRVIntervals
+    teams: TRVIntervals
+
+def _weight_draws(weight_vector: np.ndarray, spec: UncertaintySpec, rng: np.random.Generator) -> np.ndarray:
+    if spec.weight_noise <= 0:
+        return np.broadcast_to(weight_vector, (spec.samples, len(weight_vector)))
+    return weight_vector * (1.0 + spec.weight_noise * rng.standard_normal((spec.samples, len(weight_vector))))
+
+def sample_zscores(
+    matrix: np.ndarray,
+    team_matrix: np.ndarray,
+    weight_vector: np.ndarray,
+    league_avg_vector: np.ndarray,
+    spec: UncertaintySpec
+) -> np.ndarray:
+    """
+    (samples x entities) float32 z-scores of batch_trv_zscores under the spec's perturbations.
+    raw = W @ base.T + noise, where base = (1 - team) * (x - league) is shared by every draw.
+    The attribute noise enters raw as sum_a w_a * (1 - team_a) * sd * e_a, itself Gaussian with
+    sd * sqrt(sum_a w_a^2 * (1 - team_a)^2), so one normal is drawn per entity and draw instead of
+    one per attribute. The constant offset for weighted attributes missing from the data shifts
+    every raw TRV of a draw equally and cancels in the z-scores.
+    """
+    n, n_attributes = matrix.shape
+    if spec.samples * n > MAX_SAMPLE_ELEMENTS:
+        raise ValueError(
+            f"{spec.samples} samples x {n} entities exceeds {MAX_SAMPLE_ELEMENTS}; ask for at most "
+            f"{max(1, MAX_SAMPLE_ELEMENTS // max(n, 1))} samples."
+        )
+    weight_rng, noise_rng, bootstrap_rng = (np.random.default_rng(s) for s in np.random.SeedSequence(spec.seed).spawn(3))
+    weights = _weight_draws(weight_vector, spec, weight_rng)
+    penalty = 1.0 - np.broadcast_to(team_matrix, matrix.shape)
+    base_t = np.ascontiguousarray((penalty * (matrix - league_avg_vector)).T)
+    penalty_sq_t = np.ascontiguousarray((penalty ** 2).T)
+
+    z = np.empty((spec.samples, n), dtype=np.float32)
+    batch = max(1, CHUNK_ELEMENTS // max(n, 1))
+    for start in range(0, spec.samples, batch):
+        w = weights[start:start + batch]
+        raw = w @ base_t
+        if spec.vector_noise > 0:
+            noise_sd = spec.vector_noise * np.sqrt((w ** 2) @ penalty_sq_t)
+            raw += noise_sd * noise_rng.standard_normal(raw.shape)
+        population = raw
+        if spec.bootstrap:
+            population = np.take_along_axis(raw, bootstrap_rng.integers(0, n, size=raw.shape), axis=1)
+        mean = population.mean(axis=1, keepdims=True)
+        std = population.std(axis=1, keepdims=True)
+        z[start:start + len(w)] = np.where(std > 0, (raw - mean) / np.where(std > 0, std, 1.0), 0.0)
+    return z
+
+def summarize_draws(z: np.ndarray, spec: UncertaintySpec) -> TRVIntervals:
+    """
+    Quantile intervals of each entity's z-score and rank across the draws (one row per draw).
+    """
+    samples, n = z.shape
+    tail = (1.0 - spec.confidence) / 2
+    low, high = np.quantile(z, [tail, 1.0 - tail], axis=0)
+    order = np.argsort(-z, axis=1)
+    ranks = np.empty((samples, n), dtype=np.int32)
+    np.put_along_axis(ranks, order, np.arange(1, n + 1, dtype=np.int32)[np.newaxis, :], axis=1)
+    rank_best, rank_worst = np.quantile(ranks, [tail, 1.0 - tail], axis=0, method="nearest")
+    return TRVIntervals(
+        low=low,
+        high=high,
+        se=z.std(axis=0, dtype=float),
+        rank_best=rank_best,
+        rank_worst=rank_worst,
+        spec=spec,
+    )
+
+def player_intervals(snapshot: LeagueSnapshot, weights: dict, spec: UncertaintySpec) -> TRVIntervals:
+    """
+    Intervals for every snapshot row in the /compute_trv/ context (players vs the league-average team).
+    """
+    weight_vector, _ = align_weights(weights, snapshot.attributes)
+    z = sample_zscores(
+        snapshot.player_matrix, snapshot.team_mean_vector, weight_vector, snapshot.league_avg_vector, spec
+    )
+    return summarize_draws(z, spec)
+
+def league_intervals(snapshot: LeagueSnapshot, result: LeagueTRVResult, spec: UncertaintySpec) -> LeagueIntervals:
+    """
+    Intervals in the /league_trv/ contexts: players vs their own team, teams vs the league average.
+    """
+    weight_vector, _ = align_weights(result.weights, snapshot.attributes)
+    rows = result.own_team_rows
+    players = sample_zscores(
+        snapshot.player_matrix[rows], snapshot.team_matrix[snapshot.player_team_rows[rows]],
+        weight_vector, snapshot.league_avg_vector, spec
+    )
+    teams = sample_zscores(
+        snapshot.team_matrix, snapshot.league_avg_vector, weight_vector, snapshot.league_avg_vector, spec
+    )
+    return LeagueIntervals(summarize_draws(players, spec), summarize_draws(teams, spec))
@@ -1,9 +1,4 @@
 # Create the weights
-import pandas as pd
-import logging
-
-logging.basicConfig(level=logging.INFO)
-team_df = pd.read_csv("Data/Processed/team_vectors.csv")
 
 # === 1. Static Weights ===
 def get_static_weights(scheme: str) -> dict:
@@ -72,8 +67,6 @@ def get_weight_scheme(
     team_name: str = None,
     base_scheme: str = "Balanced"  # NEW ARGUMENT
 ) -> dict:
-    from Models.ml_weights import get_ml_weights
-
     if scheme_name == "Balanced":
         return get_static_weights("Balanced")
     elif scheme_name == "Offense":
@@ -81,6 +74,8 @@ def get_weight_scheme(
     elif scheme_name == "Prevention":
         return get_static_weights("Run Prevention Focused")
     elif scheme_name.lower() == "ml":
+        # Only the ML scheme needs the model module (and pandas); keep the static schemes import-free
+        from Models.ml_weights import get_ml_weights
         return get_ml_weights()
     elif scheme_name == "Custom" and custom:
         return get_custom_weights(custom)
@@ -0,0 +1,73 @@
+# Check that importing the API stays cheap: no heavy optional libraries, no data reads, bounded import time
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ["scipy", "sklearn", "pybaseball"]
+DATA_DIRS = ["Data", os.path.join("Models", "artifacts")]
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+def measure_import(module: str) -> dict:
+    """
+    Import module in a fresh interpreter under -X importtime and report the cumulative time (ms),
+    which top-level packages were imported, and which repo data files were opened.
+    """
+    probe = (
+        "import json, os, sys\n"
+        "opened = []\n"
+        "def hook(event, args):\n"
+        "    if event == 'open' and isinstance(args[0], str):\n"
+        "        opened.append(os.path.abspath(args[0]))\n"
+        "sys.addaudithook(hook)\n"
+        f"import {module}\n"
+        "print(json.dumps({'modules': sorted({m.split('.')[0] for m in sys.modules}), 'opened': opened}))\n"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True
+    )
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match and match.group(3) == " " and match.group(4) == module:
+            total_us = int(match.group(2))
+    report = json.loads(proc.stdout.strip().splitlines()[-1])
+    data_roots = [os.path.join(REPO_ROOT, d) + os.sep for d in DATA_DIRS]
+    return {
+        "module": module,
+        "import_ms": total_us / 1000.0,
+        "heavy_modules": [m for m in HEAVY_MODULES if m in report["modules"]],
+        "data_reads": [p for p in report["opened"] if any(p.startswith(root) for root in data_roots)],
+    }
+
+def check(module: str, budget_ms: float, runs: int = 3) -> tuple[bool, dict]:
+    """
+    Best of `runs` measurements against the budget, plus the heavy-import and data-read checks.
+    """
+    reports = [measure_import(module) for _ in range(runs)]
+    report = min(reports, key=lambda r: r["import_ms"])
+    report["budget_ms"] = budget_ms
+    ok = report["import_ms"] <= budget_ms and not report["heavy_modules"] and not report["data_reads"]
+    return ok, report
+
+def main(argv: list[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Enforce the cold-start import budget.")
+    parser.add_argument("modules", nargs="*", default=["api", "Utils.statcast_fetcher", "Models.ml_weights"])
+    parser.add_argument("--budget-ms", type=float, default=1000.0)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    failed = False
+    for module in args.modules:
+        ok, report = check(module, args.budget_ms, args.runs)
+        failed |= not ok
+        print(("OK  " if ok else "FAIL"), json.dumps(report))
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
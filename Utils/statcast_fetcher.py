@@ -1,22 +1,139 @@
 # Scraping the data from Statcast, FanGraphs
-print(">>> Loaded statcast_fetcher.py")
-
-from pybaseball import batting_stats, team_batting
-import pandas as pd
+import abc
+import argparse
+import datetime
+import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from TRV_Metric.features import FeaturePipeline, features_path
+from TRV_Metric.storage import load_vector_frame, write_binary
 
 # Output paths
 PLAYER_PATH = "Data/Processed/player_vectors.csv"
 TEAM_PATH = "Data/Processed/team_vectors.csv"
+RAW_CACHE_DIR = "Data/Raw"
+
+logger = logging.getLogger(__name__)
+
+# === Sources ===
+class StatsSource(abc.ABC):
+    """
+    Where raw season batting tables come from. Subclasses implement fetch_batting.
+    """
+    name = "base"
+
+    @abc.abstractmethod
+    def fetch_batting(self, season: int) -> pd.DataFrame:
+        """
+        The raw batting table for one season.
+        """
+
+class PybaseballSource(StatsSource):
+    """
+    FanGraphs batting leaderboards through pybaseball (qual=0: every hitter with a PA).
+    """
+    name = "pybaseball"
+
+    def fetch_batting(self, season: int) -> pd.DataFrame:
+        from pybaseball import batting_stats
+        return batting_stats(season, qual=0)
+
+class FixtureSource(StatsSource):
+    """
+    Local CSVs named batting_<season>.csv, e.g. for tests or offline runs.
+    """
+    name = "fixture"
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def fetch_batting(self, season: int) -> pd.DataFrame:
+        return pd.read_csv(os.path.join(self.directory, f"batting_{season}.csv"))
+
+# === Raw Cache ===
+class RawCache:
+    """
+    On-disk cache of raw season tables at <root>/<source>/<season>/<fetch date>.csv.
+    Completed seasons never change upstream, so any cached copy is reused; the current
+    season is reused only when it was fetched on the same day.
+    """
+
+    def __init__(self, root: str = RAW_CACHE_DIR, today: datetime.date = None):
+        self.root = root
+        self.today = today or datetime.date.today()
+
+    def _season_dir(self, source: StatsSource, season: int) -> str:
+        return os.path.join(self.root, source.name, str(season))
+
+    def lookup(self, source: StatsSource, season: int):
+        """
+        Path of a usable cached table, or None.
+        """
+        season_dir = self._season_dir(source, season)
+        if not os.path.isdir(season_dir):
+            return None
+        fetched = sorted(f for f in os.listdir(season_dir) if f.endswith(".csv"))
+        if not fetched:
+            return None
+        latest = fetched[-1]
+        if season < self.today.year or latest == f"{self.today.isoformat()}.csv":
+            return os.path.join(season_dir, latest)
+        return None
+
+    def store(self, source: StatsSource, season: int, df: pd.DataFrame) -> str:
+        season_dir = self._season_dir(source, season)
+        os.makedirs(season_dir, exist_ok=True)
+        path = os.path.join(season_dir, f"{self.today.isoformat()}.csv")
+        _write_csv(df, path)
+        return path
+
+def _write_csv(df: pd.DataFrame, path: str) -> None:
+    """
+    Write via a temp file and rename, so readers (e.g. the API's file watcher) never see a partial file.
+    """
+    tmp_path = f"{path}.tmp"
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+def fetch_season(season: int, source: StatsSource, cache: RawCache, refresh: bool = False) -> pd.DataFrame:
+    """
+    Raw batting table for one season, from the cache when possible.
+    """
+    cached = None if refresh else cache.lookup(source, season)
+    if cached is not None:
+        logger.info("Using cached %s batting stats for %d (%s)", source.name, season, cached)
+        return pd.read_csv(cached)
+    logger.info("Fetching %s batting stats for %d", source.name, season)
+    df = source.fetch_batting(season)
+    cache.store(source, season, df)
+    return df
+
+def fetch_seasons(
+    seasons: list[int],
+    source: StatsSource,
+    cache: RawCache,
+    refresh: bool = False,
+    workers: int = 4
+) -> dict[int, pd.DataFrame]:
+    """
+    Fetch several seasons in parallel (network bound, so threads).
+    """
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(seasons)))) as pool:
+        frames = pool.map(lambda season: fetch_season(season, source, cache, refresh), seasons)
+        return dict(zip(seasons, frames))
 
 # === Player Fetching ===
-def get_player_stats(year: int = 2024) -> pd.DataFrame:
+def get_player_stats(year: int = 2024, source: StatsSource = None, cache: RawCache = None) -> pd.DataFrame:
     """
     Fetch advanced batting stats for all hitters with at least one PA,
     then filter by PA > 150.
     """
-    df = batting_stats(year, qual=0)
+    df = fetch_season(year, source or PybaseballSource(), cache or RawCache())
     print("Initial player count (qual=0):", df.shape)
+    return filter_qualified(df)
+
+def filter_qualified(df: pd.DataFrame) -> pd.DataFrame:
     df = df[df['PA'] > 150]
     print("After PA > 150 filter:", df.shape)
     return df
@@ -32,58 +149,104 @@ def get_team_offense_stats(player_df: pd.DataFrame) -> pd.DataFrame:
     print("Team stats shape (computed):", team_avg.shape)
     return team_avg
 
-# === Vectorization Helpers ===
-def normalize_series(series):
-    return (series - series.mean()) / series.std(ddof=0)
-
-def vectorize_players(df):
-    selected = df[[
-        'Name', 'Team', 'PA', 'wRC+', 'BsR', 'Z-Contact%', 'ISO', 'Barrel%', 'O-Swing%', 'Def'
-    ]].copy()
-    selected = selected.dropna()
-
-    selected["offense"] = normalize_series(selected["wRC+"])
-    selected["defense"] = normalize_series(selected["Def"])
-    selected["baserunning"] = normalize_series(selected["BsR"])
-    selected["contact"] = normalize_series(selected["Z-Contact%"])
-    selected["power"] = normalize_series((selected["ISO"] + selected["Barrel%"]) / 2)
-    selected["plate_discipline"] = normalize_series(100 - selected["O-Swing%"])
-
-    return selected[[
-        "Name", "Team", "offense", "defense", "contact",
-        "power", "plate_discipline", "baserunning"
-    ]]
-
-def vectorize_teams(df):
-    df = df.dropna()
-
-    df["offense"] = normalize_series(df["wRC+"])
-    df["defense"] = normalize_series(df["Def"])
-    df["baserunning"] = normalize_series(df["BsR"])
-    df["contact"] = normalize_series(df["Z-Contact%"])
-    df["power"] = normalize_series((df["ISO"] + df["Barrel%"]) / 2)
-    df["plate_discipline"] = normalize_series(100 - df["O-Swing%"])
-
-    return df[[
-        "Team", "offense", "defense", "contact",
-        "power", "plate_discipline", "baserunning"
-    ]]
+# === Vectorization ===
+def vectorize_players(df, pipeline: FeaturePipeline = None) -> pd.DataFrame:
+    """
+    Player attribute vectors. Without a pipeline the statistics are fitted on df itself;
+    with a fitted one (e.g. loaded from the live table) rows are only transformed.
+    """
+    pipeline = pipeline or FeaturePipeline().fit(df)
+    return pipeline.transform(df)
 
-# === Main Process ===
-def main():
-    os.makedirs("Data/Processed", exist_ok=True)
+def vectorize_teams(df, pipeline: FeaturePipeline = None) -> pd.DataFrame:
+    pipeline = pipeline or FeaturePipeline(key_columns=("Team",)).fit(df)
+    return pipeline.transform(df)
 
-    player_df = get_player_stats()
-    team_df = get_team_offense_stats(player_df)
+def _pipeline_for(vector_path: str, key_columns: tuple[str, ...], raw_df: pd.DataFrame, incremental: bool) -> FeaturePipeline:
+    """
+    Reuse the statistics the table at vector_path was normalized with (incremental), else fit on raw_df.
+    """
+    if incremental and os.path.exists(features_path(vector_path)):
+        return FeaturePipeline.load(features_path(vector_path))
+    return FeaturePipeline(key_columns=key_columns).fit(raw_df)
 
-    player_vectors = vectorize_players(player_df)
-    team_vectors = vectorize_teams(team_df)
+def write_vectors(raw_df: pd.DataFrame, player_path: str, team_path: str, incremental: bool = False) -> None:
+    player_df = filter_qualified(raw_df)
+    team_df = get_team_offense_stats(player_df)
 
-    player_vectors.to_csv(PLAYER_PATH, index=False)
+    player_pipeline = _pipeline_for(player_path, ("Name", "Team"), player_df, incremental)
+    team_pipeline = _pipeline_for(team_path, ("Team",), team_df, incremental)
+    player_vectors = vectorize_players(player_df, player_pipeline)
+    team_vectors = vectorize_teams(team_df, team_pipeline)
+
+    os.makedirs(os.path.dirname(player_path), exist_ok=True)
+    # Statistics first: a reader that sees the new vectors also finds the statistics behind them
+    player_pipeline.save(features_path(player_path))
+    team_pipeline.save(features_path(team_path))
+    _write_csv(player_vectors, player_path)
+    write_binary(player_vectors, player_path, ["Name", "Team"], group_by="Team")
     print(f"Saved {len(player_vectors)} player vectors.")
 
-    team_vectors.to_csv(TEAM_PATH, index=False)
+    _write_csv(team_vectors, team_path)
+    write_binary(team_vectors, team_path, ["Team"])
     print("Saved team vectors.")
 
+def _check_reproduces(vectors: pd.DataFrame, path: str, key_columns: list[str], tolerance: float = 1e-6) -> None:
+    """
+    Raise ValueError unless vectors match the table at path on every row they share with it.
+    """
+    existing = load_vector_frame(path, key_columns)
+    attributes = [col for col in existing.columns if col not in key_columns and col in vectors.columns]
+    merged = existing.merge(vectors, on=key_columns, suffixes=("", "_fitted"))
+    if merged.empty or not attributes:
+        raise ValueError(f"{path}: no rows in common with the raw stats")
+    diff = max(float((merged[attr] - merged[f"{attr}_fitted"]).abs().max()) for attr in attributes)
+    if diff > tolerance:
+        raise ValueError(f"{path}: raw stats do not reproduce the table (max difference {diff:.3g})")
+
+def write_feature_stats(raw_df: pd.DataFrame, player_path: str, team_path: str) -> None:
+    """
+    Fit and save only the feature statistics behind existing vector tables (no network, tables untouched).
+    The raw stats must reproduce the tables, so the statistics describe the data the API serves.
+    """
+    player_df = filter_qualified(raw_df)
+    team_df = get_team_offense_stats(player_df)
+    for df, path, keys in ((player_df, player_path, ["Name", "Team"]), (team_df, team_path, ["Team"])):
+        pipeline = FeaturePipeline(key_columns=keys).fit(df)
+        _check_reproduces(pipeline.transform(df), path, keys)
+        pipeline.save(features_path(path))
+        logger.info("Saved feature statistics for %s", path)
+
+# === Main Process ===
+def main(argv: list[str] = None):
+    parser = argparse.ArgumentParser(description="Fetch batting stats and rebuild the processed player/team vectors.")
+    parser.add_argument("--seasons", type=int, nargs="+", default=[2024],
+                        help="seasons to ingest; the last one is written to Data/Processed as the live table")
+    parser.add_argument("--source", choices=["pybaseball", "fixture"], default="pybaseball")
+    parser.add_argument("--fixture-dir", default="Data/Fixtures")
+    parser.add_argument("--cache-dir", default=RAW_CACHE_DIR)
+    parser.add_argument("--refresh", action="store_true", help="ignore the raw cache and download again")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--incremental", action="store_true",
+                        help="normalize with each table's saved feature statistics instead of refitting them")
+    parser.add_argument("--stats-only", action="store_true",
+                        help="only fit and save the feature statistics of the existing tables (offline with "
+                             "--source fixture or a cached season); fails unless the raw stats reproduce them")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    source = FixtureSource(args.fixture_dir) if args.source == "fixture" else PybaseballSource()
+    raw = fetch_seasons(args.seasons, source, RawCache(args.cache_dir), args.refresh, args.workers)
+
+    if args.stats_only:
+        write_feature_stats(raw[args.seasons[-1]], PLAYER_PATH, TEAM_PATH)
+        return
+
+    for season in args.seasons:
+        season_dir = os.path.join("Data/Processed", str(season))
+        write_vectors(raw[season], os.path.join(season_dir, "player_vectors.csv"), os.path.join(season_dir, "team_vectors.csv"),
+                      args.incremental)
+    write_vectors(raw[args.seasons[-1]], PLAYER_PATH, TEAM_PATH, args.incremental)
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
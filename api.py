@@ -1,16 +1,74 @@
 # Rewritten API for TRV to match CSV logic exactly
 from fastapi import FastAPI
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict
+from typing import Iterator, List, Optional, Dict, Union
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from TRV_Metric.calculator import calculate_trv, zscore_trvs
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from TRV_Metric.weights import get_weight_scheme
-import pandas as pd
-import numpy as np
+from TRV_Metric.calculator import align_weights, batch_trv
+from TRV_Metric.features import features_path, load_fitted
+from TRV_Metric.compact_store import load_store, snapshot_memory
+from TRV_Metric.data_manager import DataManager
+from TRV_Metric.results import compute_league_result
+from TRV_Metric.cache import TRVResultCache, weights_key
+from TRV_Metric.metrics import REGISTRY, PROMETHEUS_CONTENT_TYPE, MetricsMiddleware, record_error, stage
+from TRV_Metric.executor import ComputeExecutor, ComputeTimeout, register_metrics
+from TRV_Metric.distribution import DEFAULT_BINS, MAX_BINS, compute_distribution
+from TRV_Metric.sweep import WeightSweep, grid_weights, matrix_weights
+from TRV_Metric.rank_index import build_league_ranks
+from TRV_Metric.similarity import SimilarityIndex, weight_scale
+from TRV_Metric.uncertainty import MAX_SAMPLES, UncertaintySpec, league_intervals, player_intervals
+from TRV_Metric.league_rows import (
+    DEFAULT_PLAYER_FIELDS, DEFAULT_TEAM_FIELDS, INTERVAL_FIELDS, MAX_PAGE, PLAYER_FIELDS, TEAM_FIELDS,
+    check_fields, league_json, league_ndjson, league_page,
+)
+import dataclasses
 import json
+import logging
+import numpy as np
+import os
+from contextlib import asynccontextmanager
+
+# === Data (one live snapshot, hot-reloaded) ===
+data_manager = DataManager()
+result_cache = TRVResultCache(maxsize=64, ttl=600.0)
+distribution_cache = TRVResultCache(maxsize=256, ttl=600.0)
+rank_cache = TRVResultCache(maxsize=64, ttl=600.0)
+similarity_cache = TRVResultCache(maxsize=16, ttl=600.0)
+interval_cache = TRVResultCache(maxsize=32, ttl=600.0)
+# Every season under Data/Processed as one compact store, loaded on first use
+history_cache = TRVResultCache(maxsize=1, ttl=float("inf"))
+
+def _clear_caches(old, new):
+    result_cache.clear()
+    distribution_cache.clear()
+    rank_cache.clear()
+    similarity_cache.clear()
+    interval_cache.clear()
+    # The fetcher rewrites the season tables together with the live one
+    history_cache.clear()
+
+data_manager.on_swap(_clear_caches)
+
+# === Compute (TRV work runs here, never on the event loop; see TRV_COMPUTE_* env vars) ===
+compute_executor = ComputeExecutor.from_env()
+register_metrics(compute_executor)
+
+logger = logging.getLogger("api")
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Configured at startup rather than import time, so importing the app stays side-effect free
+    logging.basicConfig(level=logging.INFO)
+    data_manager.snapshot  # load before serving the first request
+    # Pick up refreshed Data/Processed files without a restart (TRV_WATCH_DATA=0 disables)
+    if os.environ.get("TRV_WATCH_DATA", "1") != "0":
+        data_manager.start_watching()
+    yield
+    data_manager.stop_watching()
+    compute_executor.shutdown(wait=False)
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -18,189 +76,747 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
+# Per-route latency histograms; send "X-TRV-Profile: 1" to get a Server-Timing stage breakdown back
+app.add_middleware(MetricsMiddleware)
+
+# === Metrics read at scrape time ===
+def _cache_stat(name: str):
+    return lambda: result_cache.stats()[name]
+
+def _snapshot_stat(read):
+    def value():
+        snapshot = data_manager.current
+        return None if snapshot is None else read(snapshot)
+    return value
+
+REGISTRY.callback("trv_result_cache_hits_total", "League result cache hits.", _cache_stat("hits"), kind="counter")
+REGISTRY.callback("trv_result_cache_misses_total", "League result cache misses.", _cache_stat("misses"), kind="counter")
+REGISTRY.callback("trv_result_cache_hit_ratio", "League result cache hit rate since start.", _cache_stat("hit_rate"))
+REGISTRY.callback("trv_result_cache_entries", "League results currently cached.", _cache_stat("size"))
+REGISTRY.callback("trv_snapshot_version", "Version of the live league snapshot.", _snapshot_stat(lambda s: s.version))
+REGISTRY.callback("trv_snapshot_players", "Players in the live league snapshot.", _snapshot_stat(lambda s: s.n_players))
+
+def league_result(weights: dict, snapshot):
+    """
+    League-wide TRVs for the resolved weights, shared across endpoints through the result cache.
+    """
+    key = weights_key(weights, snapshot.version)
+    with stage("compute"):
+        return result_cache.get_or_compute(key, lambda: compute_league_result(snapshot, weights))
+
+def league_distribution(result, snapshot, bins: int):
+    """
+    Histogram/KDE of the league z-scores for one result, cached per (weights, snapshot, bins).
+    """
+    key = (weights_key(result.weights, result.snapshot_version), bins)
+    with stage("distribution"):
+        return distribution_cache.get_or_compute(key, lambda: compute_distribution(
+            result.player_z, snapshot.player_team_rows, snapshot.team_names, bins
+        ))
+
+def league_ranks(result, snapshot):
+    """
+    Sorted rank indexes for one result (players vs own team, teams vs league), built once per weights/snapshot.
+    """
+    key = weights_key(result.weights, result.snapshot_version)
+    with stage("rank_index"):
+        return rank_cache.get_or_compute(key, lambda: build_league_ranks(result, snapshot))
+
+def similarity_index(snapshot, weights: dict = None) -> SimilarityIndex:
+    """
+    KD-tree over the snapshot's player vectors, plain or scaled by the weights; built once per snapshot/weights.
+    """
+    key = ("plain", snapshot.version) if weights is None else ("weighted", weights_key(weights, snapshot.version))
+    scale = None if weights is None else weight_scale(weights, snapshot.attributes)
+    with stage("similarity_index"):
+        return similarity_cache.get_or_compute(key, lambda: SimilarityIndex(snapshot.player_matrix, scale))
 
-# === Load data ===
-player_df = pd.read_csv("Data/Processed/player_vectors.csv")
-team_df = pd.read_csv("Data/Processed/team_vectors.csv")
-league_avg_vector = player_df.drop(columns=["Name", "Team"]).mean().to_dict()
+def player_uncertainty(weights: dict, snapshot, spec: UncertaintySpec):
+    """
+    Bootstrap/Monte Carlo intervals in the /compute_trv/ context, cached per (weights, snapshot, spec).
+    """
+    key = ("players", weights_key(weights, snapshot.version), spec)
+    with stage("uncertainty"):
+        return interval_cache.get_or_compute(key, lambda: player_intervals(snapshot, weights, spec))
 
+def league_uncertainty(result, snapshot, spec: UncertaintySpec):
+    """
+    Intervals in the /league_trv/ contexts (players vs own team, teams vs league) for one result.
+    """
+    key = ("league", weights_key(result.weights, result.snapshot_version), spec)
+    with stage("uncertainty"):
+        return interval_cache.get_or_compute(key, lambda: league_intervals(snapshot, result, spec))
+
+def respond(payload: dict) -> JSONResponse:
+    with stage("serialize"):
+        return JSONResponse(content=payload)
+
+def error_response(endpoint: str, e: Exception) -> JSONResponse:
+    record_error()
+    logger.exception("%s failed", endpoint)
+    return JSONResponse(content={"error": str(e)}, status_code=500)
+
+async def offload(endpoint: str, job, *args) -> Response:
+    """
+    Run a sync endpoint body (which returns its own response) on the compute executor.
+    """
+    try:
+        return await compute_executor.run(job, *args)
+    except ComputeTimeout as e:
+        record_error()
+        logger.warning("%s: %s", endpoint, e)
+        return JSONResponse(content={"error": str(e)}, status_code=503)
+    except Exception as e:
+        return error_response(endpoint, e)
+
+async def stream_ndjson(endpoint: str, blocks: Iterator[str]):
+    """
+    Yield NDJSON text blocks, producing each one on the compute executor.
+    """
+    try:
+        while True:
+            block = await compute_executor.run(next, blocks, None)
+            if block is None:
+                break
+            yield block
+    except Exception as e:
+        # Headers are already sent, so report the failure in-band
+        record_error()
+        logger.exception("%s stream failed", endpoint)
+        yield json.dumps({"type": "error", "error": str(e)}) + "\n"
 
 # === Request model ===
+class UncertaintyRequest(BaseModel):
+    # See UncertaintySpec; the same values and seed always give the same intervals
+    samples: int = Field(200, ge=2, le=MAX_SAMPLES)
+    vector_noise: float = Field(0.1, ge=0)
+    weight_noise: float = Field(0.1, ge=0)
+    bootstrap: bool = False
+    confidence: float = Field(0.9, gt=0, lt=1)
+    seed: int = Field(0, ge=0)
+
+    def spec(self) -> UncertaintySpec:
+        return UncertaintySpec(**self.model_dump())
+
 class TRVRequest(BaseModel):
     team_name: str
     player_names: List[str]
     weight_scheme: Optional[str] = "Balanced"
     custom_weights: Optional[Dict[str, float]] = None
     average_of: Optional[List[str]] = None
+    # Distribution options (used by /trv_bundle/)
+    bins: int = Field(DEFAULT_BINS, ge=1, le=MAX_BINS)
+    kde: bool = True
+    overlay_teams: Optional[List[str]] = None
+    # Confidence and rank intervals (per player in /compute_trv/, per row in /league_trv/)
+    uncertainty: Optional[UncertaintyRequest] = None
 
-@app.post("/compute_trv/")
-def compute_trv(request: TRVRequest):
-    try:
+def resolve_weights(request: TRVRequest) -> dict:
+    with stage("weights"):
         weights = get_weight_scheme(
             scheme_name=request.weight_scheme,
             custom=request.custom_weights,
             average_of=request.average_of,
             team_name=request.team_name,
         )
-        print("=== DEBUG: FINAL WEIGHTS USED ===")
-        print(json.dumps(weights, indent=2))
-
-        team_vector = team_df.drop(columns=["Team"]).mean().to_dict()
-
-        # Step 1: Compute raw TRVs for ALL players for normalization
-        raw_trvs = []
-        name_list = []
-
-        for _, row in player_df.iterrows():
-            name = row["Name"]
-            player_vector = row.drop(["Name", "Team"]).to_dict()
-            raw_trv = calculate_trv(player_vector, team_vector, weights, league_avg_vector)
-            raw_trvs.append(raw_trv)
-            name_list.append(name)
-
-        # Step 2: Normalize using z-score
-        zscores = zscore_trvs(raw_trvs)
-        trv_map = dict(zip(name_list, zscores))
-
-        # Step 3: Extract requested players' TRVs and raw values
-        player_results = []
-        total_trv = 0.0
-        for name in request.player_names:
-            if name not in trv_map:
-                player_results.append({"name": name, "error": "Player not found"})
-            else:
-                idx = name_list.index(name)
-                player_results.append({
-                    "name": name,
-                    "trv": round(zscores[idx], 4),
-                    "raw": round(raw_trvs[idx], 4)
-                })
-                total_trv += zscores[idx]
-
-        return {
-            "team": request.team_name,
-            "weight_scheme": request.weight_scheme,
-            "used_weights": {k: float(v) for k, v in weights.items()},
-            "total_trv": round(total_trv, 4),
-            "players": player_results,
-        }
+    logger.debug("Resolved weights for %s: %s", request.team_name, weights)
+    return weights
 
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return JSONResponse(content={"error": str(e)}, status_code=500)
+# === Response builders (shared by the single endpoints and /trv_bundle/) ===
+def build_compute_response(request: TRVRequest, weights: dict, result, snapshot, intervals=None) -> dict:
+    raw_trvs, zscores = result.player_raw, result.player_z
+
+    # Extract requested players' TRVs and raw values
+    player_results = []
+    total_trv = 0.0
+    for name in request.player_names:
+        idx = snapshot.player_row(name)
+        if idx < 0:
+            player_results.append({"name": name, "error": "Player not found"})
+        else:
+            player_results.append({
+                "name": name,
+                "trv": round(zscores[idx], 4),
+                "raw": round(raw_trvs[idx], 4)
+            })
+            if intervals is not None:
+                player_results[-1].update(intervals.entry(idx))
+            total_trv += zscores[idx]
+
+    response = {
+        "team": request.team_name,
+        "weight_scheme": request.weight_scheme,
+        "used_weights": {k: float(v) for k, v in weights.items()},
+        "total_trv": round(total_trv, 4),
+        "players": player_results,
+    }
+    if intervals is not None:
+        response["uncertainty"] = dataclasses.asdict(intervals.spec)
+    return response
+
+def build_league_response(request: TRVRequest, result, snapshot, intervals=None) -> dict:
+    # --- Team TRVs (each team vs league avg) ---
+    team_trvs = [
+        {"team": name, "trv": z}
+        for name, z in zip(snapshot.team_names, np.round(result.team_z, 4).tolist())
+    ]
+
+    # --- Player TRVs (each player vs their own team) ---
+    player_trvs = [
+        {"name": snapshot.names[row], "trv": z}
+        for row, z in zip(result.own_team_rows.tolist(), np.round(result.own_team_z, 4).tolist())
+    ]
+
+    if intervals is not None:
+        for i, team in enumerate(team_trvs):
+            team.update(intervals.teams.entry(i))
+        for i, player in enumerate(player_trvs):
+            player.update(intervals.players.entry(i))
+
+    return {
+        "team_trvs": team_trvs,
+        "player_trvs": player_trvs,
+        "selected_team": request.team_name,
+        "selected_players": request.player_names,
+    }
+
+def build_distribution_response(distribution, kde: bool = True, overlay_teams: list = None) -> dict:
+    """
+    Empirical distribution of league z-scores. x/y is the curve the dashboard draws: the KDE,
+    or the histogram density at bin centers when kde is off.
+    """
+    x_vals, y_vals = (distribution.kde_x, distribution.kde_y) if kde else (distribution.centers, distribution.density)
+
+    overlays = []
+    for team in overlay_teams or []:
+        counts = distribution.team_histogram(team)
+        if counts is None:
+            overlays.append({"team": team, "error": "Team not found"})
+        else:
+            overlays.append({"team": team, "counts": counts.tolist()})
+
+    return {
+        "x": x_vals.tolist(),
+        "y": y_vals.tolist(),
+        "mean": distribution.mean,
+        "std": distribution.std,
+        "n": distribution.n,
+        "bandwidth": distribution.bandwidth if kde else None,
+        "bin_edges": distribution.edges.tolist(),
+        "counts": distribution.counts.tolist(),
+        "team_overlays": overlays,
+    }
+
+def compute_trv_job(request: TRVRequest) -> JSONResponse:
+    weights = resolve_weights(request)
+    snapshot = data_manager.snapshot
+    result = league_result(weights, snapshot)
+    intervals = None
+    if request.uncertainty is not None:
+        try:
+            intervals = player_uncertainty(weights, snapshot, request.uncertainty.spec())
+        except ValueError as e:
+            return JSONResponse(content={"error": str(e)}, status_code=422)
+    with stage("build"):
+        payload = build_compute_response(request, weights, result, snapshot, intervals)
+    return respond(payload)
+
+@app.post("/compute_trv/")
+async def compute_trv(request: TRVRequest):
+    return await offload("compute_trv", compute_trv_job, request)
 
 @app.get("/players_for_team/")
 def get_players_for_team(team_name: str):
-    matching_players = player_df[player_df["Team"] == team_name]["Name"].tolist()
+    matching_players = data_manager.snapshot.roster_names(team_name)
     return {"players": matching_players}
 
-# === New League-wide TRV Endpoint ===
-@app.post("/league_trv/")
-def league_trv(request: TRVRequest):
-    try:
-        weights = get_weight_scheme(
-            scheme_name=request.weight_scheme,
-            custom=request.custom_weights,
-            average_of=request.average_of,
-            team_name=request.team_name,
-        )
-
-        # --- Team TRVs (each team vs league avg) ---
-        league_team_vectors = team_df.drop(columns=["Team"])
-        raw_team_trvs = []
-        team_names = []
-
-        for _, row in team_df.iterrows():
-            team_name = row["Team"]
-            team_vector = row.drop("Team").to_dict()
-            raw_trv = calculate_trv(team_vector, league_avg_vector, weights, league_avg_vector)
-            raw_team_trvs.append(raw_trv)
-            team_names.append(team_name)
-
-        team_zscores = zscore_trvs(raw_team_trvs)
-        team_trvs = [
-            {"team": name, "trv": round(z, 4)}
-            for name, z in zip(team_names, team_zscores)
-        ]
+@app.get("/cache_stats/")
+def cache_stats():
+    return {"snapshot_version": data_manager.version, **result_cache.stats(), "compute": compute_executor.stats()}
 
-        # --- Player TRVs (each player vs their own team) ---
-        raw_player_trvs = []
-        player_names = []
+@app.get("/metrics")
+def metrics():
+    """
+    Prometheus text exposition: request/stage latency histograms, errors, cache and snapshot gauges.
+    """
+    return Response(REGISTRY.render(), media_type=PROMETHEUS_CONTENT_TYPE)
 
-        for _, row in player_df.iterrows():
-            name = row["Name"]
-            team = row["Team"]
-            player_vector = row.drop(["Name", "Team"]).to_dict()
+@app.post("/reload_data/")
+def reload_data(wait: bool = False):
+    """
+    Rebuild the league snapshot from Data/Processed; in-flight requests finish on the old one.
+    """
+    if wait:
+        swapped = data_manager.reload()
+        return {"reloaded": swapped, "snapshot_version": data_manager.version}
+    data_manager.reload_in_background()
+    return {"reloading": True, "snapshot_version": data_manager.version}
 
-            matching_team_row = team_df[team_df["Team"] == team]
-            if matching_team_row.empty:
-                continue
-            team_vector = matching_team_row.iloc[0].drop("Team").to_dict()
+# === New League-wide TRV Endpoint ===
+class LeagueTRVRequest(TRVRequest):
+    # The dashboard always sends these; scripts paging through the league need not
+    team_name: Optional[str] = None
+    player_names: List[str] = []
+    # Only these teams (and their players)
+    teams: Optional[List[str]] = None
+    # Projection: subsets of PLAYER_FIELDS / TEAM_FIELDS (default name+trv / team+trv)
+    fields: Optional[List[str]] = None
+    team_fields: Optional[List[str]] = None
+    # Cursor pagination over player_trvs: limit players per page, cursor from the previous page
+    limit: Optional[int] = Field(None, ge=1, le=MAX_PAGE)
+    cursor: Optional[str] = None
+    # NDJSON: one line per team/player, serialized chunk by chunk
+    stream: bool = False
 
-            raw_trv = calculate_trv(player_vector, team_vector, weights, league_avg_vector)
-            raw_player_trvs.append(raw_trv)
-            player_names.append(name)
+def league_trv_job(request: LeagueTRVRequest) -> Response:
+    extra_fields = tuple(INTERVAL_FIELDS) if request.uncertainty is not None else ()
+    try:
+        player_fields = check_fields(request.fields, PLAYER_FIELDS + extra_fields, DEFAULT_PLAYER_FIELDS + extra_fields)
+        team_fields = check_fields(request.team_fields, TEAM_FIELDS + extra_fields, DEFAULT_TEAM_FIELDS + extra_fields)
+    except ValueError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=422)
+    weights = resolve_weights(request)
+    snapshot = data_manager.snapshot
+    result = league_result(weights, snapshot)
+    try:
+        page = league_page(result, snapshot, request.teams, request.limit, request.cursor)
+        intervals = None if request.uncertainty is None else league_uncertainty(result, snapshot, request.uncertainty.spec())
+    except ValueError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=422)
 
-        player_zscores = zscore_trvs(raw_player_trvs)
-        player_trvs = [
-            {"name": name, "trv": round(z, 4)}
-            for name, z in zip(player_names, player_zscores)
-        ]
+    selection = {"selected_team": request.team_name, "selected_players": request.player_names}
+    if intervals is not None:
+        selection["uncertainty"] = dataclasses.asdict(intervals.players.spec)
+    if request.stream:
+        meta = {**selection, "fields": list(player_fields), "team_fields": list(team_fields)}
+        blocks = league_ndjson(result, snapshot, page, player_fields, team_fields, meta, intervals)
+        return StreamingResponse(stream_ndjson("league_trv", blocks), media_type="application/x-ndjson")
 
-        return {
-            "team_trvs": team_trvs,
-            "player_trvs": player_trvs,
-            "selected_team": request.team_name,
-            "selected_players": request.player_names,
-        }
+    if request.limit is not None or request.cursor is not None:
+        selection.update(total=page.total, offset=page.offset, next_cursor=page.next_cursor)
+    with stage("serialize"):
+        body = league_json(result, snapshot, page, player_fields, team_fields, selection, intervals)
+        return Response(content=body, media_type="application/json")
 
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return JSONResponse(content={"error": str(e)}, status_code=500)
+@app.post("/league_trv/")
+async def league_trv(request: LeagueTRVRequest):
+    """
+    Team TRVs (vs league) and player TRVs (vs own team). Optional: teams filter, fields/team_fields
+    projection, limit + cursor pages (follow next_cursor until it is null) and stream=true for NDJSON.
+    """
+    return await offload("league_trv", league_trv_job, request)
     
 # === Add this to your FastAPI backend (e.g., in api.py) ===
-from fastapi import Request
-from scipy.stats import norm
+from fastapi import Query, Request
 
-@app.post("/trv_distribution/")
-async def trv_distribution(request: Request):
-    try:
-        body = await request.json()
+def trv_distribution_job(body: dict, bins: int) -> JSONResponse:
+    with stage("weights"):
         weights = get_weight_scheme(
             scheme_name=body.get("weight_scheme"),
             custom=body.get("custom_weights"),
             average_of=body.get("average_of"),
             team_name=body.get("team_name")
         )
+    snapshot = data_manager.snapshot
+    distribution = league_distribution(league_result(weights, snapshot), snapshot, bins)
+    with stage("build"):
+        payload = build_distribution_response(distribution, body.get("kde", True), body.get("overlay_teams"))
+    return respond(payload)
+
+@app.post("/trv_distribution/")
+async def trv_distribution(request: Request, bins: int = Query(None, ge=1, le=MAX_BINS)):
+    """
+    bins may be given as a query parameter or in the body (default DEFAULT_BINS); the body may also
+    set "kde": false and "overlay_teams": [...] for per-team histograms.
+    """
+    try:
+        body = await request.json()
+    except Exception as e:
+        return error_response("trv_distribution", e)
+    bins = bins if bins is not None else body.get("bins", DEFAULT_BINS)
+    if isinstance(bins, bool) or not isinstance(bins, int) or not 1 <= bins <= MAX_BINS:
+        return JSONResponse(content={"error": f"bins must be an integer between 1 and {MAX_BINS}"}, status_code=422)
+    return await offload("trv_distribution", trv_distribution_job, body, bins)
 
-        team_vector = team_df.drop(columns=["Team"]).mean().to_dict()
-        # Compute raw TRVs
-        raw_trvs = []
-        for _, row in player_df.iterrows():
-            player_vector = row.drop(["Name", "Team"]).to_dict()
-            trv = calculate_trv(player_vector, team_vector, weights, league_avg_vector)
-            raw_trvs.append(trv)
-
-        # Normalize using z-score
-        zscores = zscore_trvs(raw_trvs)
-        mean = float(np.mean(zscores))  # will be 0
-        std = float(np.std(zscores))    # will be 1
-
-        # Bell curve using z-scores
-        x_vals = np.linspace(-4, 4, 300)  # wide enough to include any player TRV
-        y_vals = norm.pdf(x_vals, mean, std)
-
-        return {
-            "x": x_vals.tolist(),
-            "y": y_vals.tolist(),
-            "mean": mean,
-            "std": std
+# === Dashboard bundle: all three results from one weight resolution ===
+def trv_bundle_job(request: TRVRequest) -> JSONResponse:
+    weights = resolve_weights(request)
+    snapshot = data_manager.snapshot
+    result = league_result(weights, snapshot)
+    player_iv = league_iv = None
+    if request.uncertainty is not None:
+        try:
+            player_iv = player_uncertainty(weights, snapshot, request.uncertainty.spec())
+            league_iv = league_uncertainty(result, snapshot, request.uncertainty.spec())
+        except ValueError as e:
+            return JSONResponse(content={"error": str(e)}, status_code=422)
+    with stage("build"):
+        payload = {
+            "compute": build_compute_response(request, weights, result, snapshot, player_iv),
+            "league": build_league_response(request, result, snapshot, league_iv),
+            "distribution": build_distribution_response(
+                league_distribution(result, snapshot, request.bins), request.kde, request.overlay_teams
+            ),
         }
+    return respond(payload)
 
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return JSONResponse(content={"error": str(e)}, status_code=500)
+@app.post("/trv_bundle/")
+async def trv_bundle(request: TRVRequest):
+    return await offload("trv_bundle", trv_bundle_job, request)
+
+# === Weight sweeps: many weight vectors scored in one pass ===
+SWEEP_STREAM_THRESHOLD = 256
+
+class SweepRequest(BaseModel):
+    # Either an explicit matrix (one row per vector, columns = attributes) ...
+    attributes: Optional[List[str]] = None
+    matrix: Optional[List[List[float]]] = None
+    # ... or a grid: attribute -> list of values or {"start", "stop", "num"}
+    grid: Optional[Dict[str, Union[List[float], Dict[str, float]]]] = None
+    # Weights for attributes the grid leaves out
+    base_scheme: Optional[str] = None
+    top_n: int = Field(10, ge=1, le=100)
+    player_name: Optional[str] = None
+    # NDJSON stream; defaults to on above SWEEP_STREAM_THRESHOLD vectors
+    stream: Optional[bool] = None
+
+def sweep_weights(request: SweepRequest):
+    if request.grid is not None:
+        base = get_weight_scheme(request.base_scheme) if request.base_scheme else None
+        return grid_weights(request.grid, base)
+    if request.attributes is not None and request.matrix is not None:
+        return matrix_weights(request.attributes, request.matrix)
+    raise ValueError("Provide either grid or attributes + matrix.")
+
+def prepare_sweep_job(request: SweepRequest):
+    """
+    The WeightSweep for a request, or a 422 response when the request is invalid.
+    """
+    try:
+        attributes, matrix = sweep_weights(request)
+        return WeightSweep(data_manager.snapshot, attributes, matrix, request.top_n, request.player_name)
+    except ValueError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=422)
+
+def weight_sweep_job(sweep: WeightSweep) -> JSONResponse:
+    with stage("compute"):
+        payload = sweep.run()
+    return respond(payload)
+
+def sweep_ndjson(sweep: WeightSweep) -> Iterator[str]:
+    """
+    NDJSON: one line per weight vector, a chunk of vectors per block, then a summary line.
+    """
+    for records in sweep.chunks():
+        yield "".join(json.dumps(record) + "\n" for record in records)
+    yield json.dumps(sweep.summary()) + "\n"
+
+@app.post("/weight_sweep/")
+async def weight_sweep(request: SweepRequest):
+    """
+    Score every player under a batch of weight vectors: top-N per vector, top-N overlap with the
+    first vector, how often players make the top-N, and (with player_name) that player's rank/percentile.
+    """
+    # Expanding the grid and resolving base_scheme (which may fit the ML weights) stay off the event loop
+    sweep = await offload("weight_sweep", prepare_sweep_job, request)
+    if isinstance(sweep, Response):
+        return sweep
+
+    stream = request.stream if request.stream is not None else sweep.n_vectors > SWEEP_STREAM_THRESHOLD
+    if stream:
+        return StreamingResponse(stream_ndjson("weight_sweep", sweep_ndjson(sweep)), media_type="application/x-ndjson")
+    return await offload("weight_sweep", weight_sweep_job, sweep)
+
+# === Rank queries: answered from a sorted index instead of shipping the whole league ===
+class RankRequest(BaseModel):
+    weight_scheme: Optional[str] = "Balanced"
+    custom_weights: Optional[Dict[str, float]] = None
+    average_of: Optional[List[str]] = None
+    team_name: Optional[str] = None
+    # "player" (vs own team, as in /league_trv/ player_trvs) or "team" (vs league average)
+    entity: str = Field("player", pattern="^(player|team)$")
+    top_n: Optional[int] = Field(None, ge=1, le=1000)
+    top_team: Optional[str] = None
+    player_name: Optional[str] = None
+    within: Optional[float] = Field(None, ge=0)
+    min_trv: Optional[float] = None
+    max_trv: Optional[float] = None
+    limit: int = Field(100, ge=1, le=1000)
+    offset: int = Field(0, ge=0)
+
+def league_rank_job(request: RankRequest) -> JSONResponse:
+    if request.top_team is not None and request.entity == "team":
+        return JSONResponse(content={"error": "top_team only applies to entity=\"player\"."}, status_code=422)
+    if request.within is not None and request.player_name is None:
+        return JSONResponse(content={"error": "within needs player_name."}, status_code=422)
+    weights = resolve_weights(request)
+    snapshot = data_manager.snapshot
+    ranks = league_ranks(league_result(weights, snapshot), snapshot)
+    index = ranks.players if request.entity == "player" else ranks.teams
+
+    with stage("build"):
+        payload = {"entity": request.entity, "count": len(index)}
+        if request.top_n is not None:
+            payload["top"] = index.top(request.top_n, request.top_team)
+        if request.player_name is not None:
+            payload["lookup"] = index.lookup(request.player_name) or {"name": request.player_name, "error": "Not found"}
+
+        low, high = request.min_trv, request.max_trv
+        if request.within is not None and request.player_name is not None and "error" not in payload["lookup"]:
+            center = float(index.values[index.entry_of_name(request.player_name)])
+            low, high = center - request.within, center + request.within
+        if low is not None or high is not None:
+            payload["range"] = index.between(low, high, request.limit, request.offset)
+    return respond(payload)
+
+@app.post("/league_rank/")
+async def league_rank(request: RankRequest):
+    """
+    Server-side top-N (overall or top_team), rank/percentile lookup by name (player_name, also used
+    for team names with entity="team"), and TRV ranges (min_trv/max_trv, or ±within around player_name).
+    """
+    return await offload("league_rank", league_rank_job, request)
+
+# === Similar players: nearest neighbors in attribute space ===
+class SimilarRequest(BaseModel):
+    # Query by name, or by attribute vector (attributes left out take the league average)
+    player_name: Optional[str] = None
+    vector: Optional[Dict[str, float]] = None
+    k: int = Field(10, ge=1, le=1000)
+    # All players within this distance instead of the k nearest (at most limit, nearest first)
+    radius: Optional[float] = Field(None, gt=0)
+    limit: int = Field(100, ge=1, le=1000)
+    # Scale distances by the resolved weights: d^2 = sum |w| * diff^2
+    weighted: bool = False
+    weight_scheme: Optional[str] = "Balanced"
+    custom_weights: Optional[Dict[str, float]] = None
+    average_of: Optional[List[str]] = None
+    team_name: Optional[str] = None
+    exclude_teams: Optional[List[str]] = None
+    # Leave out the queried player's teammates
+    exclude_own_team: bool = False
+
+def similar_players_job(request: SimilarRequest) -> JSONResponse:
+    snapshot = data_manager.snapshot
+    if request.player_name is not None:
+        row = snapshot.player_row(request.player_name)
+        if row < 0:
+            return JSONResponse(content={"error": f"Player '{request.player_name}' not found."}, status_code=404)
+        vector = snapshot.player_matrix[row]
+        query = {"name": request.player_name, "team": snapshot.player_teams[row]}
+    elif request.vector is not None:
+        unknown = [attr for attr in request.vector if attr not in snapshot.attributes]
+        if unknown:
+            return JSONResponse(content={"error": f"Unknown attributes: {', '.join(unknown)}"}, status_code=422)
+        vector = np.array([
+            request.vector.get(attr, avg) for attr, avg in zip(snapshot.attributes, snapshot.league_avg_vector.tolist())
+        ])
+        row, query = -1, {}
+    else:
+        return JSONResponse(content={"error": "Provide player_name or vector."}, status_code=422)
+    query["vector"] = {attr: round(value, 4) for attr, value in zip(snapshot.attributes, vector.tolist())}
+
+    index = similarity_index(snapshot, resolve_weights(request) if request.weighted else None)
+    mask = np.ones(snapshot.n_players, dtype=bool)
+    if row >= 0:
+        mask[row] = False
+        if request.exclude_own_team:
+            mask[snapshot.roster_slice(query["team"])] = False
+    for team in request.exclude_teams or []:
+        mask[snapshot.roster_slice(team)] = False
+
+    with stage("query"):
+        if request.radius is None:
+            rows, distances = index.nearest(vector, request.k, mask)
+            total = len(rows)
+        else:
+            rows, distances = index.within(vector, request.radius, mask)
+            total = len(rows)
+            rows, distances = rows[:request.limit], distances[:request.limit]
+
+    with stage("build"):
+        payload = {
+            "query": query,
+            "weighted": request.weighted,
+            "total": total,
+            "neighbors": [
+                {"name": snapshot.names[r], "team": snapshot.player_teams[r], "distance": round(d, 4),
+                 "vector": dict(zip(snapshot.attributes, np.round(snapshot.player_matrix[r], 4).tolist()))}
+                for r, d in zip(rows.tolist(), distances.tolist())
+            ],
+        }
+    return respond(payload)
+
+@app.post("/similar_players/")
+async def similar_players(request: SimilarRequest):
+    """
+    Players closest to player_name (or to a raw attribute vector): the k nearest, or everyone within
+    radius. With weighted=true distances are scaled by the weight scheme, so heavily weighted
+    attributes count for more.
+    """
+    return await offload("similar_players", similar_players_job, request)
+
+# === Score players from raw stats (fitted feature statistics, league left as is) ===
+class ScoreRequest(BaseModel):
+    # Raw stat rows: "Name" plus the feature inputs (wRC+, Def, BsR, Z-Contact%, ISO, Barrel%, O-Swing%)
+    players: List[Dict[str, Union[str, float, None]]] = Field(..., min_length=1, max_length=10_000)
+    weight_scheme: Optional[str] = "Balanced"
+    custom_weights: Optional[Dict[str, float]] = None
+    average_of: Optional[List[str]] = None
+    team_name: Optional[str] = None
+
+def score_players_job(request: ScoreRequest) -> JSONResponse:
+    pipeline = load_fitted(features_path(data_manager.player_path))
+    if pipeline is None:
+        return JSONResponse(
+            content={"error": "No fitted feature statistics for the live table; run python -m Utils.statcast_fetcher "
+                             "(--stats-only --source fixture fits them offline from a raw batting CSV)."},
+            status_code=503,
+        )
+    weights = resolve_weights(request)
+    snapshot = data_manager.snapshot
+    result = league_result(weights, snapshot)
+
+    with stage("transform"):
+        columns = [snapshot.attributes.index(attr) if attr in snapshot.attributes else -1 for attr in pipeline.attributes]
+        vectors = np.tile(snapshot.league_avg_vector, (len(request.players), 1))
+        errors = {}
+        for i, stats in enumerate(request.players):
+            try:
+                derived = pipeline.transform_row(stats)
+            except (ValueError, TypeError) as e:
+                errors[i] = str(e)
+                continue
+            for column, value in zip(columns, derived.tolist()):
+                if column >= 0:
+                    vectors[i, column] = value
+
+    # Same context as /compute_trv/ (league-average team); z against the league's raw TRVs
+    weight_vector, offset = align_weights(weights, snapshot.attributes)
+    raw = batch_trv(vectors, snapshot.team_mean_vector, weight_vector, snapshot.league_avg_vector, offset)
+    mean, std = float(result.player_raw.mean()), float(result.player_raw.std())
+    z = (raw - mean) / std if std > 0 else np.zeros_like(raw)
+
+    with stage("build"):
+        players = []
+        for i, stats in enumerate(request.players):
+            entry = {"name": stats.get("Name")}
+            if i in errors:
+                entry["error"] = errors[i]
+            else:
+                entry.update({
+                    "trv": round(float(z[i]), 4),
+                    "raw": round(float(raw[i]), 4),
+                    "vector": dict(zip(snapshot.attributes, np.round(vectors[i], 4).tolist())),
+                })
+            players.append(entry)
+        payload = {"used_weights": {k: float(v) for k, v in weights.items()}, "players": players}
+    return respond(payload)
+
+@app.post("/score_players/")
+async def score_players(request: ScoreRequest):
+    """
+    TRV for players given as raw stat rows (e.g. call-ups), normalized with the statistics the live
+    table was built with and compared against the league as loaded, without re-vectorizing anyone.
+    """
+    return await offload("score_players", score_players_job, request)
+
+# === Multi-season history (compact store) and memory diagnostics ===
+def history_store():
+    with stage("history"):
+        return history_cache.get_or_compute("history", load_store)
+
+def player_seasons_job(name: str) -> JSONResponse:
+    store = history_store()
+    rows = store.player_rows(name)
+    if len(rows) == 0:
+        return JSONResponse(content={"error": f"Player '{name}' not found in any season."}, status_code=404)
+    with stage("build"):
+        seasons = [
+            {"season": int(season), "team": store.team_labels[code],
+             "vector": dict(zip(store.attributes, np.round(vector.astype(float), 4).tolist()))}
+            for season, code, vector in zip(store.season_of(rows).tolist(), store.team_codes[rows].tolist(), store.matrix[rows])
+        ]
+    return respond({"name": name, "seasons": seasons})
+
+@app.get("/player_seasons/")
+async def player_seasons(name: str):
+    """
+    A player's attribute vectors in every season the history store holds.
+    """
+    return await offload("player_seasons", player_seasons_job, name)
+
+class WhatIfMove(BaseModel):
+    player: str
+    # Move the player to this team, and/or replace their attribute values (others keep theirs)
+    team: Optional[str] = None
+    vector: Optional[Dict[str, float]] = None
+
+class WhatIfRequest(BaseModel):
+    moves: List[WhatIfMove] = Field(..., min_length=1, max_length=100)
+    # Defaults to the latest season in the history store
+    season: Optional[int] = None
+    weight_scheme: Optional[str] = "Balanced"
+    custom_weights: Optional[Dict[str, float]] = None
+    average_of: Optional[List[str]] = None
+    team_name: Optional[str] = None
+
+def what_if_job(request: WhatIfRequest) -> JSONResponse:
+    from TRV_Metric.simulator import simulate_moves
+
+    store = history_store()
+    season = request.season if request.season is not None else (store.seasons[-1] if store.seasons else None)
+    if season not in store.seasons:
+        return JSONResponse(content={"error": f"Season {season} not in the history store."}, status_code=422)
+    weights = resolve_weights(request)
+
+    view = store.what_if()
+    for move in request.moves:
+        rows = store.player_rows(move.player, season)
+        if len(rows) == 0:
+            return JSONResponse(content={"error": f"Player '{move.player}' not found in {season}."}, status_code=404)
+        unknown = [attr for attr in (move.vector or {}) if attr not in store.attributes]
+        if move.team is None and move.vector is None:
+            return JSONResponse(content={"error": f"Move for '{move.player}' needs a team or a vector."}, status_code=422)
+        if unknown:
+            return JSONResponse(content={"error": f"Unknown attributes: {', '.join(unknown)}"}, status_code=422)
+        if move.team is not None and store.team_code(move.team) < 0:
+            return JSONResponse(content={"error": f"Unknown team '{move.team}'."}, status_code=422)
+        row = int(rows[0])
+        if move.team is not None:
+            view.move(row, move.team)
+        if move.vector is not None:
+            current = view.vectors([row])[0]
+            view.set_vector(row, [move.vector.get(attr, value) for attr, value in zip(store.attributes, current.tolist())])
+
+    with stage("compute"):
+        impacts = simulate_moves(view, weights, season)
+    with stage("build"):
+        for impact in impacts:
+            for key in ("total_trv_before", "total_trv_after", "delta"):
+                impact[key] = round(impact[key], 4)
+            for key in ("team_vector_before", "team_vector_after"):
+                impact[key] = dict(zip(store.attributes, np.round(impact[key], 4).tolist()))
+        payload = {"season": season, "used_weights": {k: float(v) for k, v in weights.items()}, "teams": impacts}
+    return respond(payload)
+
+@app.post("/what_if/")
+async def what_if(request: WhatIfRequest):
+    """
+    Move players between teams and/or change their attributes in one season, and get each touched
+    team's roster TRV before and after. Edits live in a copy-on-write view over the history store.
+    """
+    return await offload("what_if", what_if_job, request)
+
+@app.get("/memory_report/")
+def memory_report():
+    """
+    Bytes held by the live snapshot and, once loaded, the multi-season history store.
+    """
+    history = history_cache.get("history")
+    return {
+        "snapshot": snapshot_memory(data_manager.snapshot),
+        "history": None if history is None else history.memory_report(),
+    }
@@ -0,0 +1,321 @@
+# Benchmark the calculator, API endpoints and simulator on synthetic leagues, and flag regressions
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, NamedTuple
+import numpy as np
+from benchmarks.synthetic import write_league
+
+DEFAULT_SIZES = [400, 10_000, 100_000, 1_000_000]
+RESULTS_DIR = "benchmarks/results"
+WEIGHT_SCHEME = "Balanced"
+
+class Benchmark(NamedTuple):
+    """
+    One timed operation. setup runs before every timed call (untimed); warm runs fn once first.
+    Sizes above max_size are skipped, e.g. for the per-player Python loops.
+    """
+    name: str
+    fn: Callable[[], object]
+    setup: Callable[[], object] = None
+    warm: bool = False
+    max_size: int = None
+
+# === Timing ===
+def time_benchmark(bench: Benchmark, repeats: int, time_budget: float) -> dict:
+    """
+    Time up to `repeats` calls, stopping early once time_budget seconds are spent (at least one call).
+    """
+    if bench.warm:
+        bench.fn()
+    times = []
+    started = time.perf_counter()
+    while len(times) < repeats:
+        if bench.setup is not None:
+            bench.setup()
+        t0 = time.perf_counter()
+        bench.fn()
+        times.append((time.perf_counter() - t0) * 1000.0)
+        if time.perf_counter() - started > time_budget:
+            break
+    return {
+        "runs": len(times),
+        "min_ms": min(times),
+        "median_ms": statistics.median(times),
+        "mean_ms": statistics.fmean(times),
+    }
+
+# === Benchmarks ===
+def calculator_benchmarks(snapshot, weights: dict) -> list[Benchmark]:
+    from TRV_Metric.calculator import align_weights, batch_trv_zscores, calculate_trv, zscore_trvs
+
+    attributes = list(snapshot.attributes)
+    league_avg = dict(zip(attributes, snapshot.league_avg_vector.tolist()))
+    team_mean = dict(zip(attributes, snapshot.team_mean_vector.tolist()))
+    state = {}
+
+    def player_dicts():
+        if "players" not in state:
+            state["players"] = [dict(zip(attributes, row)) for row in np.asarray(snapshot.player_matrix).tolist()]
+        return state["players"]
+
+    def scalar_trvs():
+        state["raw"] = [calculate_trv(p, team_mean, weights, league_avg) for p in player_dicts()]
+        return state["raw"]
+
+    def scalar_zscores():
+        if "raw" not in state:
+            scalar_trvs()
+        return zscore_trvs(state["raw"])
+
+    weight_vector, offset = align_weights(weights, attributes)
+    return [
+        Benchmark("calculator.calculate_trv", scalar_trvs, setup=player_dicts, max_size=100_000),
+        Benchmark("calculator.zscore_trvs", scalar_zscores, setup=scalar_zscores, max_size=100_000),
+        Benchmark("calculator.batch_trv_zscores", lambda: batch_trv_zscores(
+            snapshot.player_matrix, snapshot.team_mean_vector, weight_vector, snapshot.league_avg_vector, offset
+        )),
+    ]
+
+def snapshot_benchmarks(player_path: str, team_path: str, snapshot, weights: dict) -> list[Benchmark]:
+    import pandas as pd
+    from TRV_Metric.results import compute_league_result
+    from TRV_Metric.snapshot import build_snapshot, load_snapshot
+
+    return [
+        Benchmark("snapshot.load_binary", lambda: load_snapshot(player_path, team_path)),
+        Benchmark("snapshot.load_csv", lambda: build_snapshot(pd.read_csv(player_path), pd.read_csv(team_path))),
+        Benchmark("results.compute_league_result", lambda: compute_league_result(snapshot, weights)),
+    ]
+
+def uncertainty_benchmarks(snapshot, weights: dict) -> list[Benchmark]:
+    from TRV_Metric.uncertainty import UncertaintySpec, player_intervals
+
+    spec = UncertaintySpec(samples=100, bootstrap=True)
+    return [
+        Benchmark("uncertainty.player_intervals_100", lambda: player_intervals(snapshot, weights, spec), max_size=100_000),
+    ]
+
+def store_benchmarks(player_path: str, snapshot) -> list[Benchmark]:
+    from TRV_Metric.compact_store import build_store
+    from TRV_Metric.storage import load_vectors
+
+    table = load_vectors(player_path, ["Name", "Team"])
+    store = build_store([(2024, table)])
+    name = snapshot.names[-1]
+    return [
+        Benchmark("compact_store.build", lambda: build_store([(2024, table)])),
+        Benchmark("compact_store.player_rows", lambda: store.player_rows(name), warm=True),
+    ]
+
+def endpoint_benchmarks(player_path: str, team_path: str, snapshot) -> list[Benchmark]:
+    """
+    Every endpoint through the FastAPI test client, served from the synthetic league.
+    "cold" clears the result cache before each call; "warm" hits it.
+    """
+    from fastapi.testclient import TestClient
+    import api
+    from TRV_Metric.data_manager import DataManager
+
+    manager = DataManager(player_path, team_path)
+    manager.on_swap(lambda old, new: api.result_cache.clear())
+    api.data_manager = manager
+    api.result_cache.clear()
+    client = TestClient(api.app)
+
+    team_name = snapshot.team_names[0]
+    payload = {
+        "team_name": team_name,
+        "player_names": snapshot.roster_names(team_name)[:3],
+        "weight_scheme": WEIGHT_SCHEME,
+    }
+
+    def post(path: str, **options):
+        def call():
+            response = client.post(path, json={**payload, **options})
+            response.raise_for_status()
+            return response
+        return call
+
+    def get(path: str, **params):
+        def call():
+            response = client.get(path, params=params)
+            response.raise_for_status()
+            return response
+        return call
+
+    benchmarks = []
+    for path in ["/compute_trv/", "/league_trv/", "/trv_distribution/", "/trv_bundle/"]:
+        name = f"api.{path.strip('/')}"
+        benchmarks.append(Benchmark(f"{name}.cold", post(path), setup=api.result_cache.clear))
+        benchmarks.append(Benchmark(f"{name}.warm", post(path), warm=True))
+    benchmarks += [
+        Benchmark("api.league_trv.page", post("/league_trv/", limit=1000), warm=True),
+        Benchmark("api.league_trv.stream", post("/league_trv/", stream=True), warm=True),
+        Benchmark("api.similar_players", post("/similar_players/", player_name=payload["player_names"][0]), warm=True),
+        Benchmark("api.players_for_team", get("/players_for_team/", team_name=team_name), warm=True),
+        Benchmark("api.cache_stats", get("/cache_stats/"), warm=True),
+        Benchmark("api.metrics", get("/metrics"), warm=True),
+    ]
+    return benchmarks
+
+def simulator_benchmarks(snapshot, weights: dict) -> list[Benchmark]:
+    from TRV_Metric.similarity import SimilarityIndex
+    from TRV_Metric.simulator import SubstitutionEvaluator, get_substitution_delta_trv, recommend_trades
+
+    player_df = snapshot.player_frame()
+    team_name = snapshot.team_names[0]
+    player_out = snapshot.roster_names(team_name)[0]
+    player_in = next(name for name in snapshot.names if name not in snapshot.roster_names(team_name))
+    evaluator = SubstitutionEvaluator(snapshot, weights)
+
+    return [
+        Benchmark("simulator.get_substitution_delta_trv", lambda: get_substitution_delta_trv(
+            team_name, player_df, player_out, player_in, weights
+        )),
+        Benchmark("simulator.recommend_trades", lambda: recommend_trades(team_name, player_df, weights, top_n=5)),
+        Benchmark("simulator.evaluator_delta", lambda: evaluator.delta(team_name, player_out, player_in), warm=True),
+        Benchmark("simulator.evaluator_recommend", lambda: evaluator.recommend(team_name, top_n=5), warm=True),
+        Benchmark("simulator.similarity_index", lambda: SimilarityIndex(snapshot.player_matrix)),
+    ]
+
+def sweep_benchmarks(snapshot) -> list[Benchmark]:
+    from TRV_Metric.sweep import WeightSweep, grid_weights
+    from TRV_Metric.weights import get_weight_scheme
+
+    attributes, matrix = grid_weights(
+        {"offense": {"start": 0.5, "stop": 2.0, "num": 10}, "defense": {"start": 0.5, "stop": 2.0, "num": 10}},
+        get_weight_scheme(WEIGHT_SCHEME),
+    )
+    player_name = snapshot.names[0]
+    return [
+        Benchmark("sweep.grid_100", lambda: WeightSweep(snapshot, attributes, matrix, 10, player_name).run()),
+    ]
+
+def run_size(n_players: int, repeats: int, time_budget: float, only: list[str] = None, seed: int = 0) -> list[dict]:
+    from TRV_Metric.snapshot import load_snapshot
+    from TRV_Metric.weights import get_weight_scheme
+
+    weights = get_weight_scheme(WEIGHT_SCHEME)
+    results = []
+    with tempfile.TemporaryDirectory(prefix=f"trv-bench-{n_players}-") as directory:
+        player_path, team_path = write_league(directory, n_players, seed=seed)
+        snapshot = load_snapshot(player_path, team_path)
+        groups = [
+            lambda: calculator_benchmarks(snapshot, weights),
+            lambda: snapshot_benchmarks(player_path, team_path, snapshot, weights),
+            lambda: uncertainty_benchmarks(snapshot, weights),
+            lambda: store_benchmarks(player_path, snapshot),
+            lambda: endpoint_benchmarks(player_path, team_path, snapshot),
+            lambda: simulator_benchmarks(snapshot, weights),
+            lambda: sweep_benchmarks(snapshot),
+        ]
+        for build in groups:
+            for bench in build():
+                if only and not any(bench.name.startswith(prefix) for prefix in only):
+                    continue
+                record = {"name": bench.name, "n_players": n_players}
+                if bench.max_size is not None and n_players > bench.max_size:
+                    record["skipped"] = f"n_players > {bench.max_size}"
+                else:
+                    record.update(time_benchmark(bench, repeats, time_budget))
+                results.append(record)
+                _print_record(record)
+    return results
+
+# === Reporting ===
+def _print_record(record: dict) -> None:
+    if "skipped" in record:
+        print(f"{record['name']:<42} {record['n_players']:>9}  skipped ({record['skipped']})")
+    else:
+        print(f"{record['name']:<42} {record['n_players']:>9}  median {record['median_ms']:10.3f} ms"
+              f"  min {record['min_ms']:10.3f} ms  ({record['runs']} runs)")
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def environment() -> dict:
+    return {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+def compare(results: list[dict], baseline: list[dict], threshold: float, min_delta_ms: float) -> list[dict]:
+    """
+    Benchmarks whose median grew by more than threshold (relative) and min_delta_ms (absolute) vs the baseline.
+    """
+    previous = {(r["name"], r["n_players"]): r for r in baseline if "median_ms" in r}
+    regressions = []
+    for record in results:
+        before = previous.get((record["name"], record["n_players"]))
+        if before is None or "median_ms" not in record:
+            continue
+        change = record["median_ms"] - before["median_ms"]
+        if change > min_delta_ms and record["median_ms"] > before["median_ms"] * (1.0 + threshold):
+            regressions.append({
+                "name": record["name"],
+                "n_players": record["n_players"],
+                "baseline_ms": before["median_ms"],
+                "median_ms": record["median_ms"],
+                "ratio": record["median_ms"] / before["median_ms"],
+            })
+    return regressions
+
+def main(argv: list[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark TRV on synthetic leagues.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="league sizes (players)")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--time-budget", type=float, default=10.0, help="max seconds spent timing one benchmark")
+    parser.add_argument("--only", nargs="+", help="benchmark name prefixes to run, e.g. api simulator.recommend")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help=f"results JSON (default: {RESULTS_DIR}/bench-<timestamp>.json)")
+    parser.add_argument("--baseline", help="previous results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="relative slowdown flagged as a regression")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5, help="ignore slowdowns smaller than this")
+    args = parser.parse_args(argv)
+
+    env = environment()
+    results = []
+    for n_players in args.sizes:
+        results += run_size(n_players, args.repeats, args.time_budget, args.only, args.seed)
+
+    report = {"environment": env, "sizes": args.sizes, "results": results}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        report["baseline"] = {"path": args.baseline, "environment": baseline.get("environment")}
+        report["regressions"] = compare(results, baseline["results"], args.threshold, args.min_delta_ms)
+
+    output = args.output
+    if output is None:
+        stamp = env["timestamp"].replace(":", "").replace("-", "").split("+")[0]
+        output = os.path.join(RESULTS_DIR, f"bench-{stamp}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {output}")
+
+    for regression in report.get("regressions", []):
+        print(f"REGRESSION {regression['name']} @ {regression['n_players']}: "
+              f"{regression['baseline_ms']:.3f} -> {regression['median_ms']:.3f} ms (x{regression['ratio']:.2f})")
+    if report.get("regressions"):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
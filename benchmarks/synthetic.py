@@ -0,0 +1,48 @@
+# Synthetic leagues with the same schema as Data/Processed/*.csv, for benchmarking at any size
+import os
+import numpy as np
+import pandas as pd
+from TRV_Metric.storage import write_binary
+
+ATTRIBUTES = ["offense", "defense", "contact", "power", "plate_discipline", "baserunning"]
+
+def _zscore_columns(df: pd.DataFrame) -> pd.DataFrame:
+    return (df - df.mean()) / df.std(ddof=0)
+
+def synthetic_league(n_players: int, players_per_team: int = 13, seed: int = 0) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Player and team vector tables shaped like the fetcher's output: z-scored attributes,
+    players listed in no particular team order, team vectors normalized across teams.
+    Rosters average players_per_team (the real 2024 table has ~13 qualified hitters per club).
+    """
+    rng = np.random.default_rng(seed)
+    n_teams = max(2, n_players // players_per_team)
+    teams = np.array([f"T{i:05d}" for i in range(n_teams)], dtype=object)
+
+    # Correlated offense/power/contact like real hitters, independent defense/baserunning
+    base = rng.standard_normal((n_players, len(ATTRIBUTES)))
+    base[:, 3] = 0.6 * base[:, 0] + 0.8 * base[:, 3]
+    base[:, 2] = 0.4 * base[:, 0] + 0.9 * base[:, 2]
+
+    player_df = pd.DataFrame(base, columns=ATTRIBUTES)
+    player_df = _zscore_columns(player_df)
+    player_df.insert(0, "Team", teams[rng.integers(0, n_teams, n_players)])
+    player_df.insert(0, "Name", [f"Player {i:07d}" for i in range(n_players)])
+
+    team_df = _zscore_columns(player_df.groupby("Team")[ATTRIBUTES].mean()).fillna(0.0).reset_index()
+    return player_df, team_df
+
+def write_league(directory: str, n_players: int, seed: int = 0) -> tuple[str, str]:
+    """
+    Write a synthetic league as CSVs plus their binary copies; returns (player_path, team_path).
+    """
+    os.makedirs(directory, exist_ok=True)
+    player_df, team_df = synthetic_league(n_players, seed=seed)
+    player_path = os.path.join(directory, "player_vectors.csv")
+    team_path = os.path.join(directory, "team_vectors.csv")
+
+    player_df.to_csv(player_path, index=False)
+    write_binary(player_df, player_path, ["Name", "Team"], group_by="Team")
+    team_df.to_csv(team_path, index=False)
+    write_binary(team_df, team_path, ["Team"])
+    return player_path, team_path
@@ -132,33 +132,21 @@ const TRVForm = () => {
       payload.average_of = averageOf.split(",").map((s) => s.trim()).filter(Boolean);
     }
 
-    const [res1, res2, res3] = await Promise.all([
-      fetch("http://127.0.0.1:8000/compute_trv/", {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify(payload),
-      }),
-      fetch("http://127.0.0.1:8000/league_trv/", {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify(payload),
-      }),
-      fetch("http://127.0.0.1:8000/trv_distribution/", {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify(payload),
-      })
-    ]);
+    const res = await fetch("http://127.0.0.1:8000/trv_bundle/", {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify(payload),
+    });
 
-    if (!res1.ok || !res2.ok || !res3.ok) {
-      console.error("One of the API requests failed");
+    if (!res.ok) {
+      console.error("The TRV bundle request failed");
       return;
     }
-    
-    const [data1, data2, data3] = await Promise.all([res1.json(), res2.json(), res3.json()]);
-    setResult(data1);
-    setLeagueTRV(data2);
-    setTrvCurve(data3.x.map((xVal, idx) => ({ x: xVal, y: data3.y[idx] })));
+
+    const { compute, league, distribution } = await res.json();
+    setResult(compute);
+    setLeagueTRV(league);
+    setTrvCurve(distribution.x.map((xVal, idx) => ({ x: xVal, y: distribution.y[idx] })));
   };
 
   const teamLabels = {